@@ -0,0 +1,38 @@
+from lib.benchmark import BenchmarkParams, CompareParams, Benchmark
+from common.cli import Cli
+
+
+def main():
+
+    cli = Cli()
+    cli.argparse_benchmark()
+
+    if cli.command == cli.COMMAND_BENCHMARK_RUN:
+        astro = Benchmark(
+            timezone_str=cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_benchmark.cache if cli.args_benchmark.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_benchmark.cache_size if cli.args_benchmark.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_benchmark.backend if cli.args_benchmark.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_benchmark.backend_tolerance if cli.args_benchmark.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT
+        )
+        astro.show(BenchmarkParams(
+            profile=cli.args_benchmark.profile if cli.args_benchmark.profile != None else cli.BENCHMARK_PROFILE_DEFAULT,
+            output=cli.args_benchmark.output,
+            repeat=cli.args_benchmark.repeat if cli.args_benchmark.repeat != None else cli.BENCHMARK_REPEAT_DEFAULT
+        ))
+    elif cli.command == cli.COMMAND_BENCHMARK_COMPARE:
+        astro = Benchmark(
+            timezone_str=cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT
+        )
+        slowdowns = astro.compare(CompareParams(
+            baseline=cli.args_benchmark.baseline,
+            current=cli.args_benchmark.current,
+            threshold=cli.args_benchmark.threshold if cli.args_benchmark.threshold != None else cli.BENCHMARK_THRESHOLD_DEFAULT
+        ))
+        if slowdowns > 0:
+            exit(1)
+
+
+main()
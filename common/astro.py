@@ -1,11 +1,28 @@
-from typing import List, Optional, Any
-from concurrent.futures import ProcessPoolExecutor
+from abc import ABC, abstractmethod
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Any, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import deque
+from itertools import combinations
 import swisseph as swe
+import atexit
 from datetime import datetime, timedelta
-import pytz
-from dataclasses import dataclass
+import time
+import cProfile
+from dataclasses import asdict, dataclass, field, replace
 import os
+import sys
 from common.handler import Handler
+from common.cache import EphemerisCache
+from common.chebyshev import ChebyshevEphemeris
+from common.ayanamsa import AyanamsaProvider
+from common.timegrid import TimeGrid
+from common.results import ResultCache
+from common.catalog import EventCatalog
+from common.checkpoint import ScanCheckpoint
+from common.profiler import ProfileConfig, profiler
+from common.timezone import get_time_zone
+from common.writer import Field, OutputConfig, get_writer
+import numpy as np
 
 
 @dataclass
@@ -25,6 +42,41 @@ class Sign:
     sign_index: int
 
 
+@dataclass
+class Snapshot:
+    planets: List[str]
+    jd: np.ndarray
+    longitude: np.ndarray
+    speed: Optional[np.ndarray]
+    sign_index: np.ndarray
+    nakshatra_index: np.ndarray
+    pada_index: np.ndarray
+
+    def get_row(self, planet: str) -> int:
+        return self.planets.index(planet)
+
+    def get_slice(self, first: int, last: int) -> 'Snapshot':
+        return Snapshot(
+            planets=self.planets,
+            jd=self.jd[first:last],
+            longitude=self.longitude[:, first:last],
+            speed=self.speed[:, first:last] if self.speed is not None else None,
+            sign_index=self.sign_index[:, first:last],
+            nakshatra_index=self.nakshatra_index[:, first:last],
+            pada_index=self.pada_index[:, first:last])
+
+
+@dataclass
+class Block:
+    # Consecutive points of time_grid starting at index first
+    time_grid: TimeGrid
+    first: int
+    snapshot: Snapshot
+
+    def get_slice(self, first: int, last: int) -> 'Block':
+        return Block(time_grid=self.time_grid, first=self.first + first, snapshot=self.snapshot.get_slice(first, last))
+
+
 @dataclass
 class TimeRange:
     start: datetime
@@ -38,6 +90,89 @@ class GlobalParams:
     step: timedelta
     multiThread: Optional[bool]
     maxThreads: Optional[int]
+    # Start of the whole range when these params describe one chunk of it
+    origin: Optional[datetime] = field(default=None, kw_only=True)
+
+
+@dataclass(frozen=True)
+class AstroConfig:
+    timezone_str: str
+    debug: Optional[bool]
+    cache_dir: Optional[str]
+    cache_size: int
+    backend: str
+    backend_tolerance: float
+
+
+@dataclass
+class Task:
+    scanner: type
+    config: AstroConfig
+    method: str
+    params: Any
+    # Counting of single point lookups in the worker
+    profile: bool = False
+
+
+@dataclass
+class TaskResult:
+    # Found events of the chunk as one structured array, pickled as a raw buffer
+    events: np.ndarray
+    # Profiler counters of the worker for this task
+    counters: Dict[str, List[float]]
+
+
+_global_params: Optional[Tuple[str, int]] = None
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+_executor_workers = 0
+
+_scanners: Dict[Tuple[type, AstroConfig], Any] = {}
+
+
+def _set_global_params(ephe_path: str, sid_mode: int):
+    global _global_params
+    if _global_params == (ephe_path, sid_mode):
+        return
+    swe.set_ephe_path(ephe_path)  # type: ignore
+    swe.set_sid_mode(sid_mode)  # type: ignore
+    _global_params = (ephe_path, sid_mode)
+
+
+def _run_task(task: Task) -> TaskResult:
+    # Scanners live for the whole worker process, so backend state such as
+    # fitted Chebyshev segments is reused by later tasks
+    key = (task.scanner, task.config)
+    scanner = _scanners.get(key)
+    if scanner is None:
+        scanner = task.scanner(
+            timezone_str=task.config.timezone_str,
+            debug=task.config.debug,
+            cache_dir=task.config.cache_dir,
+            cache_size=task.config.cache_size,
+            backend=task.config.backend,
+            backend_tolerance=task.config.backend_tolerance)
+        _scanners[key] = scanner
+    # Scanners yield arrays of their events, a chunk goes back to the parent as one array
+    profiler.reset()
+    profiler.enabled = task.profile
+    started = time.perf_counter()
+    events = scanner._join_events(list(getattr(scanner, task.method)(task.params)))
+    params = task.params
+    points = 0 if getattr(params, 'exact', False) else max(0, -((params.start - params.end) // params.step))
+    profiler.add('chunk', time.perf_counter() - started, points=points)
+    return TaskResult(events=events, counters=profiler.get_counters())
+
+
+def _shutdown_executor():
+    global _executor
+    if _executor != None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+atexit.register(_shutdown_executor)
 
 
 @dataclass
@@ -45,9 +180,9 @@ class Astro(Handler):
 
     EPHE_PATH = './swisseph/ephe'
 
-    multiThread = False
+    SID_MODE = swe.SIDM_LAHIRI  # type: ignore
 
-    EPOCH = datetime(1970, 1, 1)
+    multiThread = False
 
     CPUS = os.cpu_count()
 
@@ -57,27 +192,121 @@ class Astro(Handler):
 
     max_threads: Optional[int] = None
 
-    def __init__(self, timezone_str: str, debug: Optional[bool] = False):
+    PLANET_VALUES = {planet: getattr(swe, planet if planet != Handler.planet.Ketu else Handler.planet.Rahu)
+                     for planet in Handler.planets}
+
+    SCAN_GRID_DAYS = {
+        Handler.planet.Sun: 1.0,
+        Handler.planet.Moon: 0.25,
+        Handler.planet.Mercury: 0.5,
+        Handler.planet.Venus: 1.0,
+        Handler.planet.Mars: 1.0,
+        Handler.planet.Jupiter: 2.0,
+        Handler.planet.Saturn: 2.0,
+        Handler.planet.Rahu: 0.25,
+        Handler.planet.Ketu: 0.25,
+    }
+
+    SCAN_GRID_DAYS_DEFAULT = 0.25
+
+    BLOCK_SIZE = 4096
+
+    CHUNKS_PER_WORKER = 8
+
+    # Longer chunks would delay the first results and hold more of them in memory
+    CHUNK_STEPS_MAX = 16 * BLOCK_SIZE
+
+    # Chunks submitted ahead of the one being printed
+    PREFETCH_PER_WORKER = 2
+
+    # Checkpointed scans record their progress every chunk of this many steps and at
+    # most this many days, as exact scans take days long steps. Chunks are the same
+    # for any number of workers so a rerun finds the chunks it recorded
+    CHECKPOINT_CHUNK_STEPS = 4 * BLOCK_SIZE
+    CHECKPOINT_CHUNK_DAYS = 30
+
+    ephemeris_cache: Optional[EphemerisCache] = None
+
+    chebyshev: Optional[ChebyshevEphemeris] = None
+
+    results_cache: Optional[ResultCache] = None
+
+    catalog: Optional[EventCatalog] = None
+
+    checkpoint: Optional[ScanCheckpoint] = None
+
+    profile: Optional[ProfileConfig] = None
+
+    _profile_started = 0.0
+
+    _cprofile: Optional[cProfile.Profile] = None
+
+    output: Optional[OutputConfig] = None
+
+    _siblings: Optional[Dict[type, Any]] = None
+
+    def __init__(self, timezone_str: str, debug: Optional[bool] = False, cache_dir: Optional[str] = None,
+                 cache_size: int = Handler.CACHE_SIZE_MB_DEFAULT, backend: str = Handler.BACKEND_DEFAULT,
+                 backend_tolerance: float = Handler.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+                 results_cache_dir: Optional[str] = None, results_cache_size: int = Handler.RESULTS_CACHE_SIZE_MB_DEFAULT,
+                 profile: Optional[ProfileConfig] = None, output: Optional[OutputConfig] = None,
+                 catalog_path: Optional[str] = None, checkpoint_path: Optional[str] = None):
         self.timezone_str = timezone_str
         self.debug = debug
+        self.config = AstroConfig(
+            timezone_str=timezone_str,
+            debug=debug,
+            cache_dir=cache_dir,
+            cache_size=cache_size,
+            backend=backend,
+            backend_tolerance=backend_tolerance)
+        self.ayanamsa_provider = AyanamsaProvider()
+        if cache_dir != None:
+            self.ephemeris_cache = EphemerisCache(
+                path=cache_dir, max_bytes=cache_size * 1024 * 1024, ephe_path=self.EPHE_PATH)
+        if backend == self.BACKEND_CHEBYSHEV:
+            self.chebyshev = ChebyshevEphemeris(
+                tolerance_arcsec=backend_tolerance)
+        if results_cache_dir != None:
+            self.results_cache = ResultCache(
+                path=results_cache_dir, max_bytes=results_cache_size * 1024 * 1024, ephe_path=self.EPHE_PATH)
+        if catalog_path != None:
+            try:
+                self.catalog = EventCatalog(catalog_path)
+            except ValueError as e:
+                print(e)
+                exit(1)
+        if checkpoint_path != None:
+            self.checkpoint = ScanCheckpoint(checkpoint_path)
+        self.profile = profile
+        self.output = output
 
     def _convert_to_local_time(self, utc_time, timezone_str) -> datetime:
-        timezone = pytz.timezone(timezone_str)
-        local_time = utc_time.replace(tzinfo=pytz.utc).astimezone(timezone)
+        started = time.perf_counter() if profiler.enabled else 0.0
+        local_time = get_time_zone(timezone_str).localize([utc_time])[0]
+        if profiler.enabled:
+            profiler.add('local time', time.perf_counter() - started, points=1)
         return local_time
 
+    def _convert_to_local_times(self, utc_times: List[datetime]) -> List[datetime]:
+        started = time.perf_counter()
+        local_times = get_time_zone(self.timezone_str).localize(utc_times)
+        profiler.add('local time', time.perf_counter() - started, points=len(utc_times))
+        return local_times
+
     def _set_params(self, params: GlobalParams):
         self.multiThread = params.multiThread
         self.max_threads = params.maxThreads
 
     def _get_zodiac_sign(self, longitude) -> Sign:
+        started = time.perf_counter() if profiler.enabled else 0.0
         sign_index = int(longitude // 30)
         degree_in_sign = longitude % 30
 
         degrees = int(degree_in_sign)
         minutes = int((degree_in_sign - degrees) * 60)
         seconds = ((degree_in_sign - degrees) * 60 - minutes) * 60
-        return Sign(
+        sign = Sign(
             name_en=self.zodiac_signs_en[sign_index],
             name_ru=self.zodiac_signs_ru[sign_index],
             name_sa=self.zodiac_signs_sa[sign_index],
@@ -86,34 +315,343 @@ class Astro(Handler):
             seconds=round(seconds, 1),
             sign_index=sign_index
         )
+        if profiler.enabled:
+            profiler.add('zodiac sign', time.perf_counter() - started)
+        return sign
 
     def _set_global_params(self):
-        swe.set_ephe_path(self.EPHE_PATH)  # type: ignore
-        swe.set_sid_mode(swe.SIDM_LAHIRI)  # type: ignore
+        _set_global_params(self.EPHE_PATH, self.SID_MODE)
+
+    def _get_workers(self) -> int:
+        cpus = self.CPUS if self.CPUS != None else 4
+        return self.max_threads if self.max_threads != None and cpus > self.max_threads else cpus
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        global _executor, _executor_workers
+        workers = self._get_workers()
+        if _executor != None and _executor_workers != workers:
+            _shutdown_executor()
+        if _executor == None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_set_global_params,
+                initargs=(self.EPHE_PATH, self.SID_MODE))
+            _executor_workers = workers
+        return _executor
+
+    def _map(self, method: str, params: Iterable[Any]) -> Iterator[np.ndarray]:
+        # Ordered merge: results come back in submission order while only a bounded
+        # window of chunks is in flight or waiting to be consumed
+        fresh = _executor == None or _executor_workers != self._get_workers()
+        started = time.perf_counter()
+        executor = self._get_executor()
+        window = self._get_workers() * self.PREFETCH_PER_WORKER
+        pending: Deque[Future] = deque()
+        for item in params:
+            pending.append(executor.submit(_run_task, Task(
+                scanner=type(self), config=self.config, method=method, params=item, profile=profiler.enabled)))
+            if fresh:
+                # Worker processes are started by the first submit
+                profiler.add('pool startup', time.perf_counter() - started)
+                fresh = False
+            if len(pending) >= window:
+                yield self.__get_task_events(pending.popleft())
+        while pending:
+            yield self.__get_task_events(pending.popleft())
+
+    def __get_task_events(self, future: Future) -> np.ndarray:
+        started = time.perf_counter()
+        result: TaskResult = future.result()
+        received = time.perf_counter()
+        profiler.merge(result.counters)
+        profiler.add('pool wait', received - started)
+        profiler.add('merge', time.perf_counter() - received)
+        return result.events
+
+    def _stream(self, method: str, params: Iterable[Any]) -> Iterator[np.ndarray]:
+        # Event arrays of the chunks in order
+        yield from self._map(method, params)
 
     def _get_jd(self, current_time: datetime):
-        return swe.utc_to_jd(  # type: ignore
+        started = time.perf_counter() if profiler.enabled else 0.0
+        jd = swe.utc_to_jd(  # type: ignore
             current_time.year,
             current_time.month,
             current_time.day,
             current_time.hour,
             current_time.minute,
-            current_time.second,
+            current_time.second + current_time.microsecond / 1000000,
             swe.GREG_CAL)[1]  # type: ignore
+        if profiler.enabled:
+            profiler.add('swe.utc_to_jd', time.perf_counter() - started)
+        return jd
+
+    def _get_chunk_grid(self, params: GlobalParams, step: timedelta) -> Tuple[TimeGrid, int]:
+        # Grid anchored at the start of the whole range, so every chunk samples the same
+        # points as a single-process run, and the index of the first point of the chunk
+        origin = params.origin if params.origin != None else params.start
+        time_grid = TimeGrid(
+            start=origin,
+            step=step,
+            size=max(0, -((origin - params.end) // step)))
+        return time_grid, (params.start - origin) // step
+
+    def _get_exact_grid(self, params: GlobalParams, *planets: str) -> np.ndarray:
+        # Coarse grid points from the one before the chunk up to the first one past its end,
+        # neighbouring chunks share a bracket and keep the roots inside their own range
+        time_grid, first = self._get_chunk_grid(
+            params, timedelta(days=self._get_scan_grid(*planets)))
+        return time_grid.get_block(max(first - 1, 0), time_grid.size + 1)
+
+    def _get_time(self, jd: float) -> datetime:
+        started = time.perf_counter() if profiler.enabled else 0.0
+        year, month, day, hour, minute, seconds = swe.jdut1_to_utc(  # type: ignore
+            jd, swe.GREG_CAL)  # type: ignore
+        if profiler.enabled:
+            profiler.add('swe.jdut1_to_utc', time.perf_counter() - started)
+        return datetime(year, month, day, hour, minute) + timedelta(seconds=seconds)
+
+    def _get_scan_grid(self, *planets: str) -> float:
+        return min(self.SCAN_GRID_DAYS.get(planet, self.SCAN_GRID_DAYS_DEFAULT) for planet in planets)
+
+    def _get_sibling(self, scanner_type: type) -> Any:
+        # One scanner per type, sharing the settings and ephemeris backend state of
+        # this one
+        if self._siblings == None:
+            self._siblings = {}
+        scanner = self._siblings.get(scanner_type)
+        if scanner == None:
+            scanner = scanner_type(timezone_str=self.timezone_str, debug=self.debug)
+            scanner.config = self.config
+            scanner.ayanamsa_provider = self.ayanamsa_provider
+            scanner.ephemeris_cache = self.ephemeris_cache
+            scanner.chebyshev = self.chebyshev
+            self._siblings[scanner_type] = scanner
+        return scanner
+
+    def _get_planet_pairs(self, planets: List[str]) -> List[Tuple[str, str]]:
+        # Rahu and Ketu are always opposite, the pair of one body is skipped
+        return [(planet1, planet2) for planet1, planet2 in combinations(planets, 2)
+                if self._get_planet_value(planet1) != self._get_planet_value(planet2)]
 
     def _get_planet_value(self, planet: str):
-        return getattr(
-            swe, planet) if planet != self.planet.Ketu else getattr(swe, self.planet.Rahu)
+        return self.PLANET_VALUES[planet] if planet in self.PLANET_VALUES else getattr(swe, planet)
+
+    def __get_body_phase(self) -> str:
+        if self.chebyshev != None:
+            return 'chebyshev'
+        if self.ephemeris_cache != None:
+            return 'ephemeris cache'
+        return 'swe.calc_ut'
 
     def _get_planet_longitude(self, planet: str, jd: Any, ayanamsa: Any) -> float:
         planet_value = self._get_planet_value(planet)
-        planet_data = swe.calc(jd, planet_value)  # type: ignore
+        started = time.perf_counter() if profiler.enabled else 0.0
+        if self.chebyshev != None:
+            longitude, _ = self.chebyshev.get_body(planet_value, jd)
+        elif self.ephemeris_cache != None:
+            longitude, _ = self.ephemeris_cache.get_body(planet_value, jd)
+        else:
+            longitude = swe.calc_ut(jd, planet_value, swe.FLG_SWIEPH)[0][0]  # type: ignore
+        if profiler.enabled:
+            profiler.add(self.__get_body_phase(), time.perf_counter() - started, points=1)
         shift = 0 if planet != self.planet.Ketu else 180
         return swe.degnorm(  # type: ignore
-            planet_data[0][0] + shift - ayanamsa)
+            longitude + shift - ayanamsa)
+
+    def _get_angle_diff(self, longitude1: float, longitude2: float) -> float:
+        return swe.difdeg2n(longitude1, longitude2)  # type: ignore
+
+    def _get_planet_speed(self, planet: str, jd: Any, direct: bool = False) -> float:
+        # Rate of the sidereal longitude returned by _get_planet_longitude, the body
+        # speed is computed by swe whatever the backend when direct
+        planet_value = self._get_planet_value(planet)
+        started = time.perf_counter() if profiler.enabled else 0.0
+        if direct:
+            speed = swe.calc_ut(jd, planet_value, swe.FLG_SPEED)[0][3]  # type: ignore
+        elif self.chebyshev != None:
+            _, speed = self.chebyshev.get_body(planet_value, jd)
+        elif self.ephemeris_cache != None:
+            _, speed = self.ephemeris_cache.get_body(planet_value, jd)
+        else:
+            speed = swe.calc_ut(jd, planet_value, swe.FLG_SPEED)[0][3]  # type: ignore
+        if profiler.enabled:
+            profiler.add(self.__get_body_phase() if not direct else 'swe.calc_ut', time.perf_counter() - started, points=1)
+        return speed - self._get_ayanamsa_speed(jd)
+
+    def _get_ayanamsa_speed(self, jd: Any) -> float:
+        _, ayanamsa_speed = self.__get_ayanamsa_value(jd)
+        return ayanamsa_speed
 
     def _get_ayanamsa(self, jd: Any):
-        return swe.get_ayanamsa(jd)  # type: ignore
+        ayanamsa, _ = self.__get_ayanamsa_value(jd)
+        return ayanamsa
+
+    def __get_ayanamsa_value(self, jd: Any) -> Tuple[float, float]:
+        started = time.perf_counter() if profiler.enabled else 0.0
+        if self.chebyshev != None:
+            value = self.chebyshev.get_ayanamsa(self.SID_MODE, jd)
+        elif self.ephemeris_cache != None:
+            value = self.ephemeris_cache.get_ayanamsa(self.SID_MODE, jd)
+        else:
+            value = self.ayanamsa_provider.get(self.SID_MODE, jd)
+        if profiler.enabled:
+            profiler.add('ayanamsa', time.perf_counter() - started, points=1)
+        return value
+
+    def __get_ayanamsa_arrays(self, jd: np.ndarray):
+        started = time.perf_counter()
+        if self.chebyshev != None:
+            value = self.chebyshev.get_ayanamsa(self.SID_MODE, jd)
+        elif self.ephemeris_cache != None:
+            value = self.ephemeris_cache.get_ayanamsa_array(self.SID_MODE, jd)
+        else:
+            value = self.ayanamsa_provider.get_array(self.SID_MODE, jd)
+        profiler.add('ayanamsa', time.perf_counter() - started, points=len(jd))
+        return value
+
+    def __get_body_arrays(self, planet_values: List[int], jd: np.ndarray, speeds: bool):
+        # Longitudes and speeds, one row per body and one column per jd
+        started = time.perf_counter()
+        if self.chebyshev != None or self.ephemeris_cache != None:
+            if self.chebyshev != None:
+                values = [self.chebyshev.get_body(planet_value, jd) for planet_value in planet_values]
+            else:
+                values = [self.ephemeris_cache.get_body_array(planet_value, jd) for planet_value in planet_values]
+            profiler.add(self.__get_body_phase(), time.perf_counter() - started, points=len(jd) * len(planet_values))
+            longitude = np.array([value[0] for value in values])
+            return longitude, np.array([value[1] for value in values]) if speeds else None
+
+        # One pass over the points, swe reuses the nutation and Earth of a date between the
+        # bodies at it. swe.calc at jd + ΔT is swe.calc_ut without its per call overhead, and
+        # the speed flag makes swe differentiate every position, so it is only asked for when needed
+        flags = swe.FLG_SWIEPH | swe.FLG_SPEED if speeds else swe.FLG_SWIEPH
+        longitude = np.empty((len(planet_values), len(jd)))
+        speed = np.empty((len(planet_values), len(jd))) if speeds else None
+        for column, x in enumerate(jd.tolist()):
+            tt = x + swe.deltat_ex(x, swe.FLG_SWIEPH)  # type: ignore
+            for row, planet_value in enumerate(planet_values):
+                position = swe.calc(tt, planet_value, flags)[0]  # type: ignore
+                longitude[row, column] = position[0]
+                if speed is not None:
+                    speed[row, column] = position[3]
+        calls = len(jd) * len(planet_values)
+        profiler.add(self.__get_body_phase(), time.perf_counter() - started, calls=calls, points=calls)
+        return longitude, speed
+
+    def _get_snapshot(self, jd: Any, planets: Optional[List[str]] = None, speeds: bool = False) -> Snapshot:
+        # Positions of every requested body, one row per planet and one column per jd;
+        # Ketu reuses the Rahu computation
+        started = time.perf_counter()
+        planets = planets if planets != None else self.planets
+        jd = np.atleast_1d(np.asarray(jd, dtype=np.float64))
+        ayanamsa, ayanamsa_speed = self.__get_ayanamsa_arrays(jd)
+
+        planet_values = list(dict.fromkeys(self._get_planet_value(planet) for planet in planets))
+        body_longitude, body_speed = self.__get_body_arrays(planet_values, jd, speeds)
+        longitude = np.empty((len(planets), len(jd)))
+        speed = np.empty((len(planets), len(jd))) if body_speed is not None else None
+        for row, planet in enumerate(planets):
+            body_row = planet_values.index(self._get_planet_value(planet))
+            shift = 0 if planet != self.planet.Ketu else 180
+            longitude[row] = (body_longitude[body_row] + shift - ayanamsa) % 360
+            if speed is not None:
+                speed[row] = body_speed[body_row] - ayanamsa_speed  # type: ignore
+
+        snapshot = Snapshot(
+            planets=list(planets),
+            jd=jd,
+            longitude=longitude,
+            speed=speed,
+            sign_index=self._get_sign_indexes(longitude),
+            nakshatra_index=self._get_nakshatra_indexes(longitude),
+            pada_index=self._get_pada_indexes(longitude))
+        profiler.add('snapshot', time.perf_counter() - started, points=len(jd))
+        return snapshot
+
+    def _get_sign_indexes(self, longitude: np.ndarray) -> np.ndarray:
+        return np.minimum((longitude // self.SIGN_DEGREES).astype(np.int64), len(self.zodiac_signs_en) - 1)
+
+    def _get_nakshatra_indexes(self, longitude: np.ndarray) -> np.ndarray:
+        return np.minimum((longitude // self.NAKSHATRA_DEGREES).astype(np.int64), len(self.nakshatras) - 1)
+
+    def _get_pada_indexes(self, longitude: np.ndarray) -> np.ndarray:
+        return np.minimum(((longitude % self.NAKSHATRA_DEGREES) // self.PADA_DEGREES).astype(np.int64), 3)
+
+    def _get_blocks(self, time_grid: TimeGrid, first: int, planets: List[str], speeds: bool = False) -> Iterator[Block]:
+        for block_first, jd in time_grid.blocks(self.BLOCK_SIZE, first):
+            yield Block(time_grid=time_grid, first=block_first, snapshot=self._get_snapshot(jd, planets, speeds))
+
+    def _detect_blocks(self, detect: Callable[[Block], np.ndarray], blocks: Iterable[Block]) -> Iterator[np.ndarray]:
+        for block in blocks:
+            started = time.perf_counter()
+            events = detect(block)
+            profiler.add('detect', time.perf_counter() - started, points=len(block.snapshot.jd))
+            yield events
+
+    def _get_catalog_meta(self) -> Dict[str, str]:
+        # Settings the catalog events depend on, the solver tolerance is added by the build
+        return {'version': str(EventCatalog.VERSION), 'sid_mode': str(self.SID_MODE), 'ephe_path': self.EPHE_PATH,
+                'backend': self.config.backend, 'backend_tolerance': str(self.config.backend_tolerance)}
+
+    def _prepare_backend(self, start: datetime, end: datetime, *planets: str):
+        if self.chebyshev == None:
+            return
+
+        self._set_global_params()
+        start_jd = self._get_jd(start)
+        end_jd = self._get_jd(end)
+        for planet in planets:
+            self.chebyshev.prepare(
+                self._get_planet_value(planet), start_jd, end_jd)
+        self.chebyshev.get_ayanamsa(
+            self.SID_MODE, np.arange(start_jd, end_jd + 1))
+
+        errors = self.chebyshev.get_errors()
+        fit = ', '.join(
+            [f"{planet}: {errors.get(self._get_planet_value(planet), 0.0):.6f}\"" for planet in planets])
+        self._log(
+            f"Chebyshev backend, fit tolerance: {self.chebyshev.tolerance * 3600}\", max error: {fit}")
+        fallbacks = self.chebyshev.get_fallbacks()
+        computed = ', '.join([f"{planet}: {fallbacks[self._get_planet_value(planet)]}"
+                              for planet in planets if self._get_planet_value(planet) in fallbacks])
+        if computed:
+            self._log(f"Chebyshev backend, segments computed by swe as no fit meets the tolerance: {computed}")
+
+    def _log(self, message: str):
+        # Status messages keep off stdout when it carries the results of a bulk format
+        bulk = self.output != None and self.output.format != self.OUTPUT_FORMAT_TEXT and self.output.path == None
+        print(message, file=sys.stderr if bulk else sys.stdout, flush=True)
+
+    def _start_profile(self):
+        profiler.reset()
+        profiler.enabled = self.profile != None and self.profile.format != None
+        self._profile_started = time.perf_counter()
+        if self.profile != None and self.profile.dump != None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def _show_profile(self):
+        if self.profile == None:
+            return
+
+        if self._cprofile != None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.profile.dump)
+            self._cprofile = None
+            self._log(f"cProfile stats are written to: {self.profile.dump}")
+
+        if self.profile.format == None:
+            return
+        report = profiler.get_report(
+            time.perf_counter() - self._profile_started, self._get_workers() if self.multiThread else 1)
+        text = profiler.format_report(report, self.profile.format)
+        if self.profile.output != None:
+            with open(self.profile.output, 'w') as f:
+                f.write(f"{text}\n")
+            self._log(f"Profile is written to: {self.profile.output}")
+        else:
+            self._log(text)
 
     def _show_sign(self, sign: Sign, longitude: float):
         nakshatra, pada, _ = self._get_nakshatra(longitude=longitude)
@@ -123,25 +661,278 @@ class Astro(Handler):
         return f"{sign.degrees}:{sign.minutes}:{sign.seconds}"
 
     def split_dates(self, start: datetime, end: datetime, step: timedelta):
-        cpus = self.CPUS if self.CPUS != None else 4
-        cpus = self.max_threads if self.max_threads != None and cpus > self.max_threads else cpus
-
-        total_seconds_start = (start - self.EPOCH).total_seconds()
-        total_seconds_end = (end - self.EPOCH).total_seconds()
-        total_seconds_step = (step).total_seconds()
-        number_of_timedeltas = int((
-            total_seconds_end - total_seconds_start) // total_seconds_step)
-        chunk_length = max(1, number_of_timedeltas //
-                           cpus) * total_seconds_step
+        # Many small step aligned chunks, handed out to the workers one at a time
+        steps = max(0, -((start - end) // step))
+        chunks = self._get_workers() * self.CHUNKS_PER_WORKER
+        chunk_steps = min(max(1, -(-steps // chunks)), self.CHUNK_STEPS_MAX)
 
         res: List[TimeRange] = []
-        for i in range(cpus):
-            current_start = start + timedelta(seconds=i * chunk_length)
-            current_end = current_start + timedelta(seconds=chunk_length)
-
-            if current_end > end:
-                current_end = end
-
+        current_start = start
+        while current_start < end:
+            current_end = min(end, current_start + chunk_steps * step)
             res.append(TimeRange(start=current_start, end=current_end))
+            current_start = current_end
 
         return res
+
+
+class Scanner(Astro, ABC):
+    # Astro finding events, with their result cache, checkpoints and output
+
+    # Step mode detection depends on the previous point, so nothing is reported at
+    # the first point of a range
+    SCAN_STATEFUL = False
+
+    # Step mode detection reads the speeds of the snapshots
+    SCAN_SPEEDS = False
+
+    # Columns of the event arrays after the UTC time
+    EVENT_FIELDS = []
+
+    def _get_event_dtype(self) -> np.dtype:
+        return np.dtype([('time', 'datetime64[us]')] + self.EVENT_FIELDS)
+
+    def _get_events(self, times: Any, **columns: Any) -> np.ndarray:
+        # Structured array of found events, times are UTC
+        events = np.empty(len(times), dtype=self._get_event_dtype())
+        events['time'] = times
+        for name, values in columns.items():
+            events[name] = values
+        return events
+
+    def _join_events(self, events: List[np.ndarray]) -> np.ndarray:
+        return np.concatenate(events) if events else np.empty(0, dtype=self._get_event_dtype())
+
+    def _get_local_times(self, events: np.ndarray) -> List[datetime]:
+        return self._convert_to_local_times(events['time'].tolist())
+
+    @abstractmethod
+    def _find_events(self, params: Any) -> Iterator[np.ndarray]:
+        # Event arrays of params.start..params.end, scanned in this process
+        ...
+
+    @abstractmethod
+    def _get_items(self, events: np.ndarray) -> List[Any]:
+        # Result objects of the events, built only for rendering
+        ...
+
+    def _render_items(self, events: Iterable[np.ndarray]) -> Iterator[Any]:
+        for block in events:
+            started = time.perf_counter()
+            items = self._get_items(block)
+            profiler.add('items', time.perf_counter() - started, points=len(items))
+            yield from items
+
+    def __get_results_key(self, params: GlobalParams, step: timedelta) -> str:
+        fields = {name: value for name, value in asdict(params).items()
+                  if name not in ('start', 'end', 'origin', 'multiThread', 'maxThreads')}
+        return self.results_cache.get_key(  # type: ignore
+            type(self).__name__, fields, (params.start - datetime.min) % step, self.SID_MODE, self.EPHE_PATH,
+            self.timezone_str, self.config.backend, self.config.backend_tolerance, self.config.cache_dir != None)
+
+    def _get_results(self, params: GlobalParams, step: timedelta, scan: Callable[[Any], Iterable[np.ndarray]]) -> Iterator[np.ndarray]:
+        # Event arrays of params.start..params.end, scanning only the spans the result cache
+        # does not cover yet. Every span is scanned on the grid anchored at the origin of
+        # the first one, so extended ranges give the same points as a full rescan, and
+        # with the point before it, as stateful scanners report nothing at the first point.
+        yield from self._find_results(params, step, scan)
+
+        # Every event is written, the progress of the scan is not needed anymore
+        if self.checkpoint != None:
+            self.checkpoint.remove()
+
+    def _find_results(self, params: GlobalParams, step: timedelta,
+                      scan: Callable[[Any], Iterable[np.ndarray]]) -> Iterable[np.ndarray]:
+        # Event arrays of the range before the checkpoint is dropped, catalog scanners
+        # take the part their catalog covers from it
+        return self._get_scanned_events(params, step, scan)
+
+    def _get_scanned_events(self, params: GlobalParams, step: timedelta,
+                            scan: Callable[[Any], Iterable[np.ndarray]]) -> Iterable[np.ndarray]:
+        if self.checkpoint != None:
+            scan = lambda scan_params: self.__get_checkpoint_events(scan_params, step)
+        if self.results_cache == None:
+            return scan(params)
+        return self.__get_cached_events(params, step, scan)
+
+    def __get_checkpoint_key(self, params: GlobalParams) -> str:
+        fields = {name: value for name, value in asdict(params).items() if name not in ('multiThread', 'maxThreads')}
+        return self.checkpoint.get_key(  # type: ignore
+            type(self).__name__, fields, self.SID_MODE, self.EPHE_PATH, self.config.backend, self.config.backend_tolerance)
+
+    def __get_checkpoint_events(self, params: GlobalParams, step: timedelta) -> Iterator[np.ndarray]:
+        # The range is scanned in chunks of a fixed number of steps from its start, the
+        # events of every finished chunk are recorded before they are passed on. Chunks
+        # recorded by an interrupted run of the same scan are taken from the checkpoint.
+        key = self.__get_checkpoint_key(params)
+        done = self.checkpoint.load(key)  # type: ignore
+        origin = params.origin if params.origin != None else params.start
+        chunk_steps = max(1, min(self.CHECKPOINT_CHUNK_STEPS, timedelta(days=self.CHECKPOINT_CHUNK_DAYS) // step))
+
+        chunks: List[TimeRange] = []
+        current_start = params.start
+        while current_start < params.end:
+            current_end = min(params.end, current_start + chunk_steps * step)
+            chunks.append(TimeRange(start=current_start, end=current_end))
+            current_start = current_end
+
+        pending = [replace(params, start=chunk.start, end=chunk.end, origin=origin)
+                   for chunk in chunks if (chunk.start, chunk.end) not in done]
+        if len(pending) < len(chunks):
+            self._log(
+                f"Checkpoint {self.checkpoint.path}: {len(chunks) - len(pending)} of {len(chunks)} chunks are done")  # type: ignore
+
+        if params.multiThread:
+            found = self._stream('_find_events', pending)
+        else:
+            found = (self._join_events(list(self._find_events(chunk_params))) for chunk_params in pending)
+
+        for chunk in chunks:
+            events = done.get((chunk.start, chunk.end))
+            if events is None:
+                events = next(found)
+                self.checkpoint.add(key, chunk.start, chunk.end, events)  # type: ignore
+            yield events
+
+    def __get_cached_events(self, params: GlobalParams, step: timedelta,
+                            scan: Callable[[Any], Iterable[np.ndarray]]) -> Iterator[np.ndarray]:
+        key = self.__get_results_key(params, step)
+        anchor, spans, events = self.results_cache.load(key)  # type: ignore
+        if events is None:
+            events = self._join_events([])
+        warm_up = step if self.SCAN_STATEFUL and not params.exact else timedelta(0)
+        end = params.start + -((params.start - params.end) // step) * step
+        params_end = np.datetime64(params.end, 'us')
+
+        found: List[np.ndarray] = []
+        gaps: List[Tuple[datetime, datetime]] = []
+        for segment_start, segment_end, covered in self.results_cache.get_segments(  # type: ignore
+                spans, params.start + warm_up, end):
+            if covered:
+                times = events['time']
+                blocks: Iterable[np.ndarray] = [events[(times >= np.datetime64(segment_start, 'us')) &
+                                                       (times < np.datetime64(segment_end, 'us'))]]
+            else:
+                origin = anchor if anchor != None and anchor <= segment_start - warm_up else segment_start - warm_up
+                if anchor == None:
+                    anchor = origin
+                blocks = scan(replace(params, start=segment_start, end=segment_end, origin=origin))
+                gaps.append((segment_start, segment_end))
+            for block in blocks:
+                if not covered:
+                    found.append(block)
+                yield block[block['time'] < params_end]
+
+        if gaps and anchor != None:
+            merged = self._join_events([events] + found)
+            self.results_cache.save(  # type: ignore
+                key, anchor, spans + gaps, merged[np.argsort(merged['time'], kind='stable')])
+
+    @abstractmethod
+    def _get_header(self, params: Any) -> str:
+        ...
+
+    @abstractmethod
+    def _get_line(self, params: Any, item: Any) -> str:
+        ...
+
+    @abstractmethod
+    def _get_fields(self) -> List[Field]:
+        # Columns of the bulk output formats, time first
+        ...
+
+    @abstractmethod
+    def _get_records(self, params: Any, events: np.ndarray) -> List[Tuple]:
+        # Rows of the bulk output formats taken from the event columns, no result
+        # objects are built for them
+        ...
+
+    def _get_position_fields(self) -> List[Field]:
+        return [Field(name='sign_index', dtype='i1', names=self.zodiac_signs_en),
+                Field(name='nakshatra_index', dtype='i1', names=self.nakshatras)]
+
+    def _get_position_columns(self, longitude: np.ndarray) -> Tuple[List[int], List[int]]:
+        return self._get_sign_indexes(longitude).tolist(), self._get_nakshatra_indexes(longitude).tolist()
+
+    def _write_results(self, params: Any, events: Iterable[np.ndarray]) -> int:
+        output = self.output if self.output != None else OutputConfig(format=self.OUTPUT_FORMAT_TEXT, path=None)
+        count = 0
+        if output.format == self.OUTPUT_FORMAT_TEXT:
+            stream = open(output.path, 'w', encoding='utf-8') if output.path != None else sys.stdout
+            for item in self._render_items(events):
+                if count == 0:
+                    stream.write(f"{self._get_header(params)}\n")
+                stream.write(f"{self._get_line(params, item)}\n")
+                stream.flush()
+                count += 1
+            if count == 0:
+                stream.write(f"There are no matches for these params: {params}\n")
+            if output.path != None:
+                stream.close()
+            return count
+
+        writer = get_writer(output.format, self._get_fields(), output.path)
+        for block in events:
+            started = time.perf_counter()
+            records = self._get_records(params, block)
+            profiler.add('records', time.perf_counter() - started, points=len(records))
+            for record in records:
+                writer.write(record)
+            count += len(records)
+        writer.close()
+        if count == 0:
+            self._log(f"There are no matches for these params: {params}")
+        return count
+
+
+class CatalogScanner(Scanner):
+    # Scanner whose exact events are also kept in the event catalog
+
+    # Table of the exact events of this scanner in the event catalog
+    CATALOG_TABLE: str
+
+    @abstractmethod
+    def _get_catalog_keys(self, params: Any) -> Dict[str, str]:
+        ...
+
+    @abstractmethod
+    def _find_catalog_events(self, params: Any, start: datetime, end: datetime) -> np.ndarray:
+        ...
+
+    def _find_results(self, params: GlobalParams, step: timedelta,
+                      scan: Callable[[Any], Iterable[np.ndarray]]) -> Iterable[np.ndarray]:
+        span = self.__get_catalog_span(params)
+        if span == None:
+            return self._get_scanned_events(params, step, scan)
+        return self.__get_catalog_events(params, step, scan, span)
+
+    def __get_catalog_span(self, params: Any) -> Optional[Tuple[datetime, datetime]]:
+        # Exact queries are answered from the catalog when it was built with the same
+        # settings and a tolerance not coarser than the requested one
+        if self.catalog == None or not params.exact:
+            return None
+        meta = self.catalog.get_meta()
+        expected = self._get_catalog_meta()
+        if any(meta.get(name) != value for name, value in expected.items()):
+            self._log(f"Catalog {self.catalog.path} is built with other settings, events are computed")
+            return None
+        if params.tolerance < float(meta['tolerance']):
+            return None
+        span = self.catalog.get_span(self.CATALOG_TABLE)
+        if span == None or span[0] >= params.end or span[1] <= params.start:
+            return None
+        return span
+
+    def __get_catalog_events(self, params: GlobalParams, step: timedelta, scan: Callable[[Any], Iterable[np.ndarray]],
+                             span: Tuple[datetime, datetime]) -> Iterator[np.ndarray]:
+        # The covered part of the range comes from indexed catalog rows, only the parts
+        # outside the catalog span are computed
+        span_start, span_end = span
+        if params.start < span_start:
+            yield from self._get_scanned_events(replace(params, end=span_start), step, scan)
+        started = time.perf_counter()
+        events = self._find_catalog_events(params, max(params.start, span_start), min(params.end, span_end))
+        profiler.add('catalog', time.perf_counter() - started, points=len(events))
+        yield events
+        if params.end > span_end:
+            yield from self._get_scanned_events(replace(params, start=span_end), step, scan)
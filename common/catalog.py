@@ -0,0 +1,94 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sqlite3
+import numpy as np
+
+
+class EventCatalog:
+    # Exact events precomputed over one span per table in SQLite. Times are UTC
+    # microseconds since the epoch, rows are found by their key columns and time.
+    VERSION = 1
+
+    SQL_TYPES = {'f': 'REAL', 'b': 'INTEGER', 'i': 'INTEGER', 'u': 'INTEGER', 'U': 'TEXT'}
+
+    def __init__(self, path: str, writable: bool = False):
+        # Queries open the catalog read only, only a build creates or changes it
+        self.path = path
+        if writable:
+            self._connection = sqlite3.connect(path)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS spans (name TEXT PRIMARY KEY, start INTEGER, end INTEGER)')
+            self._connection.commit()
+            return
+
+        if not os.path.isfile(path):
+            raise ValueError(f"Catalog is missing: {path}")
+        self._connection = sqlite3.connect(f"{Path(os.path.abspath(path)).as_uri()}?mode=ro", uri=True)
+        try:
+            tables = self._connection.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('meta', 'spans')").fetchone()[0]
+        except sqlite3.DatabaseError:
+            tables = 0
+        if tables != 2:
+            self._connection.close()
+            raise ValueError(f"Not an event catalog: {path}")
+
+    def __get_time(self, value: datetime) -> int:
+        return int(np.datetime64(value, 'us').astype(np.int64))
+
+    def get_meta(self) -> Dict[str, str]:
+        return dict(self._connection.execute('SELECT name, value FROM meta').fetchall())
+
+    def reset(self, meta: Dict[str, str]):
+        # Drops every event table, a catalog holds the events of one build only
+        for (name,) in self._connection.execute('SELECT name FROM spans').fetchall():
+            self._connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+        self._connection.execute('DELETE FROM spans')
+        self._connection.execute('DELETE FROM meta')
+        self._connection.executemany('INSERT INTO meta (name, value) VALUES (?, ?)', list(meta.items()))
+        self._connection.commit()
+
+    def create(self, table: str, keys: List[str], dtype: np.dtype):
+        # Key columns are text, the other columns follow the event dtype after its time
+        columns = [f'"{key}" TEXT' for key in keys] + ['time INTEGER'] + \
+            [f'"{name}" {self.SQL_TYPES[dtype[name].kind]}' for name in dtype.names[1:]]
+        self._connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(columns)})')
+        self._connection.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_keys" ON "{table}" ({", ".join(keys + ["time"])})')
+        self._connection.execute('INSERT OR IGNORE INTO spans (name, start, end) VALUES (?, NULL, NULL)', (table,))
+        self._connection.commit()
+
+    def insert(self, table: str, keys: Dict[str, Any], events: np.ndarray):
+        names = list(keys) + list(events.dtype.names)
+        columns = [[value] * len(events) for value in keys.values()] + \
+            [events['time'].astype(np.int64).tolist()] + [events[name].tolist() for name in events.dtype.names[1:]]
+        self._connection.executemany(
+            f'INSERT INTO "{table}" ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+            list(zip(*columns)))
+        self._connection.commit()
+
+    def set_span(self, table: str, start: datetime, end: datetime):
+        self._connection.execute('UPDATE spans SET start = ?, end = ? WHERE name = ?',
+                                 (self.__get_time(start), self.__get_time(end), table))
+        self._connection.commit()
+
+    def get_span(self, table: str) -> Optional[Tuple[datetime, datetime]]:
+        row = self._connection.execute('SELECT start, end FROM spans WHERE name = ?', (table,)).fetchone()
+        if row == None or row[0] == None:
+            return None
+        return np.datetime64(row[0], 'us').astype(datetime), np.datetime64(row[1], 'us').astype(datetime)
+
+    def select(self, table: str, keys: Dict[str, Any], start: datetime, end: datetime, dtype: np.dtype) -> np.ndarray:
+        # Events of start..end in time order as an array of dtype
+        where = ' AND '.join([f'"{key}" = ?' for key in keys] + ['time >= ?', 'time < ?'])
+        rows = self._connection.execute(
+            f'SELECT {", ".join(dtype.names)} FROM "{table}" WHERE {where} ORDER BY time',
+            list(keys.values()) + [self.__get_time(start), self.__get_time(end)]).fetchall()
+        events = np.array(rows, dtype=[('time', 'i8')] + [(name, dtype[name]) for name in dtype.names[1:]])
+        return events.astype(dtype)
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,136 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import numpy.polynomial.chebyshev as chebyshev
+import swisseph as swe
+
+
+class ChebyshevEphemeris:
+    DEGREE = 13
+
+    # Julian Day of 2000-01-01 12:00 UT, origin of the segment grid
+    ORIGIN_JD = 2451545.0
+
+    SEGMENT_DAYS = {
+        swe.SUN: 32.0,  # type: ignore
+        swe.MOON: 8.0,  # type: ignore
+        swe.MERCURY: 8.0,  # type: ignore
+        swe.VENUS: 16.0,  # type: ignore
+        swe.MARS: 16.0,  # type: ignore
+        swe.JUPITER: 16.0,  # type: ignore
+        swe.SATURN: 16.0,  # type: ignore
+        swe.TRUE_NODE: 4.0,  # type: ignore
+    }
+
+    SEGMENT_DAYS_DEFAULT = 4.0
+
+    AYANAMSA_SEGMENT_DAYS = 366.0
+
+    # A segment that misses the tolerance is split in halves up to this many times,
+    # then it is computed by Swiss Ephemeris itself. Splitting does not help at the
+    # small steps of the Swiss Ephemeris output, which no polynomial follows.
+    SPLIT_LEVEL_MAX = 4
+
+    CHECK_POINTS = 2 * DEGREE
+
+    AYANAMSA = 'AYANAMSA'
+
+    def __init__(self, tolerance_arcsec: float):
+        self.tolerance = tolerance_arcsec / 3600
+        self._nodes = np.cos(np.pi * (np.arange(self.DEGREE + 1) + 0.5) /
+                             (self.DEGREE + 1))
+        self._checks = np.linspace(-1, 1, self.CHECK_POINTS)
+        self._segments: Dict[Any, Dict[int, Optional[Tuple[np.ndarray, np.ndarray]]]] = {}
+        self._errors: Dict[Any, float] = {}
+        self._fallbacks: Dict[Any, int] = {}
+
+    def get_body(self, body: int, jd: Any) -> Tuple[Any, Any]:
+        longitude, speed = self.__evaluate(
+            body, self.SEGMENT_DAYS.get(body, self.SEGMENT_DAYS_DEFAULT), jd,
+            lambda x: swe.calc_ut(x, body)[0][0],  # type: ignore
+            lambda x: swe.calc_ut(x, body, swe.FLG_SPEED)[0][0:4:3])  # type: ignore
+        return longitude % 360, speed
+
+    def get_ayanamsa(self, sid_mode: int, jd: Any) -> Tuple[Any, Any]:
+        # Without a fit the speed is the daily difference, as AyanamsaProvider gives it
+        return self.__evaluate(
+            f"{self.AYANAMSA}_{sid_mode}", self.AYANAMSA_SEGMENT_DAYS, jd,
+            lambda x: swe.get_ayanamsa_ut(x),  # type: ignore
+            lambda x: (swe.get_ayanamsa_ut(x), swe.get_ayanamsa_ut(x + 0.5) - swe.get_ayanamsa_ut(x - 0.5)))  # type: ignore
+
+    def prepare(self, body: int, start: float, end: float):
+        self.get_body(body, np.arange(start, end + 1))
+
+    def get_errors(self) -> Dict[Any, float]:
+        # Largest deviation from Swiss Ephemeris seen at the check points of every
+        # fitted segment, in arcseconds
+        return {key: error * 3600 for key, error in self._errors.items()}
+
+    def get_fallbacks(self) -> Dict[Any, int]:
+        # Segments computed by Swiss Ephemeris as no fit met the tolerance
+        return dict(self._fallbacks)
+
+    def __evaluate(self, key: Any, length: float, jd: Any, calc: Callable[[float], float],
+                   exact: Callable[[float], Tuple[float, float]]):
+        scalar = np.ndim(jd) == 0
+        jd = np.atleast_1d(np.asarray(jd, dtype=np.float64))
+        position = (jd - self.ORIGIN_JD) / length
+        base = np.floor(position).astype(np.int64)
+        offset = position - base
+
+        value = np.empty_like(jd)
+        speed = np.empty_like(jd)
+        segments = self._segments.setdefault(key, {})
+
+        order = np.argsort(base, kind='stable')
+        indexes, starts = np.unique(base[order], return_index=True)
+        for index, rows in zip(indexes.tolist(), np.split(order, starts[1:])):
+            if index not in segments:
+                segments[index] = self.__fit(
+                    key, self.ORIGIN_JD + index * length, length, calc)
+            segment = segments[index]
+            if segment == None:
+                rows_jd = jd[rows].tolist()
+                value[rows] = [exact(x)[0] for x in rows_jd]
+                speed[rows] = [exact(x)[1] for x in rows_jd]
+                continue
+            coefficients, derivatives = segment
+            parts = len(coefficients)
+            scaled = offset[rows] * parts
+            part = np.minimum(scaled.astype(np.int64), parts - 1)
+            x = 2 * (scaled - part) - 1
+            value[rows] = chebyshev.chebval(
+                x, coefficients[part].T, tensor=False)
+            speed[rows] = chebyshev.chebval(
+                x, derivatives[part].T, tensor=False) * 2 * parts / length
+
+        if scalar:
+            return float(value[0]), float(speed[0])
+        return value, speed
+
+    def __fit(self, key: Any, start: float, length: float, calc: Callable[[float], float]):
+        for level in range(self.SPLIT_LEVEL_MAX + 1):
+            parts = 2 ** level
+            part_length = length / parts
+            coefficients = []
+            error = 0.0
+            for part in range(parts):
+                part_start = start + part * part_length
+                values = np.unwrap(
+                    [calc(part_start + (x + 1) * part_length / 2) for x in self._nodes], period=360)
+                coefficient = chebyshev.chebfit(
+                    self._nodes, values, self.DEGREE)
+                checks = np.array(
+                    [calc(part_start + (x + 1) * part_length / 2) for x in self._checks])
+                deviation = (chebyshev.chebval(
+                    self._checks, coefficient) - checks + 180) % 360 - 180
+                error = max(error, float(np.abs(deviation).max()))
+                coefficients.append(coefficient)
+            if error <= self.tolerance:
+                break
+        else:
+            self._fallbacks[key] = self._fallbacks.get(key, 0) + 1
+            return None
+
+        self._errors[key] = max(self._errors.get(key, 0.0), error)
+        coefficients = np.array(coefficients)
+        return coefficients, chebyshev.chebder(coefficients, axis=1)
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Dict, Tuple
+import hashlib
+import pickle
+import os
+import numpy as np
+
+
+class ScanCheckpoint:
+    # Event arrays of the finished chunks of a scan, appended one record per chunk as
+    # the chunks finish. A rerun of the same scan takes them back instead of scanning.
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get_key(self, *parts: object) -> str:
+        return hashlib.sha1(repr((self.VERSION,) + parts).encode()).hexdigest()
+
+    def load(self, key: str) -> Dict[Tuple[datetime, datetime], np.ndarray]:
+        chunks: Dict[Tuple[datetime, datetime], np.ndarray] = {}
+        size = 0
+        try:
+            with open(self.path, 'rb') as f:
+                while True:
+                    try:
+                        chunk_key, start, end, events = pickle.load(f)
+                    except Exception:
+                        break
+                    size = f.tell()
+                    if chunk_key == key:
+                        chunks[(start, end)] = events
+        except FileNotFoundError:
+            return chunks
+
+        # A record cut by a crash is dropped, so records appended after it stay readable
+        os.truncate(self.path, size)
+        return chunks
+
+    def add(self, key: str, start: datetime, end: datetime, events: np.ndarray):
+        with open(self.path, 'ab') as f:
+            pickle.dump((key, start, end, events), f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,8 +1,9 @@
 from argparse import ArgumentParser
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 from common.handler import Handler
+from common.timezone import get_time_zone
 
 
 @dataclass
@@ -13,17 +14,45 @@ class ArgsCommon:
     end: Optional[str]
     threads_max:  Optional[int]
     no_threads: Optional[bool]
+    exact: Optional[bool]
+    tolerance: Optional[float]
+    cache: Optional[str]
+    cache_size: Optional[int]
+    backend: Optional[str]
+    backend_tolerance: Optional[float]
+    results_cache: Optional[str]
+    results_cache_size: Optional[int]
+    checkpoint: Optional[str]
+    timezone: Optional[str]
+    format: Optional[str]
+    output: Optional[str]
+    profile: Optional[str]
+    profile_output: Optional[str]
+    profile_dump: Optional[str]
 
 
 @dataclass
 class ArgsConjuctionParsed(ArgsCommon):
+    catalog: Optional[str]
     accuracy: Optional[float]
     planet1: Optional[str]
     planet2: Optional[str]
 
 
+@dataclass
+class ArgsAspectParsed(ArgsCommon):
+    planet1: Optional[str]
+    planet2: Optional[str]
+    planets: Optional[List[str]]
+    all: Optional[bool]
+    angles: Optional[List[float]]
+    orb: Optional[float]
+    orbs: Optional[List[str]]
+
+
 @dataclass
 class ArgsTransitParsed(ArgsCommon):
+    catalog: Optional[str]
     planet: Optional[str]
     sign: Optional[str]
     all: Optional[bool]
@@ -32,6 +61,7 @@ class ArgsTransitParsed(ArgsCommon):
 
 @dataclass
 class ArgsRetroParsed(ArgsCommon):
+    catalog: Optional[str]
     planet: Optional[str]
 
 
@@ -41,24 +71,78 @@ class ArgsPlanetsParsed:
 
 
 @dataclass
-class Cli(Handler):
-    _subparsers: Optional[Any] = None
+class ArgsBatchParsed:
+    input: Optional[str]
+    output: Optional[str]
+    cache: Optional[str]
+    cache_size: Optional[int]
+    backend: Optional[str]
+    backend_tolerance: Optional[float]
+    timezone: Optional[str]
+    format: Optional[str]
+    profile: Optional[str]
+    profile_output: Optional[str]
+    profile_dump: Optional[str]
 
-    PERFORMANCE_MESS = 'PERFORMANCE'
 
-    ACCURACY_MESS = 'ACCURACY'
+@dataclass
+class ArgsCatalogParsed:
+    output: Optional[str]
+    start: Optional[str]
+    end: Optional[str]
+    planets: Optional[List[str]]
+    tolerance: Optional[float]
+    no_threads: Optional[bool]
+    threads_max: Optional[int]
+    cache: Optional[str]
+    cache_size: Optional[int]
+    backend: Optional[str]
+    backend_tolerance: Optional[float]
+    profile: Optional[str]
+    profile_output: Optional[str]
+    profile_dump: Optional[str]
+
+
+@dataclass
+class ArgsServerParsed:
+    host: Optional[str]
+    port: Optional[int]
+    threads_max: Optional[int]
+    cache_entries: Optional[int]
+    timezone: Optional[str]
+    cache: Optional[str]
+    cache_size: Optional[int]
+    backend: Optional[str]
+    backend_tolerance: Optional[float]
+
+
+@dataclass
+class ArgsBenchmarkParsed:
+    command: Optional[str]
+    profile: Optional[str]
+    output: Optional[str]
+    repeat: Optional[int]
+    baseline: Optional[str]
+    current: Optional[str]
+    threshold: Optional[float]
+    cache: Optional[str]
+    cache_size: Optional[int]
+    backend: Optional[str]
+    backend_tolerance: Optional[float]
 
-    COMMAND_CONJUCTION = 'conjuction'
 
-    COMMAND_TRANSIT = 'transit'
+@dataclass
+class Cli(Handler):
+    _subparsers: Optional[Any] = None
 
-    COMMAND_RETRO = 'retro'
+    PERFORMANCE_MESS = 'PERFORMANCE'
 
-    COMMAND_PLANETS = 'planet'
+    ACCURACY_MESS = 'ACCURACY'
 
     command = ''
     start: Optional[datetime] = None
     end: Optional[datetime] = None
+    orbs: Optional[Dict[float, float]] = None
     args_conjuction = ArgsConjuctionParsed(
         command=None,
         start=None,
@@ -67,6 +151,22 @@ class Cli(Handler):
         accuracy=None,
         no_threads=None,
         threads_max=None,
+        exact=None,
+        tolerance=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None,
+        results_cache=None,
+        results_cache_size=None,
+        checkpoint=None,
+        timezone=None,
+        format=None,
+        output=None,
+        profile=None,
+        profile_output=None,
+        profile_dump=None,
+        catalog=None,
         planet1=None,
         planet2=None
     )
@@ -78,6 +178,22 @@ class Cli(Handler):
         step=None,
         no_threads=None,
         threads_max=None,
+        exact=None,
+        tolerance=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None,
+        results_cache=None,
+        results_cache_size=None,
+        checkpoint=None,
+        timezone=None,
+        format=None,
+        output=None,
+        profile=None,
+        profile_output=None,
+        profile_dump=None,
+        catalog=None,
         planet=None,
         sign=None,
         all=None,
@@ -91,13 +207,165 @@ class Cli(Handler):
         step=None,
         no_threads=None,
         threads_max=None,
+        exact=None,
+        tolerance=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None,
+        results_cache=None,
+        results_cache_size=None,
+        checkpoint=None,
+        timezone=None,
+        format=None,
+        output=None,
+        profile=None,
+        profile_output=None,
+        profile_dump=None,
+        catalog=None,
         planet=None,
     )
 
+    args_aspect = ArgsAspectParsed(
+        command=None,
+        start=None,
+        end=None,
+        step=None,
+        no_threads=None,
+        threads_max=None,
+        exact=None,
+        tolerance=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None,
+        results_cache=None,
+        results_cache_size=None,
+        checkpoint=None,
+        timezone=None,
+        format=None,
+        output=None,
+        profile=None,
+        profile_output=None,
+        profile_dump=None,
+        planet1=None,
+        planet2=None,
+        planets=None,
+        all=None,
+        angles=None,
+        orb=None,
+        orbs=None
+    )
+
     args_planets = ArgsPlanetsParsed(
         all=None
     )
 
+    args_batch = ArgsBatchParsed(
+        input=None,
+        output=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None,
+        timezone=None,
+        format=None,
+        profile=None,
+        profile_output=None,
+        profile_dump=None
+    )
+
+    args_catalog = ArgsCatalogParsed(
+        output=None,
+        start=None,
+        end=None,
+        planets=None,
+        tolerance=None,
+        no_threads=None,
+        threads_max=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None,
+        profile=None,
+        profile_output=None,
+        profile_dump=None
+    )
+
+    args_server = ArgsServerParsed(
+        host=None,
+        port=None,
+        threads_max=None,
+        cache_entries=None,
+        timezone=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None
+    )
+
+    args_benchmark = ArgsBenchmarkParsed(
+        command=None,
+        profile=None,
+        output=None,
+        repeat=None,
+        baseline=None,
+        current=None,
+        threshold=None,
+        cache=None,
+        cache_size=None,
+        backend=None,
+        backend_tolerance=None
+    )
+
+    def argparse_benchmark(self):
+        parser = ArgumentParser(
+            description='Astro scanners benchmark: time every scanner over a matrix of ranges, steps and workers, compare against a baseline')
+        subparsers = parser.add_subparsers(title='Commands', dest='command')
+
+        subparser = subparsers.add_parser(
+            name=self.COMMAND_BENCHMARK_RUN, description='Run the benchmark cases of a profile')
+        subparser.add_argument('--profile', type=str, choices=[self.BENCHMARK_PROFILE_SMOKE, self.BENCHMARK_PROFILE_FULL],
+                               help=f"Cases matrix, smoke runs in seconds: str [{self.BENCHMARK_PROFILE_DEFAULT}]", required=False)
+        subparser.add_argument('-o', '--output', type=str,
+                               help=f"JSON results file: str [None]", required=False)
+        subparser.add_argument('-r', '--repeat', type=int,
+                               help=f"Timed runs per case, the best is kept: int [{self.BENCHMARK_REPEAT_DEFAULT}]", required=False)
+        self.__set_backend_args(subparser=subparser)
+
+        subparser = subparsers.add_parser(
+            name=self.COMMAND_BENCHMARK_COMPARE, description='Compare JSON results with a baseline, exits with 1 on slowdowns')
+        subparser.add_argument('baseline', type=str, help=f"Baseline JSON results file: str")
+        subparser.add_argument('current', type=str, help=f"Current JSON results file: str")
+        subparser.add_argument('--threshold', type=float,
+                               help=f"Allowed slowdown ratio: float [{self.BENCHMARK_THRESHOLD_DEFAULT}]", required=False)
+
+        args: Any = parser.parse_args()
+
+        self.command = args.command
+
+        if (self.command == None):
+            print(f"Command is not passed, try add -h|-help parameter")
+
+        self.args_benchmark = args
+
+    def argparse_server(self):
+        parser = ArgumentParser(
+            description='Astro compute HTTP server: POST a JSON query to /conjuction, /transit or /retro, GET /planet')
+        parser.add_argument('--host', type=str,
+                            help=f"Listen address: str [{self.SERVER_HOST_DEFAULT}]", required=False)
+        parser.add_argument('-p', '--port', type=int,
+                            help=f"Listen port: int [{self.SERVER_PORT_DEFAULT}]", required=False)
+        parser.add_argument(
+            '--threads-max', type=int, help=f"Worker processes max ({self.PERFORMANCE_MESS}): int [{self.THREAD_MAX_DEFAULT}]", required=False)
+        parser.add_argument(
+            '--cache-entries', type=int, help=f"Results kept in memory ({self.PERFORMANCE_MESS}): int [{self.SERVER_CACHE_ENTRIES_DEFAULT}]", required=False)
+        self.__set_timezone_args(subparser=parser)
+        self.__set_backend_args(subparser=parser)
+
+        self.args_server = parser.parse_args()
+        self.__check_timezone(self.args_server.timezone)
+
     def argparse(self):
         parser = ArgumentParser(description='Astro compute utility')
         self._subparsers = parser.add_subparsers(
@@ -105,15 +373,35 @@ class Cli(Handler):
 
         subparser = self.__set_conjuction_args()
         self.set_common_args(subparser=subparser)
+        self.__set_exact_args(subparser=subparser)
+        self.__set_catalog_args(subparser=subparser)
 
         subparser = self.__set_transit_args()
         self.set_common_args(subparser=subparser)
+        self.__set_exact_args(subparser=subparser)
+        self.__set_catalog_args(subparser=subparser)
 
         subparser = self.__set_retro_args()
         self.set_common_args(subparser=subparser)
+        self.__set_exact_args(subparser=subparser)
+        self.__set_catalog_args(subparser=subparser)
+
+        subparser = self.__set_aspect_args()
+        self.set_common_args(subparser=subparser)
+        self.__set_exact_args(subparser=subparser)
 
         subparser = self.__set_planets_args()
 
+        subparser = self.__set_batch_args()
+        self.__set_timezone_args(subparser=subparser)
+        self.__set_format_args(subparser=subparser)
+        self.__set_backend_args(subparser=subparser)
+        self.__set_profile_args(subparser=subparser)
+
+        subparser = self.__set_catalog_build_args()
+        self.__set_backend_args(subparser=subparser)
+        self.__set_profile_args(subparser=subparser)
+
         args: Any = parser.parse_args()
 
         self.command = args.command
@@ -130,8 +418,18 @@ class Cli(Handler):
         elif (self.command == self.COMMAND_RETRO):
             self.args_retro = args
             self._cast_args(args)
+        elif (self.command == self.COMMAND_ASPECT):
+            self.args_aspect = args
+            self._cast_args(args)
+            self.__cast_orbs(args)
         elif (self.command == self.COMMAND_PLANETS):
             self.args_planets = args
+        elif (self.command == self.COMMAND_BATCH):
+            self.args_batch = args
+            self.__check_timezone(args.timezone)
+        elif (self.command == self.COMMAND_CATALOG):
+            self.args_catalog = args
+            self.__cast_dates(args)
 
     def __get_clean_time_format(self):
         return str(self.TIME_FORMAT).replace('%', '')
@@ -162,6 +460,47 @@ class Cli(Handler):
 
         return subparser
 
+    def __set_batch_args(self):
+        if (self._subparsers == None):
+            print(f"Subparser is None in __set_batch_args")
+            return
+
+        subparser = self._subparsers.add_parser(
+            name=self.COMMAND_BATCH, description='Run conjuction, transit and retro queries from a JSONL file, one result file per query')
+
+        subparser.add_argument('-i', '--input', type=str,
+                               help=f"Queries JSONL file, one object per line with id, command, start, end, step and the command arguments: str", required=True)
+        subparser.add_argument('-o', '--output', type=str,
+                               help=f"Directory for the result files <id>.txt: str [{self.BATCH_OUTPUT_DIR_DEFAULT}]", required=False)
+
+        return subparser
+
+    def __set_catalog_build_args(self):
+        if (self._subparsers == None):
+            print(f"Subparser is None in __set_catalog_build_args")
+            return
+
+        subparser = self._subparsers.add_parser(
+            name=self.COMMAND_CATALOG, description='Build the event catalog: exact sign and nakshatra ingresses, retro stations and conjuctions of every pair over a span')
+
+        time_format = self.__get_clean_time_format()
+        subparser.add_argument('-o', '--output', type=str,
+                               help=f"SQLite catalog file, rebuilt when it exists: str", required=True)
+        subparser.add_argument(
+            '--start', type=str, help=f"Span start date: str '{time_format}' [{self.CATALOG_START_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '-e', '--end', type=str, help=f"Span end date: str '{time_format}' [{self.CATALOG_END_DEFAULT}]", required=False)
+        subparser.add_argument('--planets', type=str, nargs='+',
+                               help=f"Planets of the catalog: str [all supported]", required=False)
+        subparser.add_argument(
+            '-t', '--tolerance', type=float, help=f"Exact moment time tolerance in seconds ({self.ACCURACY_MESS}): float [{self.TOLERANCE_SECONDS_DEFAULT}]", required=False)
+        subparser.add_argument('--no-threads', action='store_true',
+                               help=f"Without multithreading ({self.PERFORMANCE_MESS}): bool [{self.WITH_TREADS_DEFAULT == False}]", required=False)
+        subparser.add_argument(
+            '--threads-max', type=int, help=f"Threads max ({self.PERFORMANCE_MESS}): int [{self.THREAD_MAX_DEFAULT}]", required=False)
+
+        return subparser
+
     def __set_transit_args(self):
         if (self._subparsers == None):
             print(f"Subparser is None in _set_transit_args")
@@ -181,6 +520,29 @@ class Cli(Handler):
 
         return subparser
 
+    def __set_aspect_args(self):
+        if (self._subparsers == None):
+            print(f"Subparser is None in __set_aspect_args")
+            return
+        subparser = self._subparsers.add_parser(
+            name=self.COMMAND_ASPECT, description='Get planet aspects, every requested angle in one scan')
+
+        subparser.add_argument('-p1', '--planet1', type=str,
+                               help=f"Planet 1: str [SUN]", required=False)
+        subparser.add_argument('-p2', '--planet2', type=str,
+                               help=f"Planet 2: str [MOON]", required=False)
+        subparser.add_argument('--planets', type=str, nargs='+',
+                               help=f"Scan every pair of these planets in one sweep instead of planet 1 and 2: str [None]", required=False)
+        subparser.add_argument('-a', '--all', action='store_true',
+                               help=f"Scan every pair of all supported planets: bool [False]", required=False)
+        subparser.add_argument('--angles', type=float, nargs='+',
+                               help=f"Aspect angles in degrees 0..180: float [{' '.join(f'{angle:g}' for angle in self.ASPECT_ANGLES_DEFAULT)}]", required=False)
+        subparser.add_argument('--orb', type=float,
+                               help=f"Degrees aspect orb in step mode ({self.ACCURACY_MESS}): float [{self.ACCURACY_DEFAULT}]", required=False)
+        subparser.add_argument('--orbs', type=str, nargs='+',
+                               help=f"Degrees orbs of some angles in step mode, the others take --orb ({self.ACCURACY_MESS}): str 'angle:orb' [None]", required=False)
+        return subparser
+
     def __set_conjuction_args(self):
         if (self._subparsers == None):
             print(f"Subparser is None in _set_conjuction_args")
@@ -196,20 +558,88 @@ class Cli(Handler):
                                help=f"Planet 2: str [MOON]", required=False)
         return subparser
 
+    def __set_exact_args(self, subparser: Any):
+        subparser.add_argument('-x', '--exact', action='store_true',
+                               help=f"Solve exact moments instead of step scanning ({self.PERFORMANCE_MESS}/{self.ACCURACY_MESS}): bool [{self.EXACT_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '-t', '--tolerance', type=float, help=f"Exact moment time tolerance in seconds ({self.ACCURACY_MESS}): float [{self.TOLERANCE_SECONDS_DEFAULT}]", required=False)
+
+    def __set_catalog_args(self, subparser: Any):
+        subparser.add_argument(
+            '--catalog', type=str, help=f"Event catalog file, exact queries inside its span are read from it ({self.PERFORMANCE_MESS}): str [{self.CATALOG_DEFAULT}]", required=False)
+
     def set_common_args(self, subparser: Any):
         time_format = self.__get_clean_time_format()
         subparser.add_argument(
             '--start', type=str, help=f"Start date: str '{time_format}' [{self.START_DEFAULT}]", required=False)
         subparser.add_argument(
             '-e', '--end', type=str, help=f"End date: str '{time_format}' [{self.END_DEFAULT}]", required=False)
+        self.__set_timezone_args(subparser=subparser)
+        self.__set_format_args(subparser=subparser)
+        subparser.add_argument(
+            '-o', '--output', type=str, help=f"Write the results to this file: str [stdout]", required=False)
         subparser.add_argument('--no-threads', action='store_true',
                                help=f"Without multithreading ({self.PERFORMANCE_MESS}): bool [{self.WITH_TREADS_DEFAULT == False}]", required=False)
         subparser.add_argument(
             '--threads-max', type=int, help=f"Threads max ({self.PERFORMANCE_MESS}): int [{self.THREAD_MAX_DEFAULT}]", required=False)
         subparser.add_argument(
             '-s', '--step', type=int, help=f"Step in minutes ({self.PERFORMANCE_MESS}/{self.ACCURACY_MESS}): int [{self.STEP_MINUTES_DEFAULT}]", required=False)
+        self.__set_backend_args(subparser=subparser)
+        subparser.add_argument(
+            '--results-cache', type=str, help=f"Found events cache directory, reruns scan only the uncovered time ({self.PERFORMANCE_MESS}): str [{self.RESULTS_CACHE_DIR_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '--results-cache-size', type=int, help=f"Found events cache size limit in MB ({self.PERFORMANCE_MESS}): int [{self.RESULTS_CACHE_SIZE_MB_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '--checkpoint', type=str, help=f"Scan progress file, a rerun after a failure resumes from the finished chunks ({self.PERFORMANCE_MESS}): str [{self.CHECKPOINT_DEFAULT}]", required=False)
+        self.__set_profile_args(subparser=subparser)
+
+    def __set_profile_args(self, subparser: Any):
+        subparser.add_argument(
+            '--profile', type=str, nargs='?', const=self.PROFILE_FORMAT_TABLE, choices=[self.PROFILE_FORMAT_TABLE, self.PROFILE_FORMAT_JSON], help=f"Show calls, points and time per phase at the end ({self.PERFORMANCE_MESS}): str [{self.PROFILE_FORMAT_TABLE} when passed]", required=False)
+        subparser.add_argument(
+            '--profile-output', type=str, help=f"Write the profile to this file instead of the output ({self.PERFORMANCE_MESS}): str [None]", required=False)
+        subparser.add_argument(
+            '--profile-dump', type=str, help=f"Write cProfile stats of the main process to this file ({self.PERFORMANCE_MESS}): str [None]", required=False)
+
+    def __set_format_args(self, subparser: Any):
+        subparser.add_argument(
+            '--format', type=str, choices=[self.OUTPUT_FORMAT_TEXT, self.OUTPUT_FORMAT_CSV, self.OUTPUT_FORMAT_JSONL, self.OUTPUT_FORMAT_NPY], help=f"Results format, csv, jsonl and npy are written in bulk ({self.PERFORMANCE_MESS}): str [{self.OUTPUT_FORMAT_DEFAULT}]", required=False)
+
+    def __set_timezone_args(self, subparser: Any):
+        subparser.add_argument(
+            '--timezone', type=str, help=f"Timezone of the shown times, IANA name: str [{self.TIME_ZONE_STR_DEFAULT}]", required=False)
+
+    def __set_backend_args(self, subparser: Any):
+        subparser.add_argument(
+            '--cache', type=str, help=f"Ephemeris cache directory ({self.PERFORMANCE_MESS}): str [{self.CACHE_DIR_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '--cache-size', type=int, help=f"Ephemeris cache size limit in MB ({self.PERFORMANCE_MESS}): int [{self.CACHE_SIZE_MB_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '--backend', type=str, choices=[self.BACKEND_SWE, self.BACKEND_CHEBYSHEV], help=f"Ephemeris backend ({self.PERFORMANCE_MESS}): str [{self.BACKEND_DEFAULT}]", required=False)
+        subparser.add_argument(
+            '--backend-tolerance', type=float, help=f"Chebyshev fit tolerance in arcseconds ({self.ACCURACY_MESS}): float [{self.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT}]", required=False)
+
+    def __check_timezone(self, timezone: Optional[str]):
+        if timezone != None:
+            try:
+                get_time_zone(timezone)
+            except Exception as e:
+                print(f"Failed parse argument --timezone: unknown timezone {e}")
+                exit(1)
 
     def _cast_args(self, args: ArgsCommon):
+        self.__check_timezone(args.timezone)
+        self.__cast_dates(args)
+
+    def __cast_orbs(self, args: Any):
+        if args.orbs != None:
+            try:
+                self.orbs = self.get_aspect_orbs(args.orbs)
+            except ValueError as e:
+                print(f"Failed parse argument --orbs: {e}")
+                exit(1)
+
+    def __cast_dates(self, args: Any):
         if args.start != None:
             try:
                 self.start = datetime.strptime(args.start, self.TIME_FORMAT)
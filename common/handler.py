@@ -1,7 +1,7 @@
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 @dataclass
@@ -48,24 +48,86 @@ class Handler:
 
     planet = Planet()
 
+    planets = [value for name, value in Planet.__dict__.items(
+    ) if not name.startswith('__') and isinstance(value, str)]
+
+    COMMAND_CONJUCTION = 'conjuction'
+
+    COMMAND_TRANSIT = 'transit'
+
+    COMMAND_RETRO = 'retro'
+
+    COMMAND_PLANETS = 'planet'
+
+    COMMAND_BATCH = 'batch'
+
+    COMMAND_ASPECT = 'aspect'
+
+    COMMAND_CATALOG = 'catalog'
+
+    COMMAND_BENCHMARK_RUN = 'run'
+
+    COMMAND_BENCHMARK_COMPARE = 'compare'
+
+    SIGN_DEGREES = 30.0
+    NAKSHATRA_DEGREES = 40 / 3
+    PADA_DEGREES = 10 / 3
+
     SIGN_DEFAULT = 'Овен'
     TIME_ZONE_STR_DEFAULT = 'Asia/Krasnoyarsk'
     TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
     STEP_MINUTES_DEFAULT = 1
     ACCURACY_DEFAULT = 0.001
+    ASPECT_ANGLES_DEFAULT = [0.0, 60.0, 90.0, 120.0, 180.0]
+    ASPECT_NAMES = {
+        0.0: 'Conjunction',
+        60.0: 'Sextile',
+        90.0: 'Square',
+        120.0: 'Trine',
+        180.0: 'Opposition',
+    }
     START_DEFAULT = datetime.now()
-    END_DEFAULT = datetime.now() + timedelta(days=365)
+    END_DAYS_DEFAULT = 365
+    END_DEFAULT = datetime.now() + timedelta(days=END_DAYS_DEFAULT)
     THREAD_MAX_DEFAULT: Optional[int] = None
     WITH_TREADS_DEFAULT = True
     DEBUG_DEFAULT = False
     ALL_SIGNS_DEFAULT = False
     NAKHATRA_DEFAULT = 'default'
+    EXACT_DEFAULT = False
+    TOLERANCE_SECONDS_DEFAULT = 1.0
+    CACHE_DIR_DEFAULT: Optional[str] = None
+    CACHE_SIZE_MB_DEFAULT = 512
+    BACKEND_SWE = 'swe'
+    BACKEND_CHEBYSHEV = 'chebyshev'
+    BACKEND_DEFAULT = BACKEND_SWE
+    CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT = 0.01
+    RESULTS_CACHE_DIR_DEFAULT: Optional[str] = None
+    RESULTS_CACHE_SIZE_MB_DEFAULT = 64
+    CATALOG_DEFAULT: Optional[str] = None
+    CHECKPOINT_DEFAULT: Optional[str] = None
+    CATALOG_START_DEFAULT = datetime(1900, 1, 1)
+    CATALOG_END_DEFAULT = datetime(2100, 1, 1)
+    BATCH_OUTPUT_DIR_DEFAULT = 'batch'
+    SERVER_HOST_DEFAULT = '127.0.0.1'
+    SERVER_PORT_DEFAULT = 8080
+    SERVER_CACHE_ENTRIES_DEFAULT = 256
+    BENCHMARK_PROFILE_SMOKE = 'smoke'
+    BENCHMARK_PROFILE_FULL = 'full'
+    BENCHMARK_PROFILE_DEFAULT = BENCHMARK_PROFILE_SMOKE
+    BENCHMARK_REPEAT_DEFAULT = 3
+    BENCHMARK_THRESHOLD_DEFAULT = 0.2
+    PROFILE_FORMAT_TABLE = 'table'
+    PROFILE_FORMAT_JSON = 'json'
+    OUTPUT_FORMAT_TEXT = 'text'
+    OUTPUT_FORMAT_CSV = 'csv'
+    OUTPUT_FORMAT_JSONL = 'jsonl'
+    OUTPUT_FORMAT_NPY = 'npy'
+    OUTPUT_FORMAT_DEFAULT = OUTPUT_FORMAT_TEXT
 
     def _show_all_planets(self):
-        planets = [value for name, value in Planet.__dict__.items(
-        ) if not name.startswith('__') and isinstance(value, str)]
         separator = ', '
-        result = separator.join(planets)
+        result = separator.join(self.planets)
         print(result)
 
     def find_nakshatra_index(self, name: str):
@@ -96,10 +158,20 @@ class Handler:
                 pass
         return res
 
+    def get_aspect_orbs(self, values: List[str]) -> Dict[float, float]:
+        # Orbs of aspect angles from 'angle:orb' values, ordered by angle
+        orbs: Dict[float, float] = {}
+        for value in values:
+            angle, _, orb = value.partition(':')
+            try:
+                orbs[float(angle)] = float(orb)
+            except ValueError:
+                raise ValueError(f"Aspect orb must be 'angle:orb': {value}")
+        return dict(sorted(orbs.items()))
+
     def _get_nakshatra(self, longitude: float):
-        nakshatra_diaposone = 13.3333333333333
-        nakshatra_index = int(longitude // nakshatra_diaposone)
-        pada_index = int((longitude % nakshatra_diaposone) // 3.3333333333333)
+        nakshatra_index = int(longitude // self.NAKSHATRA_DEGREES)
+        pada_index = min(int((longitude % self.NAKSHATRA_DEGREES) // self.PADA_DEGREES), 3)
         if nakshatra_index < 0 or nakshatra_index >= len(self.nakshatras):
             raise ValueError(
                 f"Долгота выходит за пределы допустимого диапазона для накшатры. {nakshatra_index}, {longitude}")
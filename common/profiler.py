@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import json
+
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    # Report format, table or json, None keeps the counters silent
+    format: Optional[str]
+    output: Optional[str]
+    # cProfile stats file of the main process
+    dump: Optional[str]
+
+
+class Profiler:
+    # Calls, processed points and seconds per phase of this process. Counting of
+    # blocks and chunks is always on, worker processes send their counters back with
+    # every chunk. Single point lookups are only counted while enabled, as timing them
+    # costs as much as some of the lookups. Phases nest, a snapshot includes the
+    # ephemeris calls made for it.
+
+    def __init__(self):
+        self._counters: Dict[str, List[float]] = {}
+        self.enabled = False
+
+    def add(self, phase: str, seconds: float, calls: int = 1, points: int = 0):
+        counter = self._counters.get(phase)
+        if counter == None:
+            counter = self._counters[phase] = [0, 0, 0.0]
+        counter[0] += calls
+        counter[1] += points
+        counter[2] += seconds
+
+    def get_counters(self) -> Dict[str, List[float]]:
+        return {phase: list(counter) for phase, counter in self._counters.items()}
+
+    def merge(self, counters: Dict[str, List[float]]):
+        for phase, (calls, points, seconds) in counters.items():
+            self.add(phase, seconds, int(calls), int(points))
+
+    def reset(self):
+        self._counters = {}
+
+    def get_report(self, wall: float, workers: int) -> Dict[str, Any]:
+        phases = []
+        for phase, (calls, points, seconds) in sorted(self._counters.items(), key=lambda item: -item[1][2]):
+            phases.append({
+                'phase': phase,
+                'calls': int(calls),
+                'points': int(points),
+                'seconds': seconds,
+                'points_per_second': points / seconds if points and seconds > 0 else None,
+            })
+        return {'wall_seconds': wall, 'workers': workers, 'phases': phases}
+
+    def format_report(self, report: Dict[str, Any], format: str) -> str:
+        if format == 'json':
+            return json.dumps(report, indent=2)
+
+        lines = [f"Profile, wall: {report['wall_seconds']:.3f}s, workers: {report['workers']}, phase seconds are summed over processes",
+                 f"{'phase':<24}{'calls':>12}{'points':>12}{'seconds':>12}{'points/s':>14}"]
+        for phase in report['phases']:
+            rate = f"{phase['points_per_second']:.0f}" if phase['points_per_second'] != None else '-'
+            lines.append(
+                f"{phase['phase']:<24}{phase['calls']:>12}{phase['points']:>12}{phase['seconds']:>12.4f}{rate:>14}")
+        return '\n'.join(lines)
+
+
+profiler = Profiler()
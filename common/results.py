@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import hashlib
+import pickle
+import os
+import numpy as np
+
+
+class ResultCache:
+    # Bump when stored results change meaning, source changes invalidate anyway
+    VERSION = 2
+
+    SOURCE_DIRS = ['common', 'lib']
+
+    def __init__(self, path: str, max_bytes: int, ephe_path: str):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ephe_path = ephe_path
+        self._fingerprint: Optional[str] = None
+        os.makedirs(self.path, exist_ok=True)
+
+    def __get_fingerprint(self) -> str:
+        # Sources of the scanners and the ephemeris files in use, results computed
+        # with other versions of either are never reused
+        if self._fingerprint == None:
+            digest = hashlib.sha1(str(self.VERSION).encode())
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            for directory in self.SOURCE_DIRS:
+                for name in sorted(os.listdir(os.path.join(root, directory))):
+                    if name.endswith('.py'):
+                        with open(os.path.join(root, directory, name), 'rb') as f:
+                            digest.update(name.encode())
+                            digest.update(f.read())
+            if os.path.isdir(self.ephe_path):
+                for entry in sorted(os.scandir(self.ephe_path), key=lambda entry: entry.name):
+                    stat = entry.stat()
+                    digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime}".encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def get_key(self, *parts: Any) -> str:
+        return hashlib.sha1(repr((self.__get_fingerprint(),) + parts).encode()).hexdigest()
+
+    def __get_file(self, key: str):
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def load(self, key: str) -> Tuple[Optional[datetime], List[Tuple[datetime, datetime]], Optional[np.ndarray]]:
+        # Grid origin the spans were scanned from, covered spans and the event array
+        # of the scanner found in them, sorted by time
+        file = self.__get_file(key)
+        try:
+            with open(file, 'rb') as f:
+                anchor, spans, events = pickle.load(f)
+            os.utime(file)
+            return anchor, spans, events
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, ValueError):
+            return None, [], None
+
+    def save(self, key: str, anchor: datetime, spans: List[Tuple[datetime, datetime]], events: np.ndarray):
+        file = self.__get_file(key)
+        temp_file = f"{file}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as f:
+            pickle.dump((anchor, self.merge_spans(spans), events), f)
+        os.replace(temp_file, file)
+        self.__evict(file)
+
+    def merge_spans(self, spans: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+        merged: List[Tuple[datetime, datetime]] = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def get_segments(self, spans: List[Tuple[datetime, datetime]], start: datetime, end: datetime) -> List[Tuple[datetime, datetime, bool]]:
+        # start..end cut into consecutive (start, end, covered) segments
+        segments: List[Tuple[datetime, datetime, bool]] = []
+        current = start
+        for span_start, span_end in self.merge_spans(spans):
+            if span_end <= current or span_start >= end:
+                continue
+            if span_start > current:
+                segments.append((current, span_start, False))
+            segments.append((max(span_start, current), min(span_end, end), True))
+            current = min(span_end, end)
+        if current < end:
+            segments.append((current, end, False))
+        return segments
+
+    def __evict(self, keep: str):
+        files = []
+        total = 0
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
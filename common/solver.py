@@ -0,0 +1,67 @@
+from common.profiler import profiler
+from typing import Callable, Tuple
+import sys
+import time
+
+SECONDS_IN_DAY = 86400.0
+
+EPS = sys.float_info.epsilon
+
+BRENT_MAX_ITER = 100
+
+
+def brent(func: Callable[[float], float], a: float, b: float, fa: float, fb: float, tolerance: float) -> Tuple[float, float]:
+    # Root of func bracketed by a < b, returned as the point within tolerance
+    # that lies on the same side of the root as b
+    if fb == 0:
+        return b, fb
+
+    started = time.perf_counter()
+    evaluations = 0
+    side = fb
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(BRENT_MAX_ITER):
+        if fb * fc > 0:
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+
+        tol = 2 * EPS * abs(b) + 0.5 * tolerance
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or fb == 0:
+            break
+
+        if abs(e) < tol or abs(fa) <= abs(fb):
+            d = e = m
+        else:
+            s = fb / fa
+            if a == c:
+                p = 2 * m * s
+                q = 1 - s
+            else:
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e = d
+                d = p / q
+            else:
+                d = e = m
+
+        a, fa = b, fb
+        b += d if abs(d) > tol else (tol if m > 0 else -tol)
+        fb = func(b)
+        evaluations += 1
+
+    profiler.add('brent', time.perf_counter() - started, points=evaluations)
+    if fb == 0 or fb * side > 0:
+        return b, fb
+    return c, fc
@@ -0,0 +1,44 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Tuple
+import numpy as np
+import swisseph as swe
+
+
+@dataclass
+class TimeGrid:
+    # Points start + i * step for 0 <= i < size. The UT Julian Day of every UTC day is
+    # converted once and the points of the day are arithmetic from it, which follows
+    # UTC leap seconds and ΔT, and gives a point the same Julian Day on any grid.
+    start: datetime
+    step: timedelta
+    size: int
+    _day_jds: Dict[date, float] = field(default_factory=dict, repr=False)
+
+    def __get_day_jd(self, day: date) -> float:
+        jd = self._day_jds.get(day)
+        if jd == None:
+            jd = swe.utc_to_jd(day.year, day.month, day.day, 0, 0, 0, swe.GREG_CAL)[1]  # type: ignore
+            self._day_jds[day] = jd
+        return jd  # type: ignore
+
+    def get_jd(self, index: int) -> float:
+        return float(self.get_block(index, index + 1)[0])
+
+    def get_time(self, index: int) -> datetime:
+        return self.start + index * self.step
+
+    def get_times(self, indexes: np.ndarray) -> np.ndarray:
+        # UTC times of the points as datetime64[us]
+        return np.datetime64(self.start, 'us') + np.asarray(indexes, dtype=np.int64) * np.timedelta64(self.step, 'us')
+
+    def get_block(self, first: int, last: int) -> np.ndarray:
+        times = self.get_times(np.arange(first, last))
+        days = times.astype('datetime64[D]')
+        unique, inverse = np.unique(days, return_inverse=True)
+        day_jds = np.array([self.__get_day_jd(day) for day in unique.tolist()], dtype=np.float64)
+        return day_jds[inverse] + (times - days) / np.timedelta64(1, 'D')
+
+    def blocks(self, size: int, first: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        for block_first in range(first, self.size, size):
+            yield block_first, self.get_block(block_first, min(block_first + size, self.size))
@@ -0,0 +1,48 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, tzinfo
+from typing import Dict, Iterable, List
+import pytz
+
+
+class TimeZone:
+    # UTC to local time over the offset transition table of a pytz zone, gives the
+    # same offsets and tzinfo objects as astimezone without a zone lookup per event
+
+    def __init__(self, name: str):
+        self.name = name
+        self.zone = pytz.timezone(name)
+        transitions = getattr(self.zone, '_utc_transition_times', None)
+        if transitions:
+            self._transitions: List[datetime] = list(transitions)
+            self._offsets: List[timedelta] = [info[0] for info in self.zone._transition_info]  # type: ignore
+            self._tzinfos: List[tzinfo] = [self.zone._tzinfos[info]  # type: ignore
+                                           for info in self.zone._transition_info]  # type: ignore
+        else:
+            # Zones without transitions have one fixed offset
+            self._transitions = [datetime.min]
+            self._offsets = [self.zone.utcoffset(None)]  # type: ignore
+            self._tzinfos = [self.zone]
+
+    def localize(self, utc_times: Iterable[datetime]) -> List[datetime]:
+        # Naive UTC times to aware local times, ascending times continue the search
+        # from the transition of the previous one
+        result: List[datetime] = []
+        index = 0
+        previous = datetime.min
+        for utc_time in utc_times:
+            low = index if utc_time >= previous else 0
+            index = max(0, bisect_right(self._transitions, utc_time, low) - 1)
+            result.append((utc_time + self._offsets[index]).replace(tzinfo=self._tzinfos[index]))
+            previous = utc_time
+        return result
+
+
+_time_zones: Dict[str, TimeZone] = {}
+
+
+def get_time_zone(name: str) -> TimeZone:
+    # Raises pytz.UnknownTimeZoneError for unknown names
+    time_zone = _time_zones.get(name)
+    if time_zone == None:
+        time_zone = _time_zones[name] = TimeZone(name)
+    return time_zone
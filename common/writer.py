@@ -0,0 +1,141 @@
+from common.handler import Handler
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, TextIO, Tuple
+import csv
+import json
+import sys
+import numpy as np
+import pytz
+
+
+@dataclass(frozen=True)
+class OutputConfig:
+    format: str
+    # File to write, None writes to stdout
+    path: Optional[str]
+
+
+@dataclass
+class Field:
+    name: str
+    # Column type in .npy files
+    dtype: str
+    # Names of the values of an index column, rendered next to it in text formats
+    names: Optional[List[str]] = None
+
+
+class Writer:
+    # Records are tuples of field values, the first field is the aware local time
+    BUFFER_ROWS = 1024
+
+    def __init__(self, fields: List[Field], path: Optional[str]):
+        self.fields = fields
+        self.path = path
+        self._rows: List[Tuple] = []
+
+    def write(self, record: Tuple):
+        self._rows.append(record)
+        if len(self._rows) >= self.BUFFER_ROWS:
+            self._flush()
+
+    def close(self):
+        self._flush()
+
+    def _flush(self):
+        self._rows = []
+
+    def _get_header(self) -> List[str]:
+        header: List[str] = []
+        for field in self.fields:
+            header.append(field.name)
+            if field.names != None:
+                header.append(field.name.removesuffix('_index'))
+        return header
+
+    def _render(self, record: Tuple) -> List[Any]:
+        # Names are looked up from the index columns only here
+        row: List[Any] = []
+        for field, value in zip(self.fields, record):
+            row.append(value.isoformat() if isinstance(value, datetime) else value)
+            if field.names != None:
+                row.append(field.names[value])
+        return row
+
+
+class TextStreamWriter(Writer):
+    def __init__(self, fields: List[Field], path: Optional[str]):
+        super().__init__(fields, path)
+        self._stream: TextIO = open(path, 'w', newline='', encoding='utf-8') if path != None else sys.stdout
+
+    def close(self):
+        super().close()
+        if self.path != None:
+            self._stream.close()
+        else:
+            self._stream.flush()
+
+
+class CsvWriter(TextStreamWriter):
+    def __init__(self, fields: List[Field], path: Optional[str]):
+        super().__init__(fields, path)
+        self._csv = csv.writer(self._stream)
+        self._csv.writerow(self._get_header())
+
+    def _flush(self):
+        self._csv.writerows([self._render(record) for record in self._rows])
+        self._stream.flush()
+        super()._flush()
+
+
+class JsonlWriter(TextStreamWriter):
+    def _flush(self):
+        header = self._get_header()
+        if self._rows:
+            self._stream.write(''.join(
+                f"{json.dumps(dict(zip(header, self._render(record))), ensure_ascii=False)}\n" for record in self._rows))
+            self._stream.flush()
+        super()._flush()
+
+
+class NpyWriter(Writer):
+    # One structured array: time as UTC datetime64[us], the UTC offset of the local
+    # time in seconds and the other fields with their own types
+    def __init__(self, fields: List[Field], path: Optional[str]):
+        super().__init__(fields, path)
+        self._columns: List[List[Any]] = [[] for _ in range(len(fields) + 1)]
+
+    def _flush(self):
+        for record in self._rows:
+            local_time: datetime = record[0]
+            offset = local_time.utcoffset()
+            self._columns[0].append(local_time.astimezone(pytz.utc).replace(tzinfo=None))
+            self._columns[1].append(int(offset.total_seconds()) if offset != None else 0)
+            for column, value in zip(self._columns[2:], record[1:]):
+                column.append(value)
+        super()._flush()
+
+    def close(self):
+        super().close()
+        dtype = [(self.fields[0].name, 'datetime64[us]'), ('utc_offset', 'i4')] + \
+            [(field.name, field.dtype) for field in self.fields[1:]]
+        array = np.empty(len(self._columns[0]), dtype=dtype)
+        for (name, column_type), column in zip(dtype, self._columns):
+            array[name] = np.array(column, dtype=column_type)
+        if self.path != None:
+            np.save(self.path, array)
+        else:
+            stream: BinaryIO = sys.stdout.buffer
+            np.save(stream, array)
+            stream.flush()
+
+
+WRITERS: Dict[str, type] = {
+    Handler.OUTPUT_FORMAT_CSV: CsvWriter,
+    Handler.OUTPUT_FORMAT_JSONL: JsonlWriter,
+    Handler.OUTPUT_FORMAT_NPY: NpyWriter,
+}
+
+
+def get_writer(format: str, fields: List[Field], path: Optional[str]) -> Writer:
+    return WRITERS[format](fields, path)
@@ -0,0 +1,272 @@
+from common.astro import Block, GlobalParams, Moment, Scanner, Sign, Snapshot
+from common.writer import Field
+from common.handler import Handler
+from common.solver import SECONDS_IN_DAY, brent
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+
+
+@dataclass
+class AspectParams(GlobalParams):
+    planet1: str
+    planet2: str
+    # All pairs of these planets instead of planet1 and planet2 when not empty
+    planets: List[str] = field(default_factory=list)
+    angles: List[float] = field(default_factory=lambda: list(Handler.ASPECT_ANGLES_DEFAULT))
+    orb: float = Handler.ACCURACY_DEFAULT
+    # Orbs of some of the angles, the others take orb
+    orbs: Dict[float, float] = field(default_factory=dict)
+    exact: bool = Handler.EXACT_DEFAULT
+    tolerance: float = Handler.TOLERANCE_SECONDS_DEFAULT
+
+
+@dataclass
+class Aspects:
+    planet1: Moment
+    planet2: Moment
+    angle: float
+    # Wrapped signed separation planet1 - planet2 in degrees
+    separation: float
+    planet1_name: str
+    planet2_name: str
+
+
+class Aspect(Scanner):
+    # Planets are indexes into Handler.planets
+    EVENT_FIELDS = [('planet1', 'u1'), ('planet2', 'u1'), ('angle', 'f8'), ('separation', 'f8'),
+                    ('longitude1', 'f8'), ('longitude2', 'f8')]
+
+    def find(self, params: AspectParams):
+        yield from self._render_items(self._find_events(params))
+
+    def _find_events(self, params: AspectParams) -> Iterator[np.ndarray]:
+        self._set_params(params)
+
+        self._set_global_params()
+
+        if params.exact:
+            yield from self.__find_exact(params)
+            return
+
+        time_grid, first = self._get_chunk_grid(params, params.step)
+        detect = self._get_detector(params, first)
+        yield from self._detect_blocks(detect, self._get_blocks(time_grid, first, self._get_planets(params)))
+
+    def _get_planets(self, params: AspectParams) -> List[str]:
+        return list(params.planets) if params.planets else [params.planet1, params.planet2]
+
+    def _get_pairs(self, params: AspectParams) -> List[Tuple[str, str]]:
+        if not params.planets:
+            return [(params.planet1, params.planet2)]
+        return self._get_planet_pairs(params.planets)
+
+    def __get_separations(self, snapshot: Snapshot, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        # Wrapped signed separations, one row per pair and one column per point
+        rows1 = [snapshot.get_row(planet1) for planet1, _ in pairs]
+        rows2 = [snapshot.get_row(planet2) for _, planet2 in pairs]
+        return (snapshot.longitude[rows1] - snapshot.longitude[rows2] + 180) % 360 - 180
+
+    def _get_detector(self, params: AspectParams, first: int) -> Callable[[Block], np.ndarray]:
+        # Step mode detection of every requested angle of every pair from one matrix
+        # of separations per block, reporting the points from index first on
+        pairs = self._get_pairs(params)
+        pair_planets = np.array([[self.planets.index(planet1), self.planets.index(planet2)]
+                                 for planet1, planet2 in pairs], dtype=np.int64).reshape(-1, 2)
+
+        def detect(block: Block) -> np.ndarray:
+            snapshot = block.snapshot
+            separation = self.__get_separations(snapshot, pairs)
+            offset = max(first - block.first, 0)
+            distance = np.abs(separation[:, offset:])
+
+            found_indexes: List[np.ndarray] = []
+            found_pairs: List[np.ndarray] = []
+            found_angles: List[np.ndarray] = []
+            for angle in params.angles:
+                pair_indexes, indexes = np.nonzero(np.abs(distance - angle) < self.__get_orb(params, angle))
+                found_indexes.append(indexes + offset)
+                found_pairs.append(pair_indexes)
+                found_angles.append(np.full(len(indexes), angle))
+            indexes = np.concatenate(found_indexes)
+            pair_indexes = np.concatenate(found_pairs)
+            angles = np.concatenate(found_angles)
+            order = np.lexsort((angles, pair_indexes, indexes))
+            indexes, pair_indexes, angles = indexes[order], pair_indexes[order], angles[order]
+
+            rows1 = np.array([snapshot.get_row(planet1) for planet1, _ in pairs], dtype=np.int64)
+            rows2 = np.array([snapshot.get_row(planet2) for _, planet2 in pairs], dtype=np.int64)
+            return self._get_events(
+                block.time_grid.get_times(block.first + indexes),
+                planet1=pair_planets[pair_indexes, 0],
+                planet2=pair_planets[pair_indexes, 1],
+                angle=angles,
+                separation=separation[pair_indexes, indexes],
+                longitude1=snapshot.longitude[rows1[pair_indexes], indexes],
+                longitude2=snapshot.longitude[rows2[pair_indexes], indexes])
+
+        return detect
+
+    def __get_orb(self, params: AspectParams, angle: float) -> float:
+        return params.orbs.get(angle, params.orb)
+
+    def __get_separation(self, planet1: str, planet2: str, jd: float) -> float:
+        # Ayanamsa cancels out in the difference of two sidereal longitudes
+        planet1_longitude = self._get_planet_longitude(
+            planet=planet1, jd=jd, ayanamsa=0)
+        planet2_longitude = self._get_planet_longitude(
+            planet=planet2, jd=jd, ayanamsa=0)
+        return self._get_angle_diff(planet1_longitude, planet2_longitude)
+
+    def __get_aspect(self, planet1: str, planet2: str, jd: float, angle: float) -> Tuple:
+        ayanamsa = self._get_ayanamsa(jd)
+        planet1_longitude = self._get_planet_longitude(
+            planet=planet1, jd=jd, ayanamsa=ayanamsa)
+        planet2_longitude = self._get_planet_longitude(
+            planet=planet2, jd=jd, ayanamsa=ayanamsa)
+        return (self._get_time(jd), self.planets.index(planet1), self.planets.index(planet2), angle,
+                self._get_angle_diff(planet1_longitude, planet2_longitude), planet1_longitude, planet2_longitude)
+
+    def _get_items(self, events: np.ndarray) -> List[Aspects]:
+        return [Aspects(
+            planet1=Moment(time=local_time, longitude=planet1_longitude),
+            planet2=Moment(time=local_time, longitude=planet2_longitude),
+            angle=angle,
+            separation=separation,
+            planet1_name=self.planets[planet1],
+            planet2_name=self.planets[planet2]
+        ) for planet1, planet2, angle, separation, planet1_longitude, planet2_longitude, local_time in zip(
+            events['planet1'].tolist(), events['planet2'].tolist(), events['angle'].tolist(),
+            events['separation'].tolist(), events['longitude1'].tolist(), events['longitude2'].tolist(),
+            self._get_local_times(events))]
+
+    def __get_targets(self, params: AspectParams) -> List[Tuple[float, float]]:
+        # (angle, signed separation) pairs, 0 and 180 are reached from one side only
+        targets: List[Tuple[float, float]] = []
+        for angle in params.angles:
+            targets.append((angle, angle if angle < 180 else -180.0))
+            if 0 < angle < 180:
+                targets.append((angle, -angle))
+        return targets
+
+    def __find_exact(self, params: AspectParams):
+        # Separations of every pair come from one snapshot per block of the coarse grid,
+        # the brackets of every target angle of every pair are found from them at once
+        tolerance = params.tolerance / SECONDS_IN_DAY
+        start_jd = self._get_jd(params.start)
+        end_jd = self._get_jd(params.end)
+        planets = self._get_planets(params)
+        pairs = self._get_pairs(params)
+        targets = self.__get_targets(params)
+        target_separations = np.array([target for _, target in targets])
+
+        grid = self._get_exact_grid(params, *planets)
+        # The last point of the previous block opens the first step of the next one
+        for block_first in range(0, max(len(grid) - 1, 0), self.BLOCK_SIZE):
+            jd = grid[block_first:block_first + self.BLOCK_SIZE + 1]
+            separation = self.__get_separations(self._get_snapshot(jd, planets), pairs)
+            offsets = (separation[:, :, None] - target_separations + 180) % 360 - 180
+            previous, current = offsets[:, :-1], offsets[:, 1:]
+            brackets = np.nonzero((previous != 0) & (previous * current <= 0) & (np.abs(previous - current) < 180))
+
+            roots: List[Tuple[float, int, float]] = []
+            for pair, step, target in zip(*[indexes.tolist() for indexes in brackets]):
+                planet1, planet2 = pairs[pair]
+                target_separation = targets[target][1]
+                root_jd, _ = brent(
+                    lambda x: self._get_angle_diff(
+                        self.__get_separation(planet1, planet2, x), target_separation),
+                    float(jd[step]), float(jd[step + 1]),
+                    float(previous[pair, step, target]), float(current[pair, step, target]), tolerance)
+                if start_jd <= root_jd < end_jd:
+                    roots.append((root_jd, pair, targets[target][0]))
+
+            yield np.array([self.__get_aspect(*pairs[pair], root_jd, angle) for root_jd, pair, angle in sorted(roots)],
+                           dtype=self._get_event_dtype())
+
+    def _check_params(self, params: AspectParams):
+        if params.planets and len(self._get_pairs(params)) == 0:
+            raise ValueError(f"Planets have no pairs to scan: {', '.join(params.planets)}")
+        if not params.angles:
+            raise ValueError('Aspect angles are not passed')
+        for angle in params.angles:
+            if angle < 0 or angle > 180:
+                raise ValueError(f"Aspect angle is out of range 0..180: {angle}")
+        if params.orb <= 0:
+            raise ValueError(f"Aspect orb must be positive: {params.orb}")
+        for angle, orb in params.orbs.items():
+            if angle not in params.angles:
+                raise ValueError(f"Aspect orb is passed for an angle out of the scanned ones: {angle:g}")
+            if orb <= 0:
+                raise ValueError(f"Aspect orb must be positive: {angle:g}:{orb}")
+
+    def __get_name(self, angle: float) -> str:
+        name = self.ASPECT_NAMES.get(angle)
+        return f"{name}({angle:g})" if name != None else f"{angle:g}"
+
+    def _get_header(self, params: AspectParams) -> str:
+        precision = f"tolerance: {params.tolerance}s" if params.exact else f"orb: {params.orb}" + ''.join(
+            f", {self.__get_name(angle)} orb: {orb}" for angle, orb in params.orbs.items())
+        angles = ', '.join(self.__get_name(angle) for angle in params.angles)
+        planets = f"pairs of {', '.join(params.planets)}" if params.planets else f"{params.planet1} and {params.planet2}"
+        return f"Moments, when {planets} form aspects {angles}, from: {params.start}, to: {params.end}, \
+for: {params.step}, with {precision}:"
+
+    def _get_line(self, params: AspectParams, item: Aspects) -> str:
+        data1: Sign = self._get_zodiac_sign(item.planet1.longitude)
+        data2: Sign = self._get_zodiac_sign(item.planet2.longitude)
+        return f"Time: {item.planet1.time}, Aspect: {self.__get_name(item.angle)}, separation: {item.separation:.4f}, \
+{item.planet1_name}: {self._show_sign(sign=data1, longitude=item.planet1.longitude)} {self._show_degres(data1)}, \
+{item.planet2_name}: {self._show_sign(sign=data2, longitude=item.planet2.longitude)} {self._show_degres(data2)}"
+
+    def _get_fields(self) -> List[Field]:
+        return [Field(name='time', dtype='O'), Field(name='planet1', dtype='U16'), Field(name='planet2', dtype='U16'),
+                Field(name='angle', dtype='f8'), Field(name='separation', dtype='f8'),
+                Field(name='planet1_longitude', dtype='f8'), Field(name='planet2_longitude', dtype='f8')] + \
+            self._get_position_fields()
+
+    def _get_records(self, params: AspectParams, events: np.ndarray) -> List[Tuple]:
+        longitude1 = events['longitude1']
+        return list(zip(self._get_local_times(events), [self.planets[planet] for planet in events['planet1'].tolist()],
+                        [self.planets[planet] for planet in events['planet2'].tolist()], events['angle'].tolist(),
+                        events['separation'].tolist(), longitude1.tolist(), events['longitude2'].tolist(),
+                        *self._get_position_columns(longitude1)))
+
+    def __scan(self, params: AspectParams, step: timedelta) -> Iterable[np.ndarray]:
+        if params.multiThread:
+            chunks = self.split_dates(
+                start=params.start, end=params.end, step=step)
+            origin = params.origin if params.origin != None else params.start
+
+            return self._stream(
+                '_find_events',
+                (replace(params, start=chunk.start, end=chunk.end, origin=origin) for chunk in chunks)
+            )
+        return self._find_events(params)
+
+    def show(self, params: AspectParams):
+        self._log(
+            f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, multiThread:{params.multiThread}")
+        self._set_params(params)
+
+        start = datetime.now()
+        self._start_profile()
+
+        try:
+            self._check_params(params)
+        except ValueError as e:
+            print(e)
+            exit(1)
+
+        planets = self._get_planets(params)
+        self._prepare_backend(params.start, params.end, *planets)
+
+        step = timedelta(days=self._get_scan_grid(*planets)) if params.exact else params.step
+        events = self._get_results(
+            params, step, lambda scan_params: self.__scan(scan_params, step))
+
+        self._write_results(params, events)
+        self._log(
+            f"End for: {datetime.now() - start}")
+        self._show_profile()
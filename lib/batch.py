@@ -0,0 +1,304 @@
+from common.astro import Astro, Scanner, TimeGrid
+from common.profiler import profiler
+from common.writer import Writer, get_writer
+from lib.conjuction import ConjuctionsParams, Conjuction
+from lib.transit import TransitParams, Transit
+from lib.retro import RetroParams, Retro
+from lib.aspect import AspectParams, Aspect
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, TextIO
+import json
+import os
+import time
+import numpy as np
+
+
+@dataclass
+class BatchParams:
+    input: str
+    output: str
+
+
+@dataclass
+class Query:
+    id: str
+    command: str
+    params: Any
+    scanner: Any
+
+
+@dataclass
+class QueryGroup:
+    # Step mode queries sharing one time grid, scanned together over start..end
+    step: timedelta
+    start: datetime
+    end: datetime
+    queries: List[Query]
+
+
+class Batch(Astro):
+    SCANNERS = {
+        Astro.COMMAND_CONJUCTION: Conjuction,
+        Astro.COMMAND_TRANSIT: Transit,
+        Astro.COMMAND_RETRO: Retro,
+        Astro.COMMAND_ASPECT: Aspect,
+    }
+
+    def __get_scanner(self, command: str) -> Scanner:
+        return self._get_sibling(self.SCANNERS[command])
+
+    def __get_time(self, spec: Dict[str, Any], key: str, default: datetime) -> datetime:
+        if spec.get(key) == None:
+            return default
+        try:
+            return datetime.strptime(spec[key], self.TIME_FORMAT)
+        except Exception as e:
+            raise ValueError(f"Failed parse {key}: {e}")
+
+    def __get_number(self, spec: Dict[str, Any], key: str, default: float) -> float:
+        value = spec.get(key)
+        if value == None:
+            return default
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"{key} must be a positive number: {value}")
+        return value
+
+    def __get_planet(self, spec: Dict[str, Any], key: str, default: str) -> str:
+        planet = spec[key] if spec.get(key) != None else default
+        if planet not in self.planets:
+            raise ValueError(f"Planet is missing: {planet}, alloved planets: {'|'.join(self.planets)}")
+        return planet
+
+    def __get_planets(self, spec: Dict[str, Any]) -> List[str]:
+        if spec.get('all') == True:
+            return list(self.planets)
+        planets = spec['planets'] if spec.get('planets') != None else []
+        if not isinstance(planets, list):
+            raise ValueError(f"planets must be a list: {planets}")
+        for planet in planets:
+            if planet not in self.planets:
+                raise ValueError(f"Planet is missing: {planet}, alloved planets: {'|'.join(self.planets)}")
+        return planets
+
+    def __get_angles(self, spec: Dict[str, Any]) -> List[float]:
+        angles = spec['angles'] if spec.get('angles') != None else list(self.ASPECT_ANGLES_DEFAULT)
+        if not isinstance(angles, list) or any(isinstance(angle, bool) or not isinstance(angle, (int, float)) for angle in angles):
+            raise ValueError(f"angles must be a list of numbers: {angles}")
+        return [float(angle) for angle in angles]
+
+    def __get_orbs(self, spec: Dict[str, Any]) -> Dict[float, float]:
+        orbs = spec['orbs'] if spec.get('orbs') != None else []
+        if not isinstance(orbs, list) or any(not isinstance(orb, str) for orb in orbs):
+            raise ValueError(f"orbs must be a list of 'angle:orb' strings: {orbs}")
+        return self.get_aspect_orbs(orbs)
+
+    def get_query(self, spec: Dict[str, Any], default_id: str) -> Query:
+        # Query from its JSON spec, missing values take the command line defaults
+        query_id = str(spec['id']) if spec.get('id') != None else default_id
+        command = spec.get('command')
+        if command not in self.SCANNERS:
+            raise ValueError(
+                f"Command is missing: {command}, alloved commands: {'|'.join(self.SCANNERS)}")
+
+        scanner: Any = self.__get_scanner(command)
+        # The default window starts at the day of the query, a server runs for days, and
+        # requests of one day get the same params, so they share the cache and computations
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        common = dict(
+            start=self.__get_time(spec, 'start', today),
+            end=self.__get_time(spec, 'end', today + timedelta(days=self.END_DAYS_DEFAULT)),
+            step=timedelta(minutes=self.__get_number(spec, 'step', self.STEP_MINUTES_DEFAULT)),
+            multiThread=False,
+            maxThreads=None,
+            exact=spec['exact'] if spec.get('exact') != None else self.EXACT_DEFAULT,
+            tolerance=self.__get_number(spec, 'tolerance', self.TOLERANCE_SECONDS_DEFAULT),
+        )
+
+        if command == self.COMMAND_CONJUCTION:
+            params: Any = ConjuctionsParams(
+                accuracy=self.__get_number(spec, 'accuracy', self.ACCURACY_DEFAULT),
+                planet1=self.__get_planet(spec, 'planet1', self.planet.Sun),
+                planet2=self.__get_planet(spec, 'planet2', self.planet.Moon),
+                **common)
+        elif command == self.COMMAND_ASPECT:
+            params = AspectParams(
+                planet1=self.__get_planet(spec, 'planet1', self.planet.Sun),
+                planet2=self.__get_planet(spec, 'planet2', self.planet.Moon),
+                planets=self.__get_planets(spec),
+                angles=self.__get_angles(spec),
+                orb=self.__get_number(spec, 'orb', self.ACCURACY_DEFAULT),
+                orbs=self.__get_orbs(spec),
+                **common)
+            scanner._check_params(params)
+        elif command == self.COMMAND_TRANSIT:
+            params = TransitParams(
+                planet=self.__get_planet(spec, 'planet', self.planet.Sun),
+                sign=spec['sign'] if spec.get('sign') != None else self.SIGN_DEFAULT,
+                sign_index=0,
+                all=spec['all'] if spec.get('all') != None else self.ALL_SIGNS_DEFAULT,
+                nakshatra=spec['nakshatra'] if spec.get('nakshatra') != None else self.NAKHATRA_DEFAULT,
+                nakshatra_index=0,
+                **common)
+            sign_index, nakshatra_index = scanner._get_indexes(params)
+            params = replace(params, sign_index=sign_index, nakshatra_index=nakshatra_index)
+        else:
+            params = RetroParams(
+                planet=self.__get_planet(spec, 'planet', self.planet.Sun),
+                **common)
+
+        return Query(id=query_id, command=command, params=params, scanner=scanner)
+
+    def read_queries(self, path: str) -> List[Query]:
+        queries: List[Query] = []
+        with open(path) as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    queries.append(self.get_query(
+                        json.loads(line), str(line_number)))
+                except Exception as e:
+                    print(f"Failed parse query at line {line_number}: {e}")
+                    exit(1)
+
+        ids = [query.id for query in queries]
+        duplicates = sorted(set(query_id for query_id in ids if ids.count(query_id) > 1))
+        if duplicates:
+            print(f"Query ids are not unique: {', '.join(duplicates)}")
+            exit(1)
+        return queries
+
+    def get_planets(self, params: Any) -> List[str]:
+        if isinstance(params, AspectParams):
+            return self.__get_scanner(self.COMMAND_ASPECT)._get_planets(params)  # type: ignore
+        if isinstance(params, ConjuctionsParams):
+            return [params.planet1, params.planet2]
+        return [params.planet]
+
+    def get_groups(self, queries: List[Query]) -> List[QueryGroup]:
+        # Step mode queries with the same step and grid phase are merged into groups
+        # of overlapping ranges, every group is scanned once for all of its queries.
+        # The points of every query lie on the grid of its group, with the Julian Days
+        # of a run of the query on its own. Queries reading speeds are grouped apart,
+        # the speed flag of swe changes the last bits of its longitudes.
+        phases: Dict[Any, List[Query]] = {}
+        for query in queries:
+            params = query.params
+            if params.exact or params.start >= params.end:
+                continue
+            key = (params.step, (params.start - datetime.min) % params.step, query.scanner.SCAN_SPEEDS)
+            phases.setdefault(key, []).append(query)
+
+        groups: List[QueryGroup] = []
+        for (step, _, _), items in phases.items():
+            items.sort(key=lambda query: query.params.start)
+            group: Optional[QueryGroup] = None
+            for query in items:
+                if group == None or query.params.start > group.end:
+                    group = QueryGroup(step=step, start=query.params.start, end=query.params.end, queries=[])
+                    groups.append(group)
+                group.end = max(group.end, query.params.end)
+                group.queries.append(query)
+        return groups
+
+    def __scan_group(self, group: QueryGroup, write: Callable[[Query, np.ndarray], None]):
+        planets = sorted(set(planet for query in group.queries for planet in self.get_planets(query.params)))
+        speeds = group.queries[0].scanner.SCAN_SPEEDS
+        self._prepare_backend(group.start, group.end, *planets)
+
+        time_grid = TimeGrid(
+            start=group.start,
+            step=group.step,
+            size=-((group.start - group.end) // group.step))
+
+        ranges = []
+        for query in group.queries:
+            first = (query.params.start - group.start) // group.step
+            last = -((group.start - query.params.end) // group.step)
+            ranges.append((query, first, last, query.scanner._get_detector(query.params, first)))
+
+        # Detectors see the points of their own query only, as in a run of the query alone
+        for block in self._get_blocks(time_grid, 0, planets, speeds):
+            block_last = block.first + len(block.snapshot.jd)
+            for query, first, last, detect in ranges:
+                if first >= block_last or last <= block.first:
+                    continue
+                part = block.get_slice(max(first - block.first, 0), min(last, block_last) - block.first)
+                started = time.perf_counter()
+                events = detect(part)
+                profiler.add('detect', time.perf_counter() - started, points=len(part.snapshot.jd))
+                write(query, events)
+
+    def show(self, params: BatchParams):
+        print(
+            f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, input: {params.input}, output: {params.output}")
+
+        start = datetime.now()
+        self._start_profile()
+
+        self._set_global_params()
+
+        queries = self.read_queries(params.input)
+        os.makedirs(params.output, exist_ok=True)
+
+        files: Dict[str, TextIO] = {}
+        writers: Dict[str, Writer] = {}
+        counts: Dict[str, int] = {}
+        format = self.output.format if self.output != None else self.OUTPUT_FORMAT_DEFAULT
+
+        def write(query: Query, events: np.ndarray):
+            if len(events) == 0:
+                return
+            if query.id in writers:
+                for record in query.scanner._get_records(query.params, events):
+                    writers[query.id].write(record)
+            else:
+                f = files[query.id]
+                if counts[query.id] == 0:
+                    f.write(f"{query.scanner._get_header(query.params)}\n")
+                for item in query.scanner._render_items([events]):
+                    f.write(f"{query.scanner._get_line(query.params, item)}\n")
+                f.flush()
+            counts[query.id] += len(events)
+
+        def open_query(query: Query):
+            if format == self.OUTPUT_FORMAT_TEXT:
+                files[query.id] = open(os.path.join(params.output, f"{query.id}.txt"), 'w', encoding='utf-8')
+            else:
+                writers[query.id] = get_writer(
+                    format, query.scanner._get_fields(), os.path.join(params.output, f"{query.id}.{format}"))
+            counts[query.id] = 0
+
+        def close_query(query: Query):
+            if query.id in writers:
+                writers.pop(query.id).close()
+            else:
+                f = files.pop(query.id)
+                if counts[query.id] == 0:
+                    f.write(f"There are no matches for these params: {query.params}\n")
+                f.close()
+            print(f"Query {query.id}: {query.command}, matches: {counts[query.id]}", flush=True)
+
+        groups = self.get_groups(queries)
+        grouped = set(query.id for group in groups for query in group.queries)
+
+        for group in groups:
+            for query in group.queries:
+                open_query(query)
+            self.__scan_group(group, write)
+            for query in group.queries:
+                close_query(query)
+
+        # Exact queries solve their own brackets, they share the backend state only
+        for query in queries:
+            if query.id in grouped:
+                continue
+            open_query(query)
+            for events in query.scanner._find_events(query.params):
+                write(query, events)
+            close_query(query)
+
+        print(
+            f"Queries: {len(queries)}, groups: {len(groups)}, End for: {datetime.now() - start}")
+        self._show_profile()
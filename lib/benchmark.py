@@ -0,0 +1,217 @@
+from common.astro import Astro
+from lib.conjuction import ConjuctionsParams, Conjuction
+from lib.transit import TransitParams, Transit
+from lib.retro import RetroParams, Retro
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import platform
+import statistics
+import json
+import time
+
+
+@dataclass
+class BenchmarkParams:
+    profile: str
+    output: Optional[str]
+    repeat: int
+
+
+@dataclass
+class CompareParams:
+    baseline: str
+    current: str
+    threshold: float
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    scanner: type
+    method: str
+    params: Any
+    # None runs the scanner in process, otherwise chunks go to a pool of this size
+    workers: Optional[int]
+
+
+@dataclass
+class BenchmarkProfile:
+    days: List[int]
+    steps: List[int]
+    exact_days: List[int]
+    workers: List[int]
+
+
+class Benchmark(Astro):
+    START = datetime(2020, 1, 1)
+
+    PROFILES = {
+        Astro.BENCHMARK_PROFILE_SMOKE: BenchmarkProfile(days=[30], steps=[10], exact_days=[30], workers=[2]),
+        Astro.BENCHMARK_PROFILE_FULL: BenchmarkProfile(
+            days=[365], steps=[1, 10], exact_days=[365, 3650], workers=[1, 2, 4]),
+    }
+
+    def __get_params(self, command: str, days: int, step: int, exact: bool, **kwargs) -> Any:
+        common = dict(
+            start=self.START,
+            end=self.START + timedelta(days=days),
+            step=timedelta(minutes=step),
+            multiThread=False,
+            maxThreads=None,
+            exact=exact,
+            tolerance=self.TOLERANCE_SECONDS_DEFAULT,
+        )
+        if command == self.COMMAND_CONJUCTION:
+            return ConjuctionsParams(accuracy=self.ACCURACY_DEFAULT, **kwargs, **common)
+        if command == self.COMMAND_TRANSIT:
+            transit = dict(sign=self.zodiac_signs_en[0], sign_index=0, all=False,
+                           nakshatra=self.NAKHATRA_DEFAULT, nakshatra_index=-1)
+            transit.update(kwargs)
+            return TransitParams(**transit, **common)
+        return RetroParams(**kwargs, **common)
+
+    def __get_queries(self, days: int, step: int, exact: bool):
+        mode = 'exact' if exact else f"{step}m"
+        return [
+            (f"conjuction-sun-moon-{days}d-{mode}", Conjuction, 'find', self.__get_params(
+                self.COMMAND_CONJUCTION, days, step, exact, planet1=self.planet.Sun, planet2=self.planet.Moon)),
+            (f"retro-mercury-{days}d-{mode}", Retro, 'get', self.__get_params(
+                self.COMMAND_RETRO, days, step, exact, planet=self.planet.Mercury)),
+            (f"transit-sun-aries-{days}d-{mode}", Transit, 'find', self.__get_params(
+                self.COMMAND_TRANSIT, days, step, exact, planet=self.planet.Sun)),
+            (f"transit-moon-signs-{days}d-{mode}", Transit, 'find', self.__get_params(
+                self.COMMAND_TRANSIT, days, step, exact, planet=self.planet.Moon, all=True)),
+            (f"transit-moon-nakshatras-{days}d-{mode}", Transit, 'find', self.__get_params(
+                self.COMMAND_TRANSIT, days, step, exact, planet=self.planet.Moon, all=True,
+                nakshatra=self.nakshatras[0], nakshatra_index=0)),
+        ]
+
+    def get_cases(self, profile: BenchmarkProfile) -> List[BenchmarkCase]:
+        cases: List[BenchmarkCase] = []
+        for days in profile.days:
+            for step in profile.steps:
+                for name, scanner, method, params in self.__get_queries(days, step, False):
+                    cases.append(BenchmarkCase(name=name, scanner=scanner,
+                                 method=method, params=params, workers=None))
+        for days in profile.exact_days:
+            for name, scanner, method, params in self.__get_queries(days, 0, True):
+                cases.append(BenchmarkCase(name=name, scanner=scanner,
+                             method=method, params=params, workers=None))
+
+        # Parallel runs of the heaviest step scans, chunked as the commands do
+        for days in profile.days:
+            for step in profile.steps:
+                for name, scanner, method, params in self.__get_queries(days, step, False):
+                    if scanner == Retro:
+                        continue
+                    for workers in profile.workers:
+                        cases.append(BenchmarkCase(name=f"{name}-pool{workers}", scanner=scanner,
+                                     method=method, params=params, workers=workers))
+        return cases
+
+    def __get_pool_size(self, case: BenchmarkCase) -> int:
+        # Pools are capped at the CPUs of the machine
+        scanner = self._get_sibling(case.scanner)
+        scanner.max_threads = case.workers
+        return scanner._get_workers()
+
+    def __run_case(self, case: BenchmarkCase) -> int:
+        scanner = self._get_sibling(case.scanner)
+        if case.workers == None:
+            return len(list(getattr(scanner, case.method)(case.params)))
+
+        scanner.max_threads = case.workers
+        params = case.params
+        chunks = scanner.split_dates(start=params.start, end=params.end, step=params.step)
+        return len(list(scanner._render_items(scanner._stream('_find_events', [
+            replace(params, start=chunk.start, end=chunk.end, origin=params.start) for chunk in chunks]))))
+
+    def run(self, params: BenchmarkParams) -> Dict[str, Any]:
+        profile = self.PROFILES[params.profile]
+        self._set_global_params()
+
+        results = []
+        skipped: List[str] = []
+        for case in self.get_cases(profile):
+            # A smaller pool than the case is named for would be timed under its name
+            if case.workers != None and self.__get_pool_size(case) < case.workers:
+                skipped.append(case.name)
+                print(f"{case.name}: skipped, pool is limited to {self.__get_pool_size(case)} workers", flush=True)
+                continue
+
+            # The first run is not timed, it starts the pool and fills backend state
+            events = self.__run_case(case)
+            times = []
+            for _ in range(params.repeat):
+                start = time.perf_counter()
+                self.__run_case(case)
+                times.append(time.perf_counter() - start)
+
+            points = 0 if case.params.exact else -((case.params.start - case.params.end) // case.params.step)
+            result = {
+                'name': case.name,
+                'workers': case.workers,
+                'events': events,
+                'points': points,
+                'seconds': min(times),
+                'seconds_median': statistics.median(times),
+                'points_per_second': points / min(times) if points and min(times) > 0 else None,
+            }
+            results.append(result)
+            print(f"{case.name}: {result['seconds']:.4f}s, median: {result['seconds_median']:.4f}s, events: {events}", flush=True)
+
+        return {
+            'profile': params.profile,
+            'created': datetime.now().strftime(self.TIME_FORMAT),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': self.CPUS,
+            'backend': self.config.backend,
+            'repeat': params.repeat,
+            'cases': results,
+            'skipped': skipped,
+        }
+
+    def show(self, params: BenchmarkParams):
+        print(
+            f"Starting, profile: {params.profile}, backend: {self.config.backend}, repeat: {params.repeat}")
+
+        start = datetime.now()
+        report = self.run(params)
+
+        if params.output != None:
+            with open(params.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Results are written to: {params.output}")
+        print(
+            f"End for: {datetime.now() - start}")
+
+    def compare(self, params: CompareParams) -> int:
+        # Number of cases slower than the baseline by more than the threshold
+        with open(params.baseline) as f:
+            baseline = {case['name']: case for case in json.load(f)['cases']}
+        with open(params.current) as f:
+            report = json.load(f)
+        current = {case['name']: case for case in report['cases']}
+        skipped = set(report.get('skipped', []))
+
+        slowdowns = 0
+        for name, case in current.items():
+            if name not in baseline:
+                print(f"{name}: {case['seconds']:.4f}s, no baseline")
+                continue
+            ratio = case['seconds'] / baseline[name]['seconds'] if baseline[name]['seconds'] > 0 else 1.0
+            slow = ratio > 1 + params.threshold
+            slowdowns += slow
+            print(f"{name}: {baseline[name]['seconds']:.4f}s -> {case['seconds']:.4f}s, x{ratio:.2f}{' SLOWDOWN' if slow else ''}")
+            if case['events'] != baseline[name]['events']:
+                print(f"{name}: events changed {baseline[name]['events']} -> {case['events']}")
+        for name in baseline:
+            if name in skipped:
+                print(f"{name}: skipped in {params.current}, the pool is smaller there")
+            elif name not in current:
+                print(f"{name}: missing in {params.current}")
+
+        print(f"Cases: {len(current)}, slowdowns over {params.threshold:.0%}: {slowdowns}")
+        return slowdowns
@@ -0,0 +1,127 @@
+from common.astro import Astro, CatalogScanner
+from common.catalog import EventCatalog
+from lib.conjuction import ConjuctionsParams, Conjuction
+from lib.transit import TransitParams, Transit
+from lib.retro import RetroParams, Retro
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+@dataclass
+class CatalogParams:
+    path: str
+    start: datetime
+    end: datetime
+    planets: List[str]
+    tolerance: float
+    multiThread: Optional[bool]
+    maxThreads: Optional[int]
+
+
+@dataclass
+class CatalogJob:
+    command: str
+    keys: Dict[str, str]
+    params: Any
+
+
+class Catalog(Astro):
+    SCANNERS = {
+        Astro.COMMAND_TRANSIT: Transit,
+        Astro.COMMAND_RETRO: Retro,
+        Astro.COMMAND_CONJUCTION: Conjuction,
+    }
+
+    def __get_scanner(self, command: str) -> CatalogScanner:
+        return self._get_sibling(self.SCANNERS[command])
+
+    def get_jobs(self, params: CatalogParams) -> List[CatalogJob]:
+        # Sign and nakshatra ingresses and stations of every planet, conjunctions of
+        # every pair, all solved exactly
+        common: Dict[str, Any] = {
+            'start': params.start,
+            'end': params.end,
+            'step': timedelta(minutes=self.STEP_MINUTES_DEFAULT),
+            'multiThread': params.multiThread,
+            'maxThreads': params.maxThreads,
+            'exact': True,
+            'tolerance': params.tolerance,
+        }
+        jobs: List[CatalogJob] = []
+        for planet in params.planets:
+            signs = TransitParams(planet=planet, sign=self.SIGN_DEFAULT, sign_index=0, all=True,
+                                  nakshatra=self.NAKHATRA_DEFAULT, nakshatra_index=-1, **common)
+            nakshatras = replace(signs, nakshatra=self.nakshatras[0], nakshatra_index=0)
+            transit: Transit = self.__get_scanner(self.COMMAND_TRANSIT)  # type: ignore
+            for transit_params in (signs, nakshatras):
+                jobs.append(CatalogJob(command=self.COMMAND_TRANSIT,
+                            keys=transit._get_catalog_keys(transit_params), params=transit_params))
+            if planet != self.planet.Sun and planet != self.planet.Moon:
+                jobs.append(CatalogJob(command=self.COMMAND_RETRO,
+                            keys={'planet': planet}, params=RetroParams(planet=planet, **common)))
+
+        for planet1, planet2 in self._get_planet_pairs(sorted(params.planets, key=self.planets.index)):
+            jobs.append(CatalogJob(command=self.COMMAND_CONJUCTION, keys={'planet1': planet1, 'planet2': planet2},
+                        params=ConjuctionsParams(accuracy=self.ACCURACY_DEFAULT, planet1=planet1, planet2=planet2, **common)))
+        return jobs
+
+    def get_planets(self, params: Any) -> List[str]:
+        if isinstance(params, ConjuctionsParams):
+            return [params.planet1, params.planet2]
+        return [params.planet]
+
+    def __find(self, job: CatalogJob) -> np.ndarray:
+        scanner = self.__get_scanner(job.command)
+        params = job.params
+        scanner._set_params(params)
+        step = timedelta(days=scanner._get_scan_grid(*self.get_planets(params)))
+        if params.multiThread:
+            chunks = scanner.split_dates(start=params.start, end=params.end, step=step)
+            return scanner._join_events(list(scanner._stream('_find_events', [
+                replace(params, start=chunk.start, end=chunk.end, origin=params.start) for chunk in chunks])))
+        return scanner._join_events(list(scanner._find_events(params)))
+
+    def _check_params(self, params: CatalogParams):
+        if params.start >= params.end:
+            raise ValueError(f"Catalog span is empty: {params.start} - {params.end}")
+        for planet in params.planets:
+            if planet not in self.planets:
+                raise ValueError(f"Planet is missing: {planet}, alloved planets: {'|'.join(self.planets)}")
+
+    def show(self, params: CatalogParams):
+        self._set_params(params)  # type: ignore
+        print(
+            f"Starting, output: {params.path}, from: {params.start}, to: {params.end}, tolerance: {params.tolerance}s, multiThreading: {self.multiThread}")
+
+        start = datetime.now()
+        self._start_profile()
+
+        try:
+            self._check_params(params)
+        except ValueError as e:
+            print(e)
+            exit(1)
+
+        self._set_global_params()
+        self._prepare_backend(params.start, params.end, *params.planets)
+
+        catalog = EventCatalog(params.path, writable=True)
+        catalog.reset(dict(self._get_catalog_meta(), tolerance=str(params.tolerance)))
+
+        jobs = self.get_jobs(params)
+        for job in jobs:
+            scanner = self.__get_scanner(job.command)
+            catalog.create(job.command, list(job.keys), scanner._get_event_dtype())
+            events = self.__find(job)
+            catalog.insert(job.command, job.keys, events)
+            print(f"{job.command}: {', '.join(job.keys.values())}, events: {len(events)}", flush=True)
+
+        # Spans are set last, an interrupted build covers nothing
+        for table in set(job.command for job in jobs):
+            catalog.set_span(table, params.start, params.end)
+        catalog.close()
+
+        print(f"Jobs: {len(jobs)}, End for: {datetime.now() - start}")
+        self._show_profile()
@@ -1,8 +1,11 @@
-from common.astro import Astro, GlobalParams, Moment, Sign
-from concurrent.futures import ProcessPoolExecutor
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
+from common.astro import Block, CatalogScanner, GlobalParams, Moment, Sign
+from common.writer import Field
+from common.handler import Handler
+from common.solver import SECONDS_IN_DAY, brent
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
 
 
 @dataclass
@@ -10,6 +13,8 @@ class ConjuctionsParams(GlobalParams):
     accuracy: float
     planet1: str
     planet2: str
+    exact: bool = Handler.EXACT_DEFAULT
+    tolerance: float = Handler.TOLERANCE_SECONDS_DEFAULT
 
 
 @dataclass
@@ -18,8 +23,15 @@ class Conjuctions:
     planet2: Moment
 
 
-class Conjuction(Astro):
+class Conjuction(CatalogScanner):
+    EVENT_FIELDS = [('longitude1', 'f8'), ('longitude2', 'f8')]
+
+    CATALOG_TABLE = Handler.COMMAND_CONJUCTION
+
     def find(self, params: ConjuctionsParams, threadNum: Optional[int] = 1):
+        yield from self._render_items(self._find_events(params, threadNum))
+
+    def _find_events(self, params: ConjuctionsParams, threadNum: Optional[int] = 1) -> Iterator[np.ndarray]:
         self._set_params(params)
 
         self._set_global_params()
@@ -27,84 +39,138 @@ class Conjuction(Astro):
         if self.debug:
             print(
                 f"Start find_planet_conjunctions, thread: {threadNum}: {params}")
-        current_time = params.start
-
-        result: List[Conjuctions] = []
-
-        while current_time < params.end:
-            jd = self._get_jd(current_time=current_time)
-            ayanamsa = self._get_ayanamsa(jd)
-            planet1_longitude = self._get_planet_longitude(
-                planet=params.planet1, jd=jd, ayanamsa=ayanamsa)
-            planet2_longitude = self._get_planet_longitude(
-                planet=params.planet2, jd=jd, ayanamsa=ayanamsa)
-
-            if abs(planet1_longitude - planet2_longitude) < params.accuracy:
-                local_time = self._convert_to_local_time(
-                    current_time, self.timezone_str)
-                conjuction = Conjuctions(planet1=Moment(
-                    time=local_time, longitude=planet1_longitude), planet2=Moment(time=local_time, longitude=planet2_longitude))
-                result.append(conjuction)
 
-            current_time += params.step
+        if params.exact:
+            yield from self.__find_exact(params)
+            return
+
+        time_grid, first = self._get_chunk_grid(params, params.step)
+        detect = self._get_detector(params, first)
+        yield from self._detect_blocks(detect, self._get_blocks(time_grid, first, [params.planet1, params.planet2]))
+
+    def _get_detector(self, params: ConjuctionsParams, first: int) -> Callable[[Block], np.ndarray]:
+        # Step mode detection over consecutive blocks of one time grid, reporting
+        # the points from index first on
+        def detect(block: Block) -> np.ndarray:
+            snapshot = block.snapshot
+            planet1_longitude = snapshot.longitude[snapshot.get_row(params.planet1)]
+            planet2_longitude = snapshot.longitude[snapshot.get_row(params.planet2)]
+
+            # Separations wrap at 0 degrees, a conjunction there has longitudes on both sides
+            separation = (planet1_longitude - planet2_longitude + 180) % 360 - 180
+            matches = np.flatnonzero(np.abs(separation) < params.accuracy)
+
+            indexes = matches[matches >= first - block.first]
+            return self._get_events(block.time_grid.get_times(block.first + indexes),
+                                    longitude1=planet1_longitude[indexes], longitude2=planet2_longitude[indexes])
+
+        return detect
+
+    def __get_separation(self, params: ConjuctionsParams, jd: float) -> float:
+        # Ayanamsa cancels out in the difference of two sidereal longitudes
+        planet1_longitude = self._get_planet_longitude(
+            planet=params.planet1, jd=jd, ayanamsa=0)
+        planet2_longitude = self._get_planet_longitude(
+            planet=params.planet2, jd=jd, ayanamsa=0)
+        return self._get_angle_diff(planet1_longitude, planet2_longitude)
+
+    def __get_conjuction(self, params: ConjuctionsParams, jd: float) -> np.ndarray:
+        ayanamsa = self._get_ayanamsa(jd)
+        return self._get_events(
+            [self._get_time(jd)],
+            longitude1=[self._get_planet_longitude(planet=params.planet1, jd=jd, ayanamsa=ayanamsa)],
+            longitude2=[self._get_planet_longitude(planet=params.planet2, jd=jd, ayanamsa=ayanamsa)])
+
+    def _get_items(self, events: np.ndarray) -> List[Conjuctions]:
+        return [Conjuctions(planet1=Moment(time=local_time, longitude=planet1_longitude),
+                            planet2=Moment(time=local_time, longitude=planet2_longitude))
+                for planet1_longitude, planet2_longitude, local_time in zip(
+                    events['longitude1'].tolist(), events['longitude2'].tolist(), self._get_local_times(events))]
+
+    def __find_exact(self, params: ConjuctionsParams):
+        tolerance = params.tolerance / SECONDS_IN_DAY
+        start_jd = self._get_jd(params.start)
+        end_jd = self._get_jd(params.end)
+
+        previous_jd: Optional[float] = None
+        previous_separation = 0.0
+
+        for jd in self._get_exact_grid(params, params.planet1, params.planet2).tolist():
+            separation = self.__get_separation(params, jd)
+
+            if (previous_jd is not None and previous_separation != 0 and
+                    previous_separation * separation <= 0 and
+                    abs(previous_separation - separation) < 180):
+                root_jd, _ = brent(
+                    lambda x: self.__get_separation(params, x),
+                    previous_jd, jd, previous_separation, separation, tolerance)
+                if start_jd <= root_jd < end_jd:
+                    yield self.__get_conjuction(params, root_jd)
+
+            previous_jd = jd
+            previous_separation = separation
+
+    def _get_catalog_keys(self, params: ConjuctionsParams) -> Dict[str, str]:
+        # Every pair is kept once, in the order of Handler.planets
+        planet1, planet2 = sorted([params.planet1, params.planet2], key=self.planets.index)
+        return {'planet1': planet1, 'planet2': planet2}
+
+    def _find_catalog_events(self, params: ConjuctionsParams, start: datetime, end: datetime) -> np.ndarray:
+        keys = self._get_catalog_keys(params)
+        events = self.catalog.select(  # type: ignore
+            self.CATALOG_TABLE, keys, start, end, self._get_event_dtype())
+        if keys['planet1'] != params.planet1:
+            events['longitude1'], events['longitude2'] = events['longitude2'].copy(), events['longitude1'].copy()
+        return events
+
+    def _get_header(self, params: ConjuctionsParams) -> str:
+        precision = f"tolerance: {params.tolerance}s" if params.exact else f"accuracy: {params.accuracy}"
+        return f"Moments, when {params.planet1} and {params.planet2} are in one degree, from: {params.start}, to: {params.end}, \
+for: {params.step}, with {precision}:"
+
+    def _get_line(self, params: ConjuctionsParams, item: Conjuctions) -> str:
+        time = item.planet1.time.strftime(self.TIME_FORMAT)
+        data1: Sign = self._get_zodiac_sign(item.planet1.longitude)
+        data2: Sign = self._get_zodiac_sign(item.planet2.longitude)
+        return f"Time: {time}, Sign: {self._show_sign(sign=data1, longitude=item.planet1.longitude)}, {params.planet1}: {data1.degrees}\
+:{data1.minutes}:{data1.seconds}, {params.planet2}: {data2.degrees}:{data2.minutes}:{data2.seconds}"
+
+    def _get_fields(self) -> List[Field]:
+        return [Field(name='time', dtype='O'), Field(name='planet1_longitude', dtype='f8'),
+                Field(name='planet2_longitude', dtype='f8')] + self._get_position_fields()
+
+    def _get_records(self, params: ConjuctionsParams, events: np.ndarray) -> List[Tuple]:
+        longitude1 = events['longitude1']
+        return list(zip(self._get_local_times(events), longitude1.tolist(), events['longitude2'].tolist(),
+                        *self._get_position_columns(longitude1)))
+
+    def __scan(self, params: ConjuctionsParams, step: timedelta) -> Iterable[np.ndarray]:
+        if params.multiThread:
+            chunks = self.split_dates(
+                start=params.start, end=params.end, step=step)
+            origin = params.origin if params.origin != None else params.start
 
-        return result
+            return self._stream(
+                '_find_events',
+                (replace(params, start=chunk.start, end=chunk.end, origin=origin) for chunk in chunks)
+            )
+        return self._find_events(params)
 
     def show(self, params: ConjuctionsParams):
-        print(
+        self._log(
             f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, multiThread:{params.multiThread}")
         self._set_params(params)
 
         start = datetime.now()
+        self._start_profile()
 
-        items: List[Conjuctions] = []
+        self._prepare_backend(params.start, params.end, params.planet1, params.planet2)
 
-        if params.multiThread:
-            chunks = self.split_dates(
-                start=params.start, end=params.end, step=params.step)
-
-            with ProcessPoolExecutor() as executor:
-                results = list(executor.map(
-                    self.find,
-                    [
-                        ConjuctionsParams(
-                            start=chunk.start,
-                            end=chunk.end,
-                            accuracy=params.accuracy,
-                            step=params.step,
-                            planet1=params.planet1,
-                            planet2=params.planet2,
-                            multiThread=params.multiThread,
-                            maxThreads=params.maxThreads
-                        ) for chunk in chunks
-                    ]
-                ))
-
-                items = [
-                    item for sublist in results for item in sublist]
-        else:
-            items = self.find(ConjuctionsParams(
-                start=params.start,
-                end=params.end,
-                accuracy=params.accuracy,
-                step=params.step,
-                planet1=params.planet1,
-                planet2=params.planet2,
-                multiThread=params.multiThread,
-                maxThreads=params.maxThreads
-            ))
-
-        print(
+        step = timedelta(days=self._get_scan_grid(params.planet1, params.planet2)) if params.exact else params.step
+        events = self._get_results(
+            params, step, lambda scan_params: self.__scan(scan_params, step))
+
+        self._write_results(params, events)
+        self._log(
             f"End for: {datetime.now() - start}")
-        if items:
-            print(
-                f"Moments, when {params.planet1} and {params.planet2} are in one degree, from: {params.start}, to: {params.end}, \
-for: {params.step}, with accuracy: {params.accuracy}:")
-            for item in items:
-                time = item.planet1.time.strftime(self.TIME_FORMAT)
-                data1: Sign = self._get_zodiac_sign(item.planet1.longitude)
-                data2: Sign = self._get_zodiac_sign(item.planet2.longitude)
-                print(f"Time: {time}, Sign: {self._show_sign(sign=data1, longitude=item.planet1.longitude)}, {params.planet1}: {data1.degrees}\
-:{data1.minutes}:{data1.seconds}, {params.planet2}: {data2.degrees}:{data2.minutes}:{data2.seconds}")
-        else:
-            print(f"There are no matches for these params: {params}")
+        self._show_profile()
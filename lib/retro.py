@@ -1,13 +1,18 @@
-from common.astro import Astro, GlobalParams, Moment, Sign
-from concurrent.futures import ProcessPoolExecutor
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
+from common.astro import Block, CatalogScanner, GlobalParams, Moment, Sign
+from common.writer import Field
+from common.handler import Handler
+from common.solver import SECONDS_IN_DAY, brent
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
 
 
 @dataclass
 class RetroParams(GlobalParams):
     planet: str
+    exact: bool = Handler.EXACT_DEFAULT
+    tolerance: float = Handler.TOLERANCE_SECONDS_DEFAULT
 
 
 @dataclass
@@ -17,57 +22,140 @@ class Retros:
     out: bool
 
 
-class Retro(Astro):
+class Retro(CatalogScanner):
+    SCAN_STATEFUL = True
+
+    SCAN_SPEEDS = True
+
+    EVENT_FIELDS = [('longitude', 'f8'), ('out', '?')]
+
+    CATALOG_TABLE = Handler.COMMAND_RETRO
+
+    # Half width of the window where an exact station found on the speeds of a
+    # backend is searched again on the speeds of swe
+    BACKEND_STATION_WINDOW_SECONDS = 600.0
+
     def get(self, params: RetroParams):
-        current_time = params.start
-
-        result: List[Retros] = []
-
-        previous_longitude: Optional[float] = None
-
-        retro_started = False
-
-        retro_ended = False
-
-        while current_time < params.end:
-            jd = self._get_jd(current_time=current_time)
-            ayanamsa = self._get_ayanamsa(jd)
-            planet_longitude = self._get_planet_longitude(
-                planet=params.planet, jd=jd, ayanamsa=ayanamsa)
-
-            if previous_longitude is not None:
-                if (planet_longitude < previous_longitude and
-                        ((previous_longitude - planet_longitude) < 180) and not retro_started):
-                    if (retro_ended):
-                        sign = self._get_zodiac_sign(
-                            longitude=planet_longitude)
-                        result.append(Retros(
-                            sign=sign,
-                            out=False,
-                            moment=Moment(
-                                longitude=planet_longitude, time=current_time)
-                        ))
-                    retro_started = True
-                    retro_ended = False
-                elif ((planet_longitude > previous_longitude) and
-                        not retro_ended):
-                    if (retro_started):
-                        sign = self._get_zodiac_sign(
-                            longitude=planet_longitude)
-                        result.append(Retros(
-                            sign=sign,
-                            out=True,
-                            moment=Moment(
-                                longitude=planet_longitude, time=current_time)
-                        ))
-                    retro_ended = True
-                    retro_started = False
-
-            previous_longitude = planet_longitude
-
-            current_time += params.step
-
-        return result
+        yield from self._render_items(self._find_events(params))
+
+    def _find_events(self, params: RetroParams) -> Iterator[np.ndarray]:
+        self._set_global_params()
+
+        if params.exact:
+            yield from self.__get_exact(params)
+            return
+
+        time_grid, first = self._get_chunk_grid(params, params.step)
+        detect = self._get_detector(params, first)
+        yield from self._detect_blocks(detect, self._get_blocks(time_grid, max(first - 1, 0), [params.planet], self.SCAN_SPEEDS))
+
+    def _get_detector(self, params: RetroParams, first: int) -> Callable[[Block], np.ndarray]:
+        # Step mode detection over consecutive blocks of one time grid, points before
+        # index first only seed the speed, their stations belong to the previous chunk
+        previous_speed = 0.0
+
+        def detect(block: Block) -> np.ndarray:
+            nonlocal previous_speed
+            speed = block.snapshot.speed[block.snapshot.get_row(params.planet)]
+            if speed.size == 0:
+                return self._join_events([])
+            previous = np.concatenate(([previous_speed], speed[:-1]))
+            previous_speed = float(speed[-1])
+
+            stations = np.flatnonzero((previous != 0) & (previous * speed <= 0))
+
+            indexes = stations[stations >= first - block.first]
+            return self._get_events(
+                block.time_grid.get_times(block.first + indexes),
+                longitude=[self.__get_longitude(params, jd) for jd in block.snapshot.jd[indexes].tolist()],
+                out=previous[indexes] < 0)
+
+        return detect
+
+    def __get_longitude(self, params: RetroParams, jd: float) -> float:
+        return self._get_planet_longitude(
+            planet=params.planet, jd=jd, ayanamsa=self._get_ayanamsa(jd))
+
+    def _get_items(self, events: np.ndarray) -> List[Retros]:
+        return [Retros(
+            sign=self._get_zodiac_sign(longitude=planet_longitude),
+            out=out,
+            moment=Moment(longitude=planet_longitude, time=local_time)
+        ) for planet_longitude, out, local_time in zip(
+            events['longitude'].tolist(), events['out'].tolist(), self._get_local_times(events))]
+
+    def __get_exact(self, params: RetroParams):
+        tolerance = params.tolerance / SECONDS_IN_DAY
+        start_jd = self._get_jd(params.start)
+        end_jd = self._get_jd(params.end)
+
+        previous_jd: Optional[float] = None
+        previous_speed = 0.0
+
+        for jd in self._get_exact_grid(params, params.planet).tolist():
+            speed = self._get_planet_speed(planet=params.planet, jd=jd)
+
+            if previous_jd is not None and previous_speed != 0 and previous_speed * speed <= 0:
+                root_jd, _ = brent(
+                    lambda x: self._get_planet_speed(planet=params.planet, jd=x),
+                    previous_jd, jd, previous_speed, speed, tolerance)
+                if self.chebyshev != None or self.ephemeris_cache != None:
+                    root_jd = self.__refine_station(params, root_jd, tolerance)
+                if start_jd <= root_jd < end_jd:
+                    yield self._get_events(
+                        [self._get_time(root_jd)], longitude=[self.__get_longitude(params, root_jd)], out=[previous_speed < 0])
+
+            previous_jd = jd
+            previous_speed = speed
+
+    def __refine_station(self, params: RetroParams, root_jd: float, tolerance: float) -> float:
+        # Backend speeds are derivatives of fitted longitudes, a station found on them
+        # may be seconds off while the speed is close to zero
+        def get_speed(jd: float) -> float:
+            return self._get_planet_speed(planet=params.planet, jd=jd, direct=True)
+
+        window = self.BACKEND_STATION_WINDOW_SECONDS / SECONDS_IN_DAY
+        first_jd, last_jd = root_jd - window, root_jd + window
+        first_speed, last_speed = get_speed(first_jd), get_speed(last_jd)
+        if first_speed * last_speed > 0:
+            return root_jd
+        refined_jd, _ = brent(get_speed, first_jd, last_jd, first_speed, last_speed, tolerance)
+        return refined_jd
+
+    def _get_catalog_keys(self, params: RetroParams) -> Dict[str, str]:
+        return {'planet': params.planet}
+
+    def _find_catalog_events(self, params: RetroParams, start: datetime, end: datetime) -> np.ndarray:
+        return self.catalog.select(  # type: ignore
+            self.CATALOG_TABLE, self._get_catalog_keys(params), start, end, self._get_event_dtype())
+
+    def _get_header(self, params: RetroParams) -> str:
+        return f"Moments, when {params.planet} is starting or stoppind retro: {params.start}, to: {params.end}, \
+for: {params.step}"
+
+    def _get_line(self, params: RetroParams, item: Retros) -> str:
+        return f"Time: {item.moment.time}, Retro is: {not item.out} Sign: {self._show_sign(sign=item.sign, longitude=item.moment.longitude)}, {params.planet}: {self._show_degres(item.sign)}"
+
+    def _get_fields(self) -> List[Field]:
+        return [Field(name='time', dtype='O'), Field(name='longitude', dtype='f8'),
+                Field(name='retro', dtype='?')] + self._get_position_fields()
+
+    def _get_records(self, params: RetroParams, events: np.ndarray) -> List[Tuple]:
+        longitude = events['longitude']
+        return list(zip(self._get_local_times(events), longitude.tolist(), (~events['out']).tolist(),
+                        *self._get_position_columns(longitude)))
+
+    def __scan(self, params: RetroParams, step: timedelta) -> Iterable[np.ndarray]:
+        if params.multiThread:
+            chunks = self.split_dates(
+                start=params.start, end=params.end, step=step)
+            origin = params.origin if params.origin != None else params.start
+
+            return self._stream(
+                '_find_events',
+                (replace(params, start=chunk.start, end=chunk.end, origin=origin) for chunk in chunks)
+            )
+        return self._find_events(params)
 
     def show(self, params: RetroParams):
         self._set_params(params)
@@ -76,52 +164,19 @@ class Retro(Astro):
             print(f"Planet {params.planet} can not be retrograde")
             exit(2)
 
-        print(
+        self._log(
             f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, multiThreading: {self.multiThread}")
 
         start = datetime.now()
+        self._start_profile()
 
-        items: List[Retros] = []
+        self._prepare_backend(params.start, params.end, params.planet)
 
-        if params.multiThread:
-            chunks = self.split_dates(
-                start=params.start, end=params.end, step=params.step)
-
-            with ProcessPoolExecutor() as executor:
-                results = list(executor.map(
-                    self.get,
-                    [
-                        RetroParams(
-                            start=chunk.start,
-                            end=chunk.end,
-                            planet=params.planet,
-                            step=params.step,
-                            multiThread=params.multiThread,
-                            maxThreads=params.maxThreads,
-                        ) for chunk in chunks
-                    ]
-                ))
-
-                items = [
-                    item for sublist in results for item in sublist]
-        else:
-            items = self.get(RetroParams(
-                start=params.start,
-                end=params.end,
-                planet=params.planet,
-                step=params.step,
-                multiThread=params.multiThread,
-                maxThreads=params.maxThreads,
-            ))
-
-        print(
+        step = timedelta(days=self._get_scan_grid(params.planet)) if params.exact else params.step
+        events = self._get_results(
+            params, step, lambda scan_params: self.__scan(scan_params, step))
+
+        self._write_results(params, events)
+        self._log(
             f"End for: {datetime.now() - start}")
-        if items:
-            print(
-                f"Moments, when {params.planet} is starting or stoppind retro: {params.start}, to: {params.end}, \
-for: {params.step}")
-            for item in items:
-                print(
-                    f"Time: {item.moment.time}, Retro is: {not item.out} Sign: {self._show_sign(sign=item.sign, longitude=item.moment.longitude)}, {params.planet}: {self._show_degres(item.sign)}")
-        else:
-            print(f"There are no matches for these params: {params}")
+        self._show_profile()
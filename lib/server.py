@@ -0,0 +1,235 @@
+from common.astro import Astro, Task, _run_task
+from lib.batch import Batch, Query
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import numpy as np
+
+
+@dataclass
+class ServerParams:
+    host: str
+    port: int
+    maxThreads: Optional[int]
+    cache_entries: int
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    body: bytes
+    keep_alive: bool
+
+
+class Server(Astro):
+    REQUEST_BODY_MAX = 1024 * 1024
+
+    STATUS_TEXT = {
+        200: 'OK',
+        400: 'Bad Request',
+        404: 'Not Found',
+        405: 'Method Not Allowed',
+        413: 'Payload Too Large',
+        500: 'Internal Server Error',
+    }
+
+    cache_entries = Astro.SERVER_CACHE_ENTRIES_DEFAULT
+
+    def __get_batch(self) -> Batch:
+        return self._get_sibling(Batch)
+
+    def __get_tasks(self, query: Query) -> List[Task]:
+        # Chunks of the query for the worker pool, split the same way as the commands do
+        params = query.params
+        step = timedelta(days=self._get_scan_grid(
+            *self.__get_batch().get_planets(params))) if params.exact else params.step
+        return [
+            Task(
+                scanner=type(query.scanner),
+                config=self.config,
+                method='_find_events',
+                params=replace(params, start=chunk.start, end=chunk.end, origin=params.start)
+            ) for chunk in self.split_dates(start=params.start, end=params.end, step=step)
+        ]
+
+    def __json_default(self, value: Any):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def __get_body(self, data: Any) -> bytes:
+        return json.dumps(data, default=self.__json_default, ensure_ascii=False).encode('utf-8')
+
+    def __render(self, query: Query, events: List[np.ndarray]) -> bytes:
+        items = query.scanner._get_items(query.scanner._join_events(events))
+        return self.__get_body({
+            'command': query.command,
+            'header': query.scanner._get_header(query.params),
+            'count': len(items),
+            'items': [asdict(item) for item in items],
+        })
+
+    async def __compute(self, query: Query) -> bytes:
+        executor = self._get_executor()
+        results = await asyncio.gather(*[
+            asyncio.wrap_future(executor.submit(_run_task, task)) for task in self.__get_tasks(query)])
+        # Large responses take a while to render, other connections are served meanwhile
+        body = await asyncio.to_thread(self.__render, query, [result.events for result in results])
+
+        self._cache[self.__get_key(query)] = body
+        if len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+        return body
+
+    def __get_key(self, query: Query) -> Tuple[str, str]:
+        return query.command, repr(query.params)
+
+    async def __get_result(self, query: Query) -> bytes:
+        # Served from the cache when possible, identical requests in flight share
+        # one computation
+        key = self.__get_key(query)
+        body = self._cache.get(key)
+        if body != None:
+            self._cache.move_to_end(key)
+            return body
+
+        pending = self._pending.get(key)
+        if pending == None:
+            pending = asyncio.ensure_future(self.__compute(query))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def __dispatch(self, request: Request) -> Tuple[int, bytes]:
+        command = request.path.split('?')[0].strip('/')
+
+        if command == self.COMMAND_PLANETS:
+            if request.method != 'GET':
+                return 405, self.__get_body({'error': f"Method {request.method} is not allowed"})
+            return 200, self.__get_body({'planets': self.planets})
+
+        if command not in Batch.SCANNERS:
+            commands = list(Batch.SCANNERS) + [self.COMMAND_PLANETS]
+            return 404, self.__get_body({'error': f"Command is missing: {command}, alloved commands: {'|'.join(commands)}"})
+        if request.method != 'POST':
+            return 405, self.__get_body({'error': f"Method {request.method} is not allowed"})
+
+        try:
+            spec = json.loads(request.body) if request.body else {}
+            if not isinstance(spec, dict):
+                raise ValueError('Query must be a JSON object')
+            spec['command'] = command
+            query = self.__get_batch().get_query(spec, command)
+        except ValueError as e:
+            return 400, self.__get_body({'error': str(e)})
+
+        return 200, await self.__get_result(query)
+
+    async def __read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        line = await reader.readline()
+        if not line:
+            return None
+        method, path, version = line.decode('latin-1').split()
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > self.REQUEST_BODY_MAX:
+            raise OverflowError(f"Request body is larger than {self.REQUEST_BODY_MAX} bytes")
+        body = await reader.readexactly(length) if length > 0 else b''
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+        return Request(method=method, path=path, body=body, keep_alive=keep_alive)
+
+    def __get_response(self, status: int, body: bytes, keep_alive: bool) -> bytes:
+        head = (f"HTTP/1.1 {status} {self.STATUS_TEXT[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode('latin-1') + body
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self.__read_request(reader)
+                except OverflowError as e:
+                    writer.write(self.__get_response(413, self.__get_body({'error': str(e)}), False))
+                    break
+                except ValueError as e:
+                    writer.write(self.__get_response(400, self.__get_body({'error': f"Malformed request: {e}"}), False))
+                    break
+                if request == None:
+                    break
+
+                try:
+                    status, body = await self.__dispatch(request)
+                except Exception as e:
+                    status, body = 500, self.__get_body({'error': str(e)})
+                if self.debug:
+                    print(f"{request.method} {request.path}: {status}")
+
+                writer.write(self.__get_response(status, body, request.keep_alive))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def __warm_up(self):
+        # Starts every worker and builds its scanners before the first request
+        batch = self.__get_batch()
+        start = datetime(2000, 1, 1)
+        queries = [batch.get_query({'command': command, 'start': start.strftime(self.TIME_FORMAT),
+                                    'end': (start + timedelta(days=1)).strftime(self.TIME_FORMAT), 'step': 60}, command)
+                   for command in Batch.SCANNERS]
+        executor = self._get_executor()
+        futures = [executor.submit(_run_task, Task(scanner=type(query.scanner), config=self.config,
+                                                   method='_find_events', params=query.params))
+                   for _ in range(self._get_workers()) for query in queries]
+        for future in futures:
+            future.result()
+
+    async def _start(self, params: ServerParams) -> asyncio.AbstractServer:
+        # Accepts connections on the running event loop, with an empty response cache.
+        # Workers are started first, workers forked later would hold the open connections.
+        self.max_threads = params.maxThreads
+        self.cache_entries = params.cache_entries
+        self._cache: OrderedDict[Tuple[str, str], bytes] = OrderedDict()
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._set_global_params()
+        self.__warm_up()
+        return await asyncio.start_server(self.__handle, params.host, params.port)
+
+    async def __serve(self, params: ServerParams):
+        start = datetime.now()
+        server = await self._start(params)
+        print(f"Workers are ready for: {datetime.now() - start}")
+        print(f"Listening on http://{params.host}:{params.port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def show(self, params: ServerParams):
+        self.max_threads = params.maxThreads
+        self.cache_entries = params.cache_entries
+
+        print(
+            f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, workers: {self._get_workers()}, cache entries: {self.cache_entries}")
+
+        try:
+            asyncio.run(self.__serve(params))
+        except KeyboardInterrupt:
+            print('Stopped')
@@ -1,8 +1,11 @@
-from common.astro import Astro, GlobalParams, Moment, Sign
-from concurrent.futures import ProcessPoolExecutor
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
+from common.astro import Block, CatalogScanner, GlobalParams, Moment, Sign
+from common.writer import Field
+from common.handler import Handler
+from common.solver import SECONDS_IN_DAY, brent
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import numpy as np
 
 
 @dataclass
@@ -13,6 +16,8 @@ class TransitParams(GlobalParams):
     all: bool
     nakshatra: str
     nakshatra_index: int
+    exact: bool = Handler.EXACT_DEFAULT
+    tolerance: float = Handler.TOLERANCE_SECONDS_DEFAULT
 
 
 @dataclass
@@ -21,140 +26,201 @@ class Transits:
     sign: Sign
 
 
-class Transit(Astro):
-    def __get(self, params: TransitParams, _sign_index: Optional[int] = None, _nakshatra_index: Optional[int] = None):
-        sign_index = _sign_index if _sign_index != None else params.sign_index
-        nakshatra_index = _nakshatra_index if _nakshatra_index != None else params.nakshatra_index
-        current_time = params.start
-
-        result: List[Transits] = []
-
-        current_sign = ''
-        current_nakshatra = ''
-
-        while current_time < params.end:
-            jd = self._get_jd(current_time=current_time)
-            ayanamsa = self._get_ayanamsa(jd)
-            planet_longitude = self._get_planet_longitude(
-                planet=params.planet, jd=jd, ayanamsa=ayanamsa)
-
-            sign = self._get_zodiac_sign(planet_longitude)
-            if nakshatra_index == -1:
-                if sign_index != sign.sign_index:
-                    current_sign = ''
-                elif sign_index == sign.sign_index and current_sign != sign.name_en and sign.degrees == 0:
-                    current_sign = sign.name_en
-                    local_time = self._convert_to_local_time(
-                        current_time, self.timezone_str)
-                    transit = Moment(
-                        time=local_time, longitude=planet_longitude)
-                    result.append(Transits(moment=transit, sign=sign))
-            else:
-                _n, _, _ni = self._get_nakshatra(planet_longitude)
-                if nakshatra_index != _ni:
-                    current_nakshatra = ''
-                elif nakshatra_index == _ni and current_nakshatra != _n:
-                    current_nakshatra = _n
-                    local_time = self._convert_to_local_time(
-                        current_time, self.timezone_str)
-                    transit = Moment(
-                        time=local_time, longitude=planet_longitude)
-                    result.append(Transits(moment=transit, sign=sign))
-
-            current_time += params.step
-
-        return result
-
-    def find(self, params: TransitParams,):
+class Transit(CatalogScanner):
+    SCAN_STATEFUL = True
+
+    # Sector is the entered sign or nakshatra index
+    EVENT_FIELDS = [('longitude', 'f8'), ('sector', 'i1')]
+
+    CATALOG_TABLE = Handler.COMMAND_TRANSIT
+
+    CATALOG_KIND_SIGN = 'sign'
+
+    CATALOG_KIND_NAKSHATRA = 'nakshatra'
+
+    def __get(self, params: TransitParams):
+        time_grid, first = self._get_chunk_grid(params, params.step)
+        detect = self._get_detector(params, first)
+        yield from self._detect_blocks(detect, self._get_blocks(time_grid, max(first - 1, 0), [params.planet]))
+
+    def _get_detector(self, params: TransitParams, first: int) -> Callable[[Block], np.ndarray]:
+        # Step mode detection over consecutive blocks of one time grid. A transit is the
+        # first point in a new target sector, found by diffing the sector indexes of
+        # adjacent points. Points before index first only seed the sector, their
+        # transits belong to the previous chunk
+        _, targets = self.__get_targets(params)
+        target_indexes = np.array(sorted(targets))
+        current = -1
+
+        def detect(block: Block) -> np.ndarray:
+            nonlocal current
+            snapshot = block.snapshot
+            row = snapshot.get_row(params.planet)
+            sectors = (snapshot.sign_index if params.nakshatra_index == -1 else snapshot.nakshatra_index)[row]
+            if sectors.size == 0:
+                return self._join_events([])
+            previous = np.concatenate(([current], sectors[:-1]))
+            current = int(sectors[-1])
+
+            changes = np.flatnonzero((sectors != previous) & (previous != -1) & np.isin(sectors, target_indexes))
+            indexes = changes[changes >= first - block.first]
+            return self._get_events(block.time_grid.get_times(block.first + indexes),
+                                    longitude=snapshot.longitude[row, indexes], sector=sectors[indexes])
+
+        return detect
+
+    def __get_longitude(self, planet: str, jd: float) -> float:
+        return self._get_planet_longitude(
+            planet=planet, jd=jd, ayanamsa=self._get_ayanamsa(jd))
+
+    def __get_ingress(self, params: TransitParams, a: float, b: float, longitude_a: float, longitude_b: float,
+                      boundary: float, tolerance: float) -> float:
+        root_jd, _ = brent(
+            lambda x: self._get_angle_diff(
+                self.__get_longitude(params.planet, x), boundary),
+            a, b,
+            self._get_angle_diff(longitude_a, boundary),
+            self._get_angle_diff(longitude_b, boundary),
+            tolerance)
+        return root_jd
+
+    def __get_transit(self, params: TransitParams, jd: float, sector: int) -> np.ndarray:
+        return self._get_events([self._get_time(jd)], longitude=[self.__get_longitude(params.planet, jd)], sector=[sector])
+
+    def _get_items(self, events: np.ndarray) -> List[Transits]:
+        return [Transits(moment=Moment(time=local_time, longitude=planet_longitude),
+                         sign=self._get_zodiac_sign(planet_longitude))
+                for planet_longitude, local_time in zip(events['longitude'].tolist(), self._get_local_times(events))]
+
+    def __get_exact(self, params: TransitParams, width: float, targets: Set[int]):
+        tolerance = params.tolerance / SECONDS_IN_DAY
+        sectors = round(360 / width)
+        start_jd = self._get_jd(params.start)
+        end_jd = self._get_jd(params.end)
+
+        previous_jd: Optional[float] = None
+        previous_longitude = 0.0
+
+        for jd in self._get_exact_grid(params, params.planet).tolist():
+            planet_longitude = self.__get_longitude(params.planet, jd)
+
+            if previous_jd is not None:
+                current = int(previous_longitude // width)
+                index = int(planet_longitude // width)
+                direction = 1 if self._get_angle_diff(
+                    planet_longitude, previous_longitude) > 0 else -1
+
+                # Walk every boundary crossed during the step, retrograde re-entries
+                # cross the upper boundary of the entered sector
+                while current != index:
+                    entered = (current + direction) % sectors
+                    boundary = (entered if direction > 0 else current) * width
+                    current = entered
+                    if entered in targets:
+                        root_jd = self.__get_ingress(
+                            params, previous_jd, jd, previous_longitude, planet_longitude, boundary, tolerance)
+                        if start_jd <= root_jd < end_jd:
+                            yield self.__get_transit(params, root_jd, entered)
+
+            previous_jd = jd
+            previous_longitude = planet_longitude
+
+    def find(self, params: TransitParams):
+        yield from self._render_items(self._find_events(params))
+
+    def _find_events(self, params: TransitParams) -> Iterator[np.ndarray]:
         self._set_params(params)
         self._set_global_params()
-        results: List[List[Transits]] = []
-        if (params.all):
-            if params.nakshatra_index != -1:
-                for index, _ in enumerate(self.zodiac_signs_en):
-                    results.append(self.__get(params, index))
-            else:
-                for index, _ in enumerate(self.nakshatras):
-                    results.append(self.__get(params, 0, index))
-        else:
-            results.append(self.__get(params))
-
-        return [item for sublist in results for item in sublist]
 
-    def show(self, params: TransitParams):
-        self._set_params(params)
+        if params.exact:
+            width, targets = self.__get_targets(params)
+            yield from self.__get_exact(params, width=width, targets=targets)
+            return
 
-        print(
-            f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, multiThreading: {self.multiThread}")
+        yield from self.__get(params)
 
-        start = datetime.now()
+    def _get_catalog_keys(self, params: TransitParams) -> Dict[str, str]:
+        return {'planet': params.planet,
+                'kind': self.CATALOG_KIND_SIGN if params.nakshatra_index == -1 else self.CATALOG_KIND_NAKSHATRA}
+
+    def _find_catalog_events(self, params: TransitParams, start: datetime, end: datetime) -> np.ndarray:
+        events = self.catalog.select(  # type: ignore
+            self.CATALOG_TABLE, self._get_catalog_keys(params), start, end, self._get_event_dtype())
+        _, targets = self.__get_targets(params)
+        return events[np.isin(events['sector'], list(targets))]
 
-        items: List[Transits] = []
+    def __get_targets(self, params: TransitParams) -> Tuple[float, Set[int]]:
+        if params.nakshatra_index == -1:
+            return self.SIGN_DEGREES, set(range(len(self.zodiac_signs_en))) if params.all else {
+                params.sign_index}
+        return self.NAKSHATRA_DEGREES, set(range(len(self.nakshatras))) if params.all else {
+            params.nakshatra_index}
 
+    def _get_indexes(self, params: TransitParams) -> Tuple[int, int]:
         sign_index = self.find_zodiac_index(params.sign)
         if (sign_index == None):
-            print(
+            raise ValueError(
                 f"Sign is missing: {params.sign}, alloved signs_en:{'|'.join(self.zodiac_signs_en)} \n or signs_ru:{'|'.join(self.zodiac_signs_ru)}")
-            exit(1)
 
         nakshatra_index = -1
         if (params.nakshatra != self.NAKHATRA_DEFAULT):
             _nakshatra_index = self.find_nakshatra_index(params.nakshatra)
             if (_nakshatra_index == None):
-                print(
+                raise ValueError(
                     f"Nakshatra is missing: {params.nakshatra}, alloved nakshatras:{'|'.join(self.nakshatras)}")
-                exit(1)
             nakshatra_index = _nakshatra_index
 
+        return sign_index, nakshatra_index
+
+    def _get_header(self, params: TransitParams) -> str:
+        return f"Moments, when {params.planet} move to sign {params.sign}, from: {params.start}, to: {params.end}, \
+for: {params.step}"
+
+    def _get_line(self, params: TransitParams, item: Transits) -> str:
+        return f"Time: {item.moment.time}, Sign: {self._show_sign(sign=item.sign, longitude=item.moment.longitude)}, {params.planet}: {self._show_degres(item.sign)}"
+
+    def _get_fields(self) -> List[Field]:
+        return [Field(name='time', dtype='O'), Field(name='longitude', dtype='f8')] + self._get_position_fields()
+
+    def _get_records(self, params: TransitParams, events: np.ndarray) -> List[Tuple]:
+        longitude = events['longitude']
+        return list(zip(self._get_local_times(events), longitude.tolist(), *self._get_position_columns(longitude)))
+
+    def __scan(self, params: TransitParams, step: timedelta) -> Iterable[np.ndarray]:
         if params.multiThread:
             chunks = self.split_dates(
-                start=params.start, end=params.end, step=params.step)
-
-            with ProcessPoolExecutor() as executor:
-                results = list(executor.map(
-                    self.find,
-                    [
-                        TransitParams(
-                            start=chunk.start,
-                            end=chunk.end,
-                            planet=params.planet,
-                            step=params.step,
-                            sign=params.sign,
-                            multiThread=params.multiThread,
-                            maxThreads=params.maxThreads,
-                            sign_index=sign_index,
-                            all=params.all,
-                            nakshatra=params.nakshatra,
-                            nakshatra_index=nakshatra_index
-                        ) for chunk in chunks
-                    ]
-                ))
-
-                items = [
-                    item for sublist in results for item in sublist]
-        else:
-            items = self.find(TransitParams(
-                start=params.start,
-                end=params.end,
-                planet=params.planet,
-                step=params.step,
-                sign=params.sign,
-                multiThread=params.multiThread,
-                maxThreads=params.maxThreads,
-                sign_index=sign_index,
-                all=params.all,
-                nakshatra=params.nakshatra,
-                nakshatra_index=nakshatra_index
-            ))
-
-        print(
+                start=params.start, end=params.end, step=step)
+            origin = params.origin if params.origin != None else params.start
+
+            return self._stream(
+                '_find_events',
+                (replace(params, start=chunk.start, end=chunk.end, origin=origin) for chunk in chunks)
+            )
+        return self._find_events(params)
+
+    def show(self, params: TransitParams):
+        self._set_params(params)
+
+        self._log(
+            f"Starting, timezone: {self.timezone_str}, debug: {self.debug}, multiThreading: {self.multiThread}")
+
+        start = datetime.now()
+        self._start_profile()
+
+        self._prepare_backend(params.start, params.end, params.planet)
+
+        try:
+            sign_index, nakshatra_index = self._get_indexes(params)
+        except ValueError as e:
+            print(e)
+            exit(1)
+
+        step = timedelta(days=self._get_scan_grid(params.planet)) if params.exact else params.step
+        events = self._get_results(
+            replace(params, sign_index=sign_index, nakshatra_index=nakshatra_index), step,
+            lambda scan_params: self.__scan(scan_params, step))
+
+        self._write_results(params, events)
+        self._log(
             f"End for: {datetime.now() - start}")
-        if items:
-            print(
-                f"Moments, when {params.planet} move to sign {params.sign}, from: {params.start}, to: {params.end}, \
-for: {params.step}")
-            for item in items:
-                print(
-                    f"Time: {item.moment.time}, Sign: {self._show_sign(sign=item.sign, longitude=item.moment.longitude)}, {params.planet}: {self._show_degres(item.sign)}")
-        else:
-            print(f"There are no matches for these params: {params}")
+        self._show_profile()
@@ -1,8 +1,13 @@
 from lib.conjuction import ConjuctionsParams, Conjuction
+from lib.aspect import AspectParams, Aspect
 from lib.transit import TransitParams, Transit
 from lib.retro import RetroParams, Retro
 from lib.planet import PlanetParams, Planet
+from lib.batch import BatchParams, Batch
+from lib.catalog import CatalogParams, Catalog
 from common.cli import Cli
+from common.profiler import ProfileConfig
+from common.writer import OutputConfig
 from datetime import timedelta
 
 
@@ -13,8 +18,23 @@ def main():
 
     if cli.command == cli.COMMAND_CONJUCTION:
         astro = Conjuction(
-            timezone_str=cli.TIME_ZONE_STR_DEFAULT,
-            debug=cli.DEBUG_DEFAULT
+            timezone_str=cli.args_conjuction.timezone if cli.args_conjuction.timezone != None else cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_conjuction.cache if cli.args_conjuction.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_conjuction.cache_size if cli.args_conjuction.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_conjuction.backend if cli.args_conjuction.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_conjuction.backend_tolerance if cli.args_conjuction.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+            results_cache_dir=cli.args_conjuction.results_cache if cli.args_conjuction.results_cache != None else cli.RESULTS_CACHE_DIR_DEFAULT,
+            results_cache_size=cli.args_conjuction.results_cache_size if cli.args_conjuction.results_cache_size != None else cli.RESULTS_CACHE_SIZE_MB_DEFAULT,
+            checkpoint_path=cli.args_conjuction.checkpoint if cli.args_conjuction.checkpoint != None else cli.CHECKPOINT_DEFAULT,
+            profile=ProfileConfig(
+                format=cli.args_conjuction.profile,
+                output=cli.args_conjuction.profile_output,
+                dump=cli.args_conjuction.profile_dump),
+            output=OutputConfig(
+                format=cli.args_conjuction.format if cli.args_conjuction.format != None else cli.OUTPUT_FORMAT_DEFAULT,
+                path=cli.args_conjuction.output),
+            catalog_path=cli.args_conjuction.catalog if cli.args_conjuction.catalog != None else cli.CATALOG_DEFAULT
         )
         astro.show(
             ConjuctionsParams(
@@ -26,13 +46,68 @@ def main():
                 planet1=cli.args_conjuction.planet1 if cli.args_conjuction.planet1 != None else astro.planet.Sun,
                 planet2=cli.args_conjuction.planet2 if cli.args_conjuction.planet2 != None else astro.planet.Moon,
                 multiThread=False if cli.args_conjuction.no_threads == True else cli.WITH_TREADS_DEFAULT,
-                maxThreads=cli.args_conjuction.threads_max if cli.args_conjuction.threads_max else cli.THREAD_MAX_DEFAULT
+                maxThreads=cli.args_conjuction.threads_max if cli.args_conjuction.threads_max else cli.THREAD_MAX_DEFAULT,
+                exact=cli.args_conjuction.exact if cli.args_conjuction.exact != None else cli.EXACT_DEFAULT,
+                tolerance=cli.args_conjuction.tolerance if cli.args_conjuction.tolerance != None else cli.TOLERANCE_SECONDS_DEFAULT
+            )
+        )
+    elif cli.command == cli.COMMAND_ASPECT:
+        astro = Aspect(
+            timezone_str=cli.args_aspect.timezone if cli.args_aspect.timezone != None else cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_aspect.cache if cli.args_aspect.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_aspect.cache_size if cli.args_aspect.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_aspect.backend if cli.args_aspect.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_aspect.backend_tolerance if cli.args_aspect.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+            results_cache_dir=cli.args_aspect.results_cache if cli.args_aspect.results_cache != None else cli.RESULTS_CACHE_DIR_DEFAULT,
+            results_cache_size=cli.args_aspect.results_cache_size if cli.args_aspect.results_cache_size != None else cli.RESULTS_CACHE_SIZE_MB_DEFAULT,
+            checkpoint_path=cli.args_aspect.checkpoint if cli.args_aspect.checkpoint != None else cli.CHECKPOINT_DEFAULT,
+            profile=ProfileConfig(
+                format=cli.args_aspect.profile,
+                output=cli.args_aspect.profile_output,
+                dump=cli.args_aspect.profile_dump),
+            output=OutputConfig(
+                format=cli.args_aspect.format if cli.args_aspect.format != None else cli.OUTPUT_FORMAT_DEFAULT,
+                path=cli.args_aspect.output)
+        )
+        astro.show(
+            AspectParams(
+                start=cli.start if cli.start != None else cli.START_DEFAULT,
+                end=cli.end if cli.end != None else cli.END_DEFAULT,
+                step=timedelta(minutes=cli.args_aspect.step if cli.args_aspect.step !=
+                               None else cli.STEP_MINUTES_DEFAULT),
+                planet1=cli.args_aspect.planet1 if cli.args_aspect.planet1 != None else astro.planet.Sun,
+                planet2=cli.args_aspect.planet2 if cli.args_aspect.planet2 != None else astro.planet.Moon,
+                planets=list(cli.planets) if cli.args_aspect.all == True else (
+                    cli.args_aspect.planets if cli.args_aspect.planets != None else []),
+                angles=cli.args_aspect.angles if cli.args_aspect.angles != None else list(cli.ASPECT_ANGLES_DEFAULT),
+                orb=cli.args_aspect.orb if cli.args_aspect.orb != None else cli.ACCURACY_DEFAULT,
+                orbs=cli.orbs if cli.orbs != None else {},
+                multiThread=False if cli.args_aspect.no_threads == True else cli.WITH_TREADS_DEFAULT,
+                maxThreads=cli.args_aspect.threads_max if cli.args_aspect.threads_max else cli.THREAD_MAX_DEFAULT,
+                exact=cli.args_aspect.exact if cli.args_aspect.exact != None else cli.EXACT_DEFAULT,
+                tolerance=cli.args_aspect.tolerance if cli.args_aspect.tolerance != None else cli.TOLERANCE_SECONDS_DEFAULT
             )
         )
     elif cli.command == cli.COMMAND_TRANSIT:
         astro = Transit(
-            timezone_str=cli.TIME_ZONE_STR_DEFAULT,
-            debug=cli.DEBUG_DEFAULT
+            timezone_str=cli.args_transit.timezone if cli.args_transit.timezone != None else cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_transit.cache if cli.args_transit.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_transit.cache_size if cli.args_transit.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_transit.backend if cli.args_transit.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_transit.backend_tolerance if cli.args_transit.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+            results_cache_dir=cli.args_transit.results_cache if cli.args_transit.results_cache != None else cli.RESULTS_CACHE_DIR_DEFAULT,
+            results_cache_size=cli.args_transit.results_cache_size if cli.args_transit.results_cache_size != None else cli.RESULTS_CACHE_SIZE_MB_DEFAULT,
+            checkpoint_path=cli.args_transit.checkpoint if cli.args_transit.checkpoint != None else cli.CHECKPOINT_DEFAULT,
+            profile=ProfileConfig(
+                format=cli.args_transit.profile,
+                output=cli.args_transit.profile_output,
+                dump=cli.args_transit.profile_dump),
+            output=OutputConfig(
+                format=cli.args_transit.format if cli.args_transit.format != None else cli.OUTPUT_FORMAT_DEFAULT,
+                path=cli.args_transit.output),
+            catalog_path=cli.args_transit.catalog if cli.args_transit.catalog != None else cli.CATALOG_DEFAULT
         )
         astro.show(
             TransitParams(
@@ -47,23 +122,42 @@ def main():
                 sign_index=0,
                 all=cli.args_transit.all if cli.args_transit.all != None else cli.ALL_SIGNS_DEFAULT,
                 nakshatra=cli.args_transit.nakshatra if cli.args_transit.nakshatra != None else cli.NAKHATRA_DEFAULT,
-                nakshatra_index=0
+                nakshatra_index=0,
+                exact=cli.args_transit.exact if cli.args_transit.exact != None else cli.EXACT_DEFAULT,
+                tolerance=cli.args_transit.tolerance if cli.args_transit.tolerance != None else cli.TOLERANCE_SECONDS_DEFAULT
             )
         )
     elif cli.command == cli.COMMAND_RETRO:
         astro = Retro(
-            timezone_str=cli.TIME_ZONE_STR_DEFAULT,
-            debug=cli.DEBUG_DEFAULT
+            timezone_str=cli.args_retro.timezone if cli.args_retro.timezone != None else cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_retro.cache if cli.args_retro.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_retro.cache_size if cli.args_retro.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_retro.backend if cli.args_retro.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_retro.backend_tolerance if cli.args_retro.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+            results_cache_dir=cli.args_retro.results_cache if cli.args_retro.results_cache != None else cli.RESULTS_CACHE_DIR_DEFAULT,
+            results_cache_size=cli.args_retro.results_cache_size if cli.args_retro.results_cache_size != None else cli.RESULTS_CACHE_SIZE_MB_DEFAULT,
+            checkpoint_path=cli.args_retro.checkpoint if cli.args_retro.checkpoint != None else cli.CHECKPOINT_DEFAULT,
+            profile=ProfileConfig(
+                format=cli.args_retro.profile,
+                output=cli.args_retro.profile_output,
+                dump=cli.args_retro.profile_dump),
+            output=OutputConfig(
+                format=cli.args_retro.format if cli.args_retro.format != None else cli.OUTPUT_FORMAT_DEFAULT,
+                path=cli.args_retro.output),
+            catalog_path=cli.args_retro.catalog if cli.args_retro.catalog != None else cli.CATALOG_DEFAULT
         )
         astro.show(
             RetroParams(
                 start=cli.start if cli.start != None else cli.START_DEFAULT,
                 end=cli.end if cli.end != None else cli.END_DEFAULT,
-                step=timedelta(minutes=cli.args_transit.step if cli.args_transit.step !=
+                step=timedelta(minutes=cli.args_retro.step if cli.args_retro.step !=
                                None else cli.STEP_MINUTES_DEFAULT),
                 planet=cli.args_retro.planet if cli.args_retro.planet != None else astro.planet.Sun,
                 multiThread=False if cli.args_retro.no_threads == True else cli.WITH_TREADS_DEFAULT,
                 maxThreads=cli.args_retro.threads_max if cli.args_retro.threads_max else cli.THREAD_MAX_DEFAULT,
+                exact=cli.args_retro.exact if cli.args_retro.exact != None else cli.EXACT_DEFAULT,
+                tolerance=cli.args_retro.tolerance if cli.args_retro.tolerance != None else cli.TOLERANCE_SECONDS_DEFAULT,
             )
         )
     elif cli.command == cli.COMMAND_PLANETS:
@@ -74,6 +168,49 @@ def main():
         astro.show(PlanetParams(
             all=cli.args_planets.all if cli.args_planets.all != None else False
         ))
+    elif cli.command == cli.COMMAND_BATCH:
+        astro = Batch(
+            timezone_str=cli.args_batch.timezone if cli.args_batch.timezone != None else cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_batch.cache if cli.args_batch.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_batch.cache_size if cli.args_batch.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_batch.backend if cli.args_batch.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_batch.backend_tolerance if cli.args_batch.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+            profile=ProfileConfig(
+                format=cli.args_batch.profile,
+                output=cli.args_batch.profile_output,
+                dump=cli.args_batch.profile_dump),
+            output=OutputConfig(
+                format=cli.args_batch.format if cli.args_batch.format != None else cli.OUTPUT_FORMAT_DEFAULT,
+                path=None)
+        )
+        astro.show(BatchParams(
+            input=cli.args_batch.input if cli.args_batch.input != None else '',
+            output=cli.args_batch.output if cli.args_batch.output != None else cli.BATCH_OUTPUT_DIR_DEFAULT
+        ))
+
+    elif cli.command == cli.COMMAND_CATALOG:
+        astro = Catalog(
+            timezone_str=cli.TIME_ZONE_STR_DEFAULT,
+            debug=cli.DEBUG_DEFAULT,
+            cache_dir=cli.args_catalog.cache if cli.args_catalog.cache != None else cli.CACHE_DIR_DEFAULT,
+            cache_size=cli.args_catalog.cache_size if cli.args_catalog.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+            backend=cli.args_catalog.backend if cli.args_catalog.backend != None else cli.BACKEND_DEFAULT,
+            backend_tolerance=cli.args_catalog.backend_tolerance if cli.args_catalog.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT,
+            profile=ProfileConfig(
+                format=cli.args_catalog.profile,
+                output=cli.args_catalog.profile_output,
+                dump=cli.args_catalog.profile_dump)
+        )
+        astro.show(CatalogParams(
+            path=cli.args_catalog.output if cli.args_catalog.output != None else '',
+            start=cli.start if cli.start != None else cli.CATALOG_START_DEFAULT,
+            end=cli.end if cli.end != None else cli.CATALOG_END_DEFAULT,
+            planets=cli.args_catalog.planets if cli.args_catalog.planets != None else list(cli.planets),
+            tolerance=cli.args_catalog.tolerance if cli.args_catalog.tolerance != None else cli.TOLERANCE_SECONDS_DEFAULT,
+            multiThread=False if cli.args_catalog.no_threads == True else cli.WITH_TREADS_DEFAULT,
+            maxThreads=cli.args_catalog.threads_max if cli.args_catalog.threads_max else cli.THREAD_MAX_DEFAULT
+        ))
 
 
 main()
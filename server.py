@@ -0,0 +1,26 @@
+from lib.server import ServerParams, Server
+from common.cli import Cli
+
+
+def main():
+
+    cli = Cli()
+    cli.argparse_server()
+
+    astro = Server(
+        timezone_str=cli.args_server.timezone if cli.args_server.timezone != None else cli.TIME_ZONE_STR_DEFAULT,
+        debug=cli.DEBUG_DEFAULT,
+        cache_dir=cli.args_server.cache if cli.args_server.cache != None else cli.CACHE_DIR_DEFAULT,
+        cache_size=cli.args_server.cache_size if cli.args_server.cache_size != None else cli.CACHE_SIZE_MB_DEFAULT,
+        backend=cli.args_server.backend if cli.args_server.backend != None else cli.BACKEND_DEFAULT,
+        backend_tolerance=cli.args_server.backend_tolerance if cli.args_server.backend_tolerance != None else cli.CHEBYSHEV_TOLERANCE_ARCSEC_DEFAULT
+    )
+    astro.show(ServerParams(
+        host=cli.args_server.host if cli.args_server.host != None else cli.SERVER_HOST_DEFAULT,
+        port=cli.args_server.port if cli.args_server.port != None else cli.SERVER_PORT_DEFAULT,
+        maxThreads=cli.args_server.threads_max if cli.args_server.threads_max else cli.THREAD_MAX_DEFAULT,
+        cache_entries=cli.args_server.cache_entries if cli.args_server.cache_entries != None else cli.SERVER_CACHE_ENTRIES_DEFAULT
+    ))
+
+
+main()
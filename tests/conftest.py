@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import csv
+import itertools
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.writer import OutputConfig  # noqa: E402
+
+
+@pytest.fixture
+def scan(tmp_path: Path) -> Callable[..., List[Dict[str, str]]]:
+    # Shows the results of a scanner as csv and returns the written rows
+    files = itertools.count()
+
+    def run(scanner_type: type, params: Any, **options: Any) -> List[Dict[str, str]]:
+        path = tmp_path / f"results_{next(files)}.csv"
+        scanner = scanner_type(timezone_str='UTC', output=OutputConfig(format='csv', path=str(path)), **options)
+        scanner.show(params)
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    return run
@@ -0,0 +1,31 @@
+from lib.aspect import Aspect, AspectParams
+from common.handler import Handler
+from dataclasses import replace
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+
+PARAMS = AspectParams(
+    start=datetime(2020, 1, 1), end=datetime(2020, 2, 1), step=timedelta(minutes=10), multiThread=False,
+    maxThreads=None, planet1=Handler.planet.Sun, planet2=Handler.planet.Moon, angles=[0.0, 90.0], orb=0.1,
+    orbs={90.0: 1.0})
+
+
+def get_events(params: AspectParams) -> np.ndarray:
+    aspect = Aspect(timezone_str='UTC')
+    return aspect._join_events(list(aspect._find_events(params)))
+
+
+def test_orb_per_angle():
+    # Every angle is found as in a scan of it alone with its orb
+    events = get_events(PARAMS)
+    for angle, orb in [(0.0, 0.1), (90.0, 1.0)]:
+        expected = get_events(replace(PARAMS, angles=[angle], orb=orb, orbs={}))
+        found = events[events['angle'] == angle]
+        assert len(found) == len(expected) > 0
+        assert (found == expected).all()
+
+
+def test_orb_of_unscanned_angle_is_rejected():
+    with pytest.raises(ValueError):
+        Aspect(timezone_str='UTC')._check_params(replace(PARAMS, orbs={120.0: 1.0}))
@@ -0,0 +1,63 @@
+from lib.aspect import Aspect, AspectParams
+from lib.batch import Batch, BatchParams
+from lib.conjuction import Conjuction, ConjuctionsParams
+from lib.retro import Retro, RetroParams
+from lib.transit import Transit, TransitParams
+from common.astro import Astro
+from common.handler import Handler
+from common.writer import OutputConfig
+from datetime import datetime, timedelta
+import csv
+import json
+
+STEP = timedelta(minutes=10)
+
+# Overlapping ranges on one grid phase, of stateful and stateless scanners
+QUERIES = [
+    ({'id': 'transit', 'command': 'transit', 'planet': 'MOON', 'all': True,
+      'start': '2020-01-01 00:00:00', 'end': '2020-03-01 00:00:00', 'step': 10},
+     Transit, TransitParams(start=datetime(2020, 1, 1), end=datetime(2020, 3, 1), step=STEP, multiThread=False,
+                            maxThreads=None, planet=Handler.planet.Moon, sign=Handler.SIGN_DEFAULT, sign_index=0,
+                            all=True, nakshatra=Handler.NAKHATRA_DEFAULT, nakshatra_index=-1)),
+    ({'id': 'retro', 'command': 'retro', 'planet': 'MERCURY',
+      'start': '2020-01-20 05:30:00', 'end': '2020-04-01 00:00:00', 'step': 10},
+     Retro, RetroParams(start=datetime(2020, 1, 20, 5, 30), end=datetime(2020, 4, 1), step=STEP, multiThread=False,
+                        maxThreads=None, planet=Handler.planet.Mercury)),
+    ({'id': 'conjuction', 'command': 'conjuction', 'accuracy': 0.1,
+      'start': '2020-02-10 12:00:00', 'end': '2020-02-28 00:00:00', 'step': 10},
+     Conjuction, ConjuctionsParams(start=datetime(2020, 2, 10, 12), end=datetime(2020, 2, 28), step=STEP,
+                                   multiThread=False, maxThreads=None, accuracy=0.1, planet1=Handler.planet.Sun,
+                                   planet2=Handler.planet.Moon)),
+    ({'id': 'aspect', 'command': 'aspect', 'orb': 0.1,
+      'start': '2020-02-01 00:10:00', 'end': '2020-02-15 00:00:00', 'step': 10},
+     Aspect, AspectParams(start=datetime(2020, 2, 1, 0, 10), end=datetime(2020, 2, 15), step=STEP, multiThread=False,
+                          maxThreads=None, planet1=Handler.planet.Sun, planet2=Handler.planet.Moon, orb=0.1)),
+]
+
+
+def test_overlapping_queries_share_one_scan(scan, tmp_path, monkeypatch):
+    path = tmp_path / 'queries.jsonl'
+    path.write_text(''.join(json.dumps(spec) + '\n' for spec, _, _ in QUERIES), encoding='utf-8')
+
+    get_snapshot = Astro._get_snapshot
+    points = {False: 0, True: 0}
+
+    def count_snapshot(self, jd, planets=None, speeds=False):
+        points[speeds] += len(jd)
+        return get_snapshot(self, jd, planets, speeds)
+
+    monkeypatch.setattr(Astro, '_get_snapshot', count_snapshot)
+    batch = Batch(timezone_str='UTC', output=OutputConfig(format='csv', path=None))
+    groups = batch.get_groups(batch.read_queries(str(path)))
+    assert sorted(len(group.queries) for group in groups) == [1, 3]
+    batch.show(BatchParams(input=str(path), output=str(tmp_path / 'batch')))
+    # The retro query reads speeds and is scanned apart
+    assert points == {False: (datetime(2020, 3, 1) - datetime(2020, 1, 1)) // STEP,
+                      True: (datetime(2020, 4, 1) - datetime(2020, 1, 20, 5, 30)) // STEP}
+    monkeypatch.setattr(Astro, '_get_snapshot', get_snapshot)
+
+    for spec, scanner_type, params in QUERIES:
+        with open(tmp_path / 'batch' / f"{spec['id']}.csv", newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) > 0
+        assert rows == scan(scanner_type, params)
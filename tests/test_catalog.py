@@ -0,0 +1,59 @@
+from lib.catalog import Catalog, CatalogParams
+from lib.conjuction import Conjuction, ConjuctionsParams
+from lib.retro import Retro, RetroParams
+from lib.transit import Transit, TransitParams
+from common.handler import Handler
+from datetime import datetime, timedelta
+import pytest
+
+TOLERANCE = 1.0
+
+COMMON = dict(start=datetime(2019, 12, 10), end=datetime(2020, 4, 20), step=timedelta(minutes=10), multiThread=False,
+              maxThreads=None, exact=True, tolerance=TOLERANCE)
+
+CASES = {
+    'transit': (Transit, TransitParams(
+        planet=Handler.planet.Moon, sign=Handler.SIGN_DEFAULT, sign_index=0, all=True,
+        nakshatra=Handler.nakshatras[0], nakshatra_index=0, **COMMON)),
+    'retro': (Retro, RetroParams(planet=Handler.planet.Mercury, **COMMON)),
+    'conjuction': (Conjuction, ConjuctionsParams(
+        accuracy=Handler.ACCURACY_DEFAULT, planet1=Handler.planet.Sun, planet2=Handler.planet.Moon, **COMMON)),
+}
+
+
+@pytest.fixture(scope='module')
+def catalog_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('catalog') / 'events.db')
+    Catalog(timezone_str='UTC').show(CatalogParams(
+        path=path, start=datetime(2020, 1, 1), end=datetime(2020, 4, 1),
+        planets=[Handler.planet.Sun, Handler.planet.Moon, Handler.planet.Mercury],
+        tolerance=TOLERANCE, multiThread=False, maxThreads=None))
+    return path
+
+
+@pytest.mark.parametrize('case', list(CASES))
+def test_stitched_catalog_events_match_scan(scan, catalog_path, monkeypatch, case):
+    # The range passes the catalog span on both sides, only the sides are computed
+    scanner_type, params = CASES[case]
+    find_catalog_events = scanner_type._find_catalog_events
+    spans = []
+
+    def find_spy(self, params, start, end):
+        spans.append((start, end))
+        return find_catalog_events(self, params, start, end)
+
+    monkeypatch.setattr(scanner_type, '_find_catalog_events', find_spy)
+    stitched = scan(scanner_type, params, catalog_path=catalog_path)
+    assert spans == [(datetime(2020, 1, 1), datetime(2020, 4, 1))]
+
+    monkeypatch.setattr(scanner_type, '_find_catalog_events', find_catalog_events)
+    scanned = scan(scanner_type, params)
+    assert len(scanned) > 1
+    assert stitched == scanned
+
+
+def test_missing_catalog_is_not_created(tmp_path):
+    path = tmp_path / 'missing.db'
+    with pytest.raises(SystemExit):
+        Transit(timezone_str='UTC', catalog_path=str(path))
+    assert not path.exists()
@@ -0,0 +1,50 @@
+from common.chebyshev import ChebyshevEphemeris
+import numpy as np
+import swisseph as swe
+import pytest
+
+START_JD = 2458849.5
+
+TOLERANCE = 0.01
+
+
+def get_swe(body, jd):
+    rows = [swe.calc_ut(x, body, swe.FLG_SPEED)[0] for x in jd.tolist()]  # type: ignore
+    return np.array([row[0] for row in rows]), np.array([row[3] for row in rows])
+
+
+@pytest.mark.parametrize('body', [swe.SUN, swe.MOON, swe.MERCURY, swe.TRUE_NODE])  # type: ignore
+def test_fit_within_tolerance(body):
+    chebyshev = ChebyshevEphemeris(tolerance_arcsec=TOLERANCE)
+    jd = START_JD + np.sort(np.random.default_rng(body).uniform(0, 366, 4000))
+    longitude, speed = chebyshev.get_body(body, jd)
+    expected_longitude, expected_speed = get_swe(body, jd)
+
+    assert chebyshev.get_errors().get(body, 0.0) <= TOLERANCE
+    # Between the check points a fit may pass the tolerance slightly
+    deviation = (longitude - expected_longitude + 180) % 360 - 180
+    assert np.abs(deviation).max() * 3600 <= 2 * TOLERANCE
+    # Speeds are derivatives of the fit, not checked by it
+    assert np.abs(speed - expected_speed).max() <= 1e-3
+
+
+def test_ayanamsa_within_tolerance():
+    chebyshev = ChebyshevEphemeris(tolerance_arcsec=TOLERANCE)
+    jd = START_JD + np.linspace(0, 3660, 2000)
+    ayanamsa, _ = chebyshev.get_ayanamsa(swe.SIDM_LAHIRI, jd)  # type: ignore
+    expected = np.array([swe.get_ayanamsa_ut(x) for x in jd.tolist()])  # type: ignore
+    assert np.abs(ayanamsa - expected).max() * 3600 <= 2 * TOLERANCE
+
+
+def test_missed_fit_falls_back_to_swe(monkeypatch):
+    monkeypatch.setattr(ChebyshevEphemeris, 'SPLIT_LEVEL_MAX', 0)
+    chebyshev = ChebyshevEphemeris(tolerance_arcsec=1e-9)
+    jd = START_JD + np.linspace(0, 20, 50)
+    longitude, speed = chebyshev.get_body(swe.MOON, jd)  # type: ignore
+    expected_longitude, expected_speed = get_swe(swe.MOON, jd)  # type: ignore
+
+    assert chebyshev.get_fallbacks()[swe.MOON] == 3  # type: ignore
+    assert swe.MOON not in chebyshev.get_errors()  # type: ignore
+    assert np.array_equal(longitude, expected_longitude % 360)
+    assert np.array_equal(speed, expected_speed)
+    assert chebyshev.get_body(swe.MOON, START_JD) == (expected_longitude[0] % 360, expected_speed[0])  # type: ignore
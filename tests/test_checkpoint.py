@@ -0,0 +1,77 @@
+from lib.retro import Retro, RetroParams
+from lib.transit import Transit, TransitParams
+from common.checkpoint import ScanCheckpoint
+from common.handler import Handler
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pytest
+
+PARAMS = TransitParams(
+    start=datetime(2020, 1, 1), end=datetime(2020, 2, 1), step=timedelta(minutes=10), multiThread=False,
+    maxThreads=None, planet=Handler.planet.Moon, sign=Handler.SIGN_DEFAULT, sign_index=0, all=True,
+    nakshatra=Handler.NAKHATRA_DEFAULT, nakshatra_index=-1)
+
+
+@pytest.mark.parametrize('multiThread', [False, True])
+def test_resumed_scan_matches_full_scan(scan, tmp_path, monkeypatch, capsys, multiThread):
+    # The first run is interrupted after writing 4 of the chunks, the chunk being
+    # written is recorded already
+    monkeypatch.setattr(Transit, 'CHECKPOINT_CHUNK_STEPS', 256)
+    params = replace(PARAMS, multiThread=multiThread)
+    checkpoint = tmp_path / 'scan.checkpoint'
+    get_records = Transit._get_records
+    written = 0
+
+    def fail_records(self, params, events):
+        nonlocal written
+        written += 1
+        if written > 4:
+            raise RuntimeError('interrupted')
+        return get_records(self, params, events)
+
+    monkeypatch.setattr(Transit, '_get_records', fail_records)
+    with pytest.raises(RuntimeError):
+        scan(Transit, params, checkpoint_path=str(checkpoint))
+    assert checkpoint.exists()
+
+    monkeypatch.setattr(Transit, '_get_records', get_records)
+    capsys.readouterr()
+    resumed = scan(Transit, params, checkpoint_path=str(checkpoint))
+    assert ': 5 of 18 chunks are done' in capsys.readouterr().out
+    assert not checkpoint.exists()
+    assert resumed == scan(Transit, params)
+
+
+def test_exact_scan_chunks_span_days(scan, tmp_path, monkeypatch):
+    # Exact scans step days at a time, their chunks are bounded by days too
+    add = ScanCheckpoint.add
+    spans = []
+
+    def record_add(self, key, start, end, events):
+        spans.append(end - start)
+        return add(self, key, start, end, events)
+
+    monkeypatch.setattr(ScanCheckpoint, 'add', record_add)
+    params = RetroParams(start=datetime(2000, 1, 1), end=datetime(2010, 1, 1), step=timedelta(minutes=10),
+                         multiThread=False, maxThreads=None, planet=Handler.planet.Saturn, exact=True, tolerance=1.0)
+    rows = scan(Retro, params, checkpoint_path=str(tmp_path / 'scan.checkpoint'))
+    assert len(rows) > 0
+    assert rows == scan(Retro, params)
+    assert max(spans) <= timedelta(days=Retro.CHECKPOINT_CHUNK_DAYS)
+    assert sum(spans, timedelta(0)) == params.end - params.start
+
+
+def test_cut_record_is_dropped(tmp_path: Path):
+    # A record cut by a crash is dropped with the rest of the file
+    checkpoint = ScanCheckpoint(str(tmp_path / 'scan.checkpoint'))
+    events = np.zeros(3, dtype=[('time', 'datetime64[us]')])
+    checkpoint.add('key', datetime(2020, 1, 1), datetime(2020, 1, 2), events)
+    size = Path(checkpoint.path).stat().st_size
+    checkpoint.add('key', datetime(2020, 1, 2), datetime(2020, 1, 3), events)
+    with open(checkpoint.path, 'r+b') as f:
+        f.truncate(size + 10)
+
+    assert list(checkpoint.load('key')) == [(datetime(2020, 1, 1), datetime(2020, 1, 2))]
+    assert Path(checkpoint.path).stat().st_size == size
@@ -0,0 +1,23 @@
+from lib.conjuction import Conjuction, ConjuctionsParams
+from common.astro import Block, Snapshot
+from common.handler import Handler
+from common.timegrid import TimeGrid
+from datetime import datetime, timedelta
+import numpy as np
+
+
+def test_step_conjuction_across_zero_degrees():
+    conjuction = Conjuction(timezone_str='UTC')
+    params = ConjuctionsParams(
+        start=datetime(2020, 1, 1), end=datetime(2020, 1, 1, 0, 3), step=timedelta(minutes=1), multiThread=False,
+        maxThreads=None, accuracy=0.1, planet1=Handler.planet.Sun, planet2=Handler.planet.Moon)
+    longitude = np.array([[359.98, 359.99, 0.01], [0.05, 359.5, 0.5]])
+    snapshot = Snapshot(
+        planets=[Handler.planet.Sun, Handler.planet.Moon], jd=np.zeros(3), longitude=longitude, speed=None,
+        sign_index=conjuction._get_sign_indexes(longitude), nakshatra_index=conjuction._get_nakshatra_indexes(longitude),
+        pada_index=conjuction._get_pada_indexes(longitude))
+    time_grid = TimeGrid(start=params.start, step=params.step, size=3)
+
+    events = conjuction._get_detector(params, 0)(Block(time_grid=time_grid, first=0, snapshot=snapshot))
+    assert events['time'].tolist() == [params.start]
+    assert events['longitude1'].tolist() == [359.98]
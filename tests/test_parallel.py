@@ -0,0 +1,35 @@
+from lib.aspect import Aspect, AspectParams
+from lib.conjuction import Conjuction, ConjuctionsParams
+from lib.retro import Retro, RetroParams
+from lib.transit import Transit, TransitParams
+from common.handler import Handler
+from dataclasses import replace
+from datetime import datetime, timedelta
+import pytest
+
+START = datetime(2020, 1, 1)
+
+CASES = {
+    'transit': (Transit, TransitParams(
+        start=START, end=datetime(2020, 3, 1), step=timedelta(minutes=10), multiThread=False, maxThreads=None,
+        planet=Handler.planet.Moon, sign=Handler.SIGN_DEFAULT, sign_index=0, all=True,
+        nakshatra=Handler.NAKHATRA_DEFAULT, nakshatra_index=-1)),
+    'conjuction': (Conjuction, ConjuctionsParams(
+        start=START, end=datetime(2020, 4, 1), step=timedelta(minutes=10), multiThread=False, maxThreads=None,
+        accuracy=0.1, planet1=Handler.planet.Sun, planet2=Handler.planet.Moon)),
+    'retro': (Retro, RetroParams(
+        start=START, end=datetime(2021, 1, 1), step=timedelta(minutes=10), multiThread=False, maxThreads=None,
+        planet=Handler.planet.Mercury, exact=True)),
+    'aspect': (Aspect, AspectParams(
+        start=START, end=datetime(2020, 2, 1), step=timedelta(minutes=10), multiThread=False, maxThreads=None,
+        planet1=Handler.planet.Sun, planet2=Handler.planet.Moon, planets=list(Handler.planets), exact=True)),
+}
+
+
+@pytest.mark.parametrize('case', list(CASES))
+def test_chunked_scan_matches_single_process(scan, case):
+    scanner_type, params = CASES[case]
+    single = scan(scanner_type, params)
+    chunked = scan(scanner_type, replace(params, multiThread=True, maxThreads=2))
+    assert len(single) > 1
+    assert chunked == single
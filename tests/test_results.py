@@ -0,0 +1,43 @@
+from lib.retro import Retro, RetroParams
+from lib.transit import Transit, TransitParams
+from common.handler import Handler
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+TRANSIT = TransitParams(
+    start=datetime(2020, 2, 1), end=datetime(2020, 3, 1), step=timedelta(minutes=10), multiThread=False,
+    maxThreads=None, planet=Handler.planet.Moon, sign=Handler.SIGN_DEFAULT, sign_index=0, all=True,
+    nakshatra=Handler.NAKHATRA_DEFAULT, nakshatra_index=-1)
+
+RETRO = RetroParams(
+    start=datetime(2020, 1, 1), end=datetime(2020, 7, 1), step=timedelta(minutes=10), multiThread=False,
+    maxThreads=None, planet=Handler.planet.Mercury, exact=True)
+
+
+def test_later_end_matches_full_scan(scan, tmp_path):
+    # Spans past the cached one are scanned on its grid
+    cache = str(tmp_path / 'results')
+    scan(Transit, TRANSIT, results_cache_dir=cache)
+    later = replace(TRANSIT, end=datetime(2020, 4, 1, 0, 5))
+    assert scan(Transit, later, results_cache_dir=cache) == scan(Transit, later)
+    inside = replace(TRANSIT, end=datetime(2020, 2, 20))
+    assert scan(Transit, inside, results_cache_dir=cache) == scan(Transit, inside)
+
+
+def test_earlier_start_matches_full_scan(scan, tmp_path):
+    # Spans before the cached one are scanned on a grid of their own, with the same points
+    cache = str(tmp_path / 'results')
+    scan(Transit, TRANSIT, results_cache_dir=cache)
+    earlier = replace(TRANSIT, start=datetime(2020, 1, 1), end=datetime(2020, 3, 10))
+    assert scan(Transit, earlier, results_cache_dir=cache) == scan(Transit, earlier)
+    inside = replace(TRANSIT, start=datetime(2020, 1, 10), end=datetime(2020, 2, 20))
+    assert scan(Transit, inside, results_cache_dir=cache) == scan(Transit, inside)
+
+
+def test_extended_exact_scan_matches_full_scan(scan, tmp_path):
+    cache = str(tmp_path / 'results')
+    scan(Retro, RETRO, results_cache_dir=cache)
+    wider = replace(RETRO, start=datetime(2019, 6, 1), end=datetime(2021, 1, 1))
+    full = scan(Retro, wider)
+    assert len(full) > 1
+    assert scan(Retro, wider, results_cache_dir=cache) == full
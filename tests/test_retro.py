@@ -0,0 +1,26 @@
+from lib.retro import Retro, RetroParams
+from common.handler import Handler
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+
+PARAMS = RetroParams(
+    start=datetime(2000, 1, 1), end=datetime(2004, 1, 1), step=timedelta(minutes=10), multiThread=False,
+    maxThreads=None, planet=Handler.planet.Mercury, exact=True, tolerance=1.0)
+
+
+def get_stations(retro: Retro) -> np.ndarray:
+    return retro._join_events(list(retro._find_events(PARAMS)))
+
+
+@pytest.mark.parametrize('backend', ['cache', Handler.BACKEND_CHEBYSHEV])
+def test_backend_stations_match_swe(tmp_path, backend):
+    # Stations on backend speeds are found again on swe ones, within the tolerance
+    options = {'cache_dir': str(tmp_path / 'cache')} if backend == 'cache' else {'backend': backend}
+    expected = get_stations(Retro(timezone_str='UTC'))
+    stations = get_stations(Retro(timezone_str='UTC', **options))
+
+    assert len(stations) == len(expected) == 25
+    assert (stations['out'] == expected['out']).all()
+    deviation = np.abs((stations['time'] - expected['time']) / np.timedelta64(1, 'us')) / 1e6
+    assert deviation.max() <= PARAMS.tolerance
@@ -0,0 +1,66 @@
+from lib.server import Server, ServerParams
+from typing import Any, Dict, Tuple
+import asyncio
+import json
+
+QUERY = {'planet': 'SUN', 'all': True, 'step': 1440}
+
+
+async def post(port: int, command: str, spec: Dict[str, Any]) -> Tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(spec).encode('utf-8')
+    writer.write(f"POST /{command} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), body
+
+
+def serve(monkeypatch, client) -> int:
+    # Runs the client against a server on a free port, returns the number of computations
+    server = Server(timezone_str='UTC')
+    compute = Server._Server__compute  # type: ignore
+    computed = 0
+
+    async def count_compute(self, query):
+        nonlocal computed
+        computed += 1
+        return await compute(self, query)
+
+    monkeypatch.setattr(Server, '_Server__compute', count_compute)
+
+    async def run():
+        listener = await server._start(ServerParams(host='127.0.0.1', port=0, maxThreads=None, cache_entries=8))
+        async with listener:
+            await client(listener.sockets[0].getsockname()[1])
+
+    asyncio.run(run())
+    return computed
+
+
+def test_identical_requests_share_one_computation(monkeypatch):
+    responses = []
+
+    async def client(port: int):
+        # The default window is the same for requests of one day
+        responses.extend(await asyncio.gather(post(port, 'transit', QUERY), post(port, 'transit', QUERY)))
+        responses.append(await post(port, 'transit', QUERY))
+
+    assert serve(monkeypatch, client) == 1
+    assert [status for status, _ in responses] == [200, 200, 200]
+    assert responses[0][1] == responses[1][1] == responses[2][1]
+    assert json.loads(responses[0][1])['count'] >= 11
+
+
+def test_other_requests_are_computed(monkeypatch):
+    responses = []
+
+    async def client(port: int):
+        responses.append(await post(port, 'transit', QUERY))
+        responses.append(await post(port, 'transit', dict(QUERY, planet='MARS')))
+        responses.append(await post(port, 'transit', dict(QUERY, planet='PLUTO')))
+
+    assert serve(monkeypatch, client) == 2
+    assert [status for status, _ in responses] == [200, 200, 400]
+    assert responses[0][1] != responses[1][1]
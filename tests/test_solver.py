@@ -0,0 +1,41 @@
+from lib.conjuction import Conjuction, ConjuctionsParams
+from common.handler import Handler
+from common.solver import SECONDS_IN_DAY, brent
+from datetime import datetime, timedelta
+import math
+import pytest
+
+
+@pytest.mark.parametrize('func, a, b, root', [
+    (math.sin, 3.0, 3.5, math.pi),
+    (lambda x: -math.sin(x), 3.0, 3.5, math.pi),
+    (lambda x: x ** 3 - 2, 0.0, 2.0, 2 ** (1 / 3)),
+    (lambda x: math.exp(x) - 10, 0.0, 5.0, math.log(10)),
+    (lambda x: (x - 1) * abs(x - 1), -3.0, 1.5, 1.0),
+])
+def test_brent_root_within_tolerance_on_side_of_b(func, a, b, root):
+    tolerance = 1e-9
+    fb = func(b)
+    x, fx = brent(func, a, b, func(a), fb, tolerance)
+    assert abs(x - root) <= tolerance
+    assert fx == func(x)
+    assert fx == 0 or fx * fb > 0
+
+
+def test_brent_returns_b_at_root():
+    assert brent(math.sin, 3.0, math.pi * 2, math.sin(3.0), 0.0, 1e-9) == (math.pi * 2, 0.0)
+
+
+def test_exact_conjuctions_within_tolerance():
+    params = ConjuctionsParams(
+        start=datetime(2020, 1, 1), end=datetime(2021, 1, 1), step=timedelta(minutes=10), multiThread=False,
+        maxThreads=None, accuracy=Handler.ACCURACY_DEFAULT, planet1=Handler.planet.Sun, planet2=Handler.planet.Moon,
+        exact=True, tolerance=1.0)
+    conjuction = Conjuction(timezone_str='UTC')
+    events = conjuction._join_events(list(conjuction._find_events(params)))
+    assert len(events) == 12
+
+    # Degrees the Moon gains on the Sun during the tolerance at its fastest
+    reach = 16 * params.tolerance / SECONDS_IN_DAY
+    separation = (events['longitude1'] - events['longitude2'] + 180) % 360 - 180
+    assert (abs(separation) <= reach).all()
@@ -0,0 +1,26 @@
+from common.timegrid import TimeGrid
+from datetime import datetime, timedelta
+import numpy as np
+import swisseph as swe
+
+
+def get_jd(time: datetime) -> float:
+    return swe.utc_to_jd(time.year, time.month, time.day, time.hour, time.minute,  # type: ignore
+                         time.second + time.microsecond / 1000000, swe.GREG_CAL)[1]  # type: ignore
+
+
+def test_points_follow_utc_over_decades():
+    # One arithmetic run from the start drifts from the UTC times as UT1 - UTC changes
+    grid = TimeGrid(start=datetime(1970, 1, 1, 0, 7), step=timedelta(minutes=10), size=3 * 10 ** 6)
+    indexes = np.linspace(0, grid.size - 1, 50).astype(np.int64)
+    jd = np.concatenate([grid.get_block(index, index + 1) for index in indexes.tolist()])
+    expected = np.array([get_jd(grid.get_time(index)) for index in indexes.tolist()])
+    assert np.abs(jd - expected).max() * 86400 < 0.005
+
+
+def test_points_do_not_depend_on_grid_start():
+    step = timedelta(minutes=7)
+    grid = TimeGrid(start=datetime(2016, 12, 1, 0, 3), step=step, size=20000)
+    later = TimeGrid(start=grid.get_time(12345), step=step, size=5000)
+    assert np.array_equal(grid.get_block(12345, 17345), later.get_block(0, 5000))
+    assert grid.get_jd(12345) == later.get_jd(0)
@@ -0,0 +1,20 @@
+from lib.transit import Transit, TransitParams
+from common.handler import Handler
+from common.solver import SECONDS_IN_DAY
+from datetime import datetime, timedelta
+
+
+def test_exact_transits_cross_boundary_within_tolerance():
+    # The Sun does not retrograde, every ingress is found just after the entered sign starts
+    params = TransitParams(
+        start=datetime(2020, 1, 1), end=datetime(2022, 1, 1), step=timedelta(minutes=10), multiThread=False,
+        maxThreads=None, planet=Handler.planet.Sun, sign=Handler.SIGN_DEFAULT, sign_index=0, all=True,
+        nakshatra=Handler.NAKHATRA_DEFAULT, nakshatra_index=-1, exact=True, tolerance=1.0)
+    transit = Transit(timezone_str='UTC')
+    events = transit._join_events(list(transit._find_events(params)))
+    assert len(events) == 24
+
+    # Degrees the Sun moves during the tolerance, with a margin for its varying speed
+    reach = 1.1 * params.tolerance / SECONDS_IN_DAY
+    past = (events['longitude'] - events['sector'] * Transit.SIGN_DEGREES) % 360
+    assert ((past >= 0) & (past <= reach)).all()